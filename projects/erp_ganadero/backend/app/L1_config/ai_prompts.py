@@ -3,121 +3,160 @@ AI Prompt Templates for Cattle Analytics
 Domain-specific prompts for health, reproduction, finance, and growth analysis
 """
 
-# Health Analysis Prompt
-HEALTH_ANALYSIS_PROMPT = """You are a cattle ranch health expert analyzing herd data.
-
-Current Metrics:
-- Calf Mortality: {calf_mortality}%
+import re
+
+# Per analysis type: the pieces both the single-type prompts and the
+# combined overview prompt are built from
+ANALYSIS_SECTIONS = {
+    "health": {
+        "role": "You are a cattle ranch health expert analyzing herd data.",
+        "heading": "Current Metrics",
+        "title": "HEALTH METRICS",
+        "metrics": """- Calf Mortality: {calf_mortality}%
 - Target: 3%
 - Recent Deaths: {recent_deaths}
 - Vaccination Coverage: {vaccination_rate}%
-- Herd Size: {herd_size}
-
-Provide analysis in this exact format:
-INSIGHT: [One sentence key finding about health status]
-RECOMMENDATION: [One specific action to improve health]
-ALERT: [One sentence if concerning, or "None"]
-CONFIDENCE: [0-100]
-
-Keep responses concise and actionable for Mexican ranchers.
-"""
-
-# Reproductive Performance Prompt
-REPRODUCTION_ANALYSIS_PROMPT = """You are a cattle breeding expert analyzing reproductive performance.
-
-Current Metrics:
-- Pregnancy Rate: {pregnancy_rate}%
+- Herd Size: {herd_size}""",
+        "insight": "key finding about health status",
+        "recommendation": "action to improve health",
+        "closing": "Keep responses concise and actionable for Mexican ranchers.",
+        "defaults": {"calf_mortality": 0, "recent_deaths": 0, "vaccination_rate": 0, "herd_size": 0},
+    },
+    "reproduction": {
+        "role": "You are a cattle breeding expert analyzing reproductive performance.",
+        "heading": "Current Metrics",
+        "title": "REPRODUCTION METRICS",
+        "metrics": """- Pregnancy Rate: {pregnancy_rate}%
 - Target: 85%
 - Calving Interval: {calving_interval} days
 - Target: 365 days
 - Open Cows: {open_cows}
-- Herd Size: {herd_size}
-
-Provide analysis in this exact format:
-INSIGHT: [One sentence key finding about reproductive performance]
-RECOMMENDATION: [One specific action to improve breeding success]
+- Herd Size: {herd_size}""",
+        "insight": "key finding about reproductive performance",
+        "recommendation": "action to improve breeding success",
+        "closing": "Focus on practical advice for Mexican cattle operations.",
+        "defaults": {"pregnancy_rate": 0, "calving_interval": 0, "open_cows": 0, "herd_size": 0},
+    },
+    "financial": {
+        "role": "You are a cattle ranch financial advisor analyzing profitability.",
+        "heading": "Current Data",
+        "title": "FINANCIAL DATA",
+        "metrics": """- Total Costs: ${total_costs} USD
+- Revenue: ${revenue} USD
+- Profit Margin: {margin}%
+- Cost per Kg: ${cost_per_kg}
+- Recent Cost Trend: {cost_trend}""",
+        "insight": "key finding about financial performance",
+        "recommendation": "cost-saving or revenue-increasing action",
+        "closing": "Provide practical financial advice for ranchers.",
+        "defaults": {"total_costs": 0, "revenue": 0, "margin": 0, "cost_per_kg": 0, "cost_trend": "stable"},
+    },
+    "growth": {
+        "role": "You are a cattle growth expert analyzing production efficiency.",
+        "heading": "Current Metrics",
+        "title": "GROWTH METRICS",
+        "metrics": """- Average Daily Gain: {avg_daily_gain} kg/day
+- Target: 1.0 kg/day
+- Average Weaning Weight: {weaning_weight} kg
+- Target: 210 kg
+- Feed Efficiency: {feed_efficiency}
+- Herd Size: {herd_size}""",
+        "insight": "key finding about growth performance",
+        "recommendation": "action to improve growth rates",
+        "closing": "Focus on nutrition and management practices for Mexican ranches.",
+        "defaults": {"avg_daily_gain": 0, "weaning_weight": 0, "feed_efficiency": "N/A", "herd_size": 0},
+    },
+}
+
+_ANSWER_FORMAT = """INSIGHT: [One sentence {insight}]
+RECOMMENDATION: [One specific {recommendation}]
 ALERT: [One sentence if concerning, or "None"]
 CONFIDENCE: [0-100]
-
-Focus on practical advice for Mexican cattle operations.
 """
 
-# Financial Performance Prompt
-FINANCIAL_ANALYSIS_PROMPT = """You are a cattle ranch financial advisor analyzing profitability.
+_SINGLE_PROMPT = """{role}
 
-Current Data:
-- Total Costs: ${total_costs} USD
-- Revenue: ${revenue} USD
-- Profit Margin: {margin}%
-- Cost per Kg: ${cost_per_kg}
-- Recent Cost Trend: {cost_trend}
+{heading}:
+{metrics}
 
 Provide analysis in this exact format:
-INSIGHT: [One sentence key finding about financial performance]
-RECOMMENDATION: [One specific cost-saving or revenue-increasing action]
-ALERT: [One sentence if concerning, or "None"]
-CONFIDENCE: [0-100]
-
-Provide practical financial advice for ranchers.
+{answer}
+{closing}
 """
 
-# Growth & Production Prompt
-GROWTH_ANALYSIS_PROMPT = """You are a cattle growth expert analyzing production efficiency.
 
-Current Metrics:
-- Average Daily Gain: {avg_daily_gain} kg/day
-- Target: 1.0 kg/day
-- Average Weaning Weight: {weaning_weight} kg
-- Target: 210 kg
-- Feed Efficiency: {feed_efficiency}
-- Herd Size: {herd_size}
+def _answer_format(analysis: str) -> str:
+    section = ANALYSIS_SECTIONS[analysis]
+    return _ANSWER_FORMAT.format(insight=section["insight"], recommendation=section["recommendation"])
 
-Provide analysis in this exact format:
-INSIGHT: [One sentence key finding about growth performance]
-RECOMMENDATION: [One specific action to improve growth rates]
-ALERT: [One sentence if concerning, or "None"]
-CONFIDENCE: [0-100]
 
-Focus on nutrition and management practices for Mexican ranches.
-"""
+def _single_prompt(analysis: str) -> str:
+    """Prompt template for one analysis type; metric placeholders are left to fill"""
+    section = ANALYSIS_SECTIONS[analysis]
+    return _SINGLE_PROMPT.format(role=section["role"], heading=section["heading"], metrics=section["metrics"],
+                                 answer=_answer_format(analysis), closing=section["closing"])
+
+
+def _metric_values(analysis: str, metrics: dict) -> dict:
+    return {**ANALYSIS_SECTIONS[analysis]["defaults"], **metrics}
+
+
+HEALTH_ANALYSIS_PROMPT = _single_prompt("health")
+REPRODUCTION_ANALYSIS_PROMPT = _single_prompt("reproduction")
+FINANCIAL_ANALYSIS_PROMPT = _single_prompt("financial")
+GROWTH_ANALYSIS_PROMPT = _single_prompt("growth")
 
 
 def build_health_prompt(metrics: dict) -> str:
     """Build health analysis prompt with metrics"""
-    return HEALTH_ANALYSIS_PROMPT.format(
-        calf_mortality=metrics.get('calf_mortality', 0),
-        recent_deaths=metrics.get('recent_deaths', 0),
-        vaccination_rate=metrics.get('vaccination_rate', 0),
-        herd_size=metrics.get('herd_size', 0)
-    )
+    return HEALTH_ANALYSIS_PROMPT.format(**_metric_values("health", metrics))
 
 
 def build_reproduction_prompt(metrics: dict) -> str:
     """Build reproduction analysis prompt with metrics"""
-    return REPRODUCTION_ANALYSIS_PROMPT.format(
-        pregnancy_rate=metrics.get('pregnancy_rate', 0),
-        calving_interval=metrics.get('calving_interval', 0),
-        open_cows=metrics.get('open_cows', 0),
-        herd_size=metrics.get('herd_size', 0)
-    )
+    return REPRODUCTION_ANALYSIS_PROMPT.format(**_metric_values("reproduction", metrics))
 
 
 def build_financial_prompt(metrics: dict) -> str:
     """Build financial analysis prompt with metrics"""
-    return FINANCIAL_ANALYSIS_PROMPT.format(
-        total_costs=metrics.get('total_costs', 0),
-        revenue=metrics.get('revenue', 0),
-        margin=metrics.get('margin', 0),
-        cost_per_kg=metrics.get('cost_per_kg', 0),
-        cost_trend=metrics.get('cost_trend', 'stable')
-    )
+    return FINANCIAL_ANALYSIS_PROMPT.format(**_metric_values("financial", metrics))
 
 
 def build_growth_prompt(metrics: dict) -> str:
     """Build growth analysis prompt with metrics"""
-    return GROWTH_ANALYSIS_PROMPT.format(
-        avg_daily_gain=metrics.get('avg_daily_gain', 0),
-        weaning_weight=metrics.get('weaning_weight', 0),
-        feed_efficiency=metrics.get('feed_efficiency', 'N/A'),
-        herd_size=metrics.get('herd_size', 0)
-    )
+    return GROWTH_ANALYSIS_PROMPT.format(**_metric_values("growth", metrics))
+
+
+# Combined prompt: one call answers every analysis type, one [SECTION] block each
+OVERVIEW_ANALYSIS_PROMPT = """You are a cattle ranch advisor reviewing a whole operation at once.
+
+{metrics}
+
+Provide analysis in this exact format, one block per section, in this order:
+{blocks}
+Keep each section concise and actionable for Mexican ranchers.
+"""
+
+_SECTION_MARKER = re.compile(r"^[#*\s]*\[([A-Z]+)\][*\s]*$", re.MULTILINE)
+
+
+def build_overview_prompt(metrics_by_type: dict) -> str:
+    """Build one prompt covering every analysis type in metrics_by_type"""
+    metrics, blocks = [], []
+    for analysis, values in metrics_by_type.items():
+        section = ANALYSIS_SECTIONS[analysis]
+        metrics.append(f"{section['title']}:\n" + section["metrics"].format(**_metric_values(analysis, values)))
+        blocks.append(f"[{analysis.upper()}]\n" + _answer_format(analysis))
+    return OVERVIEW_ANALYSIS_PROMPT.format(metrics="\n\n".join(metrics), blocks="".join(blocks))
+
+
+def split_overview_sections(text: str) -> dict:
+    """{analysis type: its block of the response} for every [SECTION] marker found"""
+    markers = list(_SECTION_MARKER.finditer(text))
+    sections = {}
+    for index, marker in enumerate(markers):
+        analysis = marker.group(1).lower()
+        if analysis in ANALYSIS_SECTIONS:
+            end = markers[index + 1].start() if index + 1 < len(markers) else len(text)
+            sections[analysis] = text[marker.end():end].strip()
+    return sections
@@ -0,0 +1,78 @@
+"""
+ERP Ganadero - Async Supabase Access (L1 Configuration)
+
+Entry point for the CRUD layer's non-blocking data access: the pooled
+PostgREST client in supabase_http, or with USE_MOCK_DB=true the in-memory
+mock behind the same async API. The HTTP stack is imported on first use.
+"""
+
+from typing import Any, Optional
+import inspect
+import os
+
+import structlog
+
+from .metrics import register_collector
+from .supabase_client import USE_MOCK
+
+logger = structlog.get_logger()
+
+
+async def execute(query):
+    """
+    Execute a query from either client style.
+
+    Async builders are awaited; sync ones (supabase-py Client, test doubles)
+    are called directly and still block.
+    """
+    result = query.execute()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+# Singleton instance
+_async_client: Optional[Any] = None
+
+
+def get_async_supabase():
+    """Get async Supabase client (mock store when USE_MOCK_DB=true)"""
+    global _async_client
+    if _async_client is None:
+        if USE_MOCK:
+            from .mock_supabase import AsyncMockSupabaseClient, get_mock_supabase
+            _async_client = AsyncMockSupabaseClient(get_mock_supabase())
+        else:
+            url = os.getenv("SUPABASE_URL")
+            key = os.getenv("SUPABASE_KEY")
+
+            if not url or not key:
+                raise ValueError(
+                    "SUPABASE_URL and SUPABASE_KEY must be set in environment"
+                )
+
+            from .supabase_http import AsyncSupabaseClient, SUPABASE_MAX_CONNECTIONS
+            _async_client = AsyncSupabaseClient(url, key)
+            logger.info("async_supabase_client_initialized", url=url,
+                        max_connections=SUPABASE_MAX_CONNECTIONS)
+    return _async_client
+
+
+async def close_async_supabase():
+    """Close pooled connections (application shutdown)"""
+    global _async_client
+    if _async_client is not None and hasattr(_async_client, "aclose"):
+        await _async_client.aclose()
+    _async_client = None
+
+
+def _collect_client_metrics():
+    """Request/retry counters of the pooled PostgREST client, once created"""
+    stats = _async_client.get_stats() if hasattr(_async_client, "get_stats") else {}
+    return [
+        (f"supabase_http_{name}_total", "counter", f"PostgREST client {name.replace('_', ' ')}", [({}, value)])
+        for name, value in stats.items()
+    ]
+
+
+register_collector(_collect_client_metrics)
@@ -4,10 +4,20 @@ Database Configuration for ERP Ganadero
 SQLAlchemy setup with SQLite for development, PostgreSQL for production.
 """
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Dict, Optional
+import hashlib
 import os
+import sqlite3
+import threading
+import time
+
+from .metrics import counter, histogram, register_collector
+from .query_stats import record_query
 
 # Database URL from environment or default to SQLite
 DATABASE_URL = os.getenv(
@@ -25,11 +35,107 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica (unset = reads use the primary)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Copy the primary to a local SQLite replica every N seconds (0 = off)
+SQLITE_REPLICA_SYNC_SECONDS = float(os.getenv("SQLITE_REPLICA_SYNC_SECONDS", "0"))
+
+# How long a client keeps reading from the primary after it writes
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+
+read_engine = create_engine(
+    DATABASE_READ_URL,
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_READ_URL else {},
+    echo=False
+) if DATABASE_READ_URL else engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+# ============================================================================
+# Read/Write Routing
+# ============================================================================
+
+# client key -> monotonic deadline until which its reads stick to the primary
+_sticky_until: Dict[str, float] = {}
+_sticky_lock = threading.Lock()
+_sticky_pruned_at = 0.0
+
+
+def _client_key(request: Optional[Request]) -> Optional[str]:
+    """Identify the client session: bearer token if present, else address"""
+    if request is None:
+        return None
+    auth = request.headers.get("authorization")
+    if auth:
+        return hashlib.blake2b(auth.encode(), digest_size=16).hexdigest()
+    return request.client.host if request.client else None
+
+
+def _is_sticky(key: Optional[str]) -> bool:
+    if key is None:
+        return False
+    with _sticky_lock:
+        deadline = _sticky_until.get(key)
+        if deadline is None:
+            return False
+        if deadline < time.monotonic():
+            del _sticky_until[key]
+            return False
+        return True
+
+
+@event.listens_for(Session, "after_flush")
+def _stick_to_primary_after_write(session, flush_context):
+    """Pin the writing client's reads to the primary for a short window"""
+    global _sticky_pruned_at
+    key = session.info.get("client_key")
+    if key is not None:
+        now = time.monotonic()
+        with _sticky_lock:
+            _sticky_until[key] = now + READ_AFTER_WRITE_SECONDS
+            # Drop clients that never read again, at most once per window
+            if now - _sticky_pruned_at >= READ_AFTER_WRITE_SECONDS:
+                _sticky_pruned_at = now
+                for expired in [k for k, deadline in _sticky_until.items() if deadline < now]:
+                    del _sticky_until[expired]
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_replica_writes(session, flush_context, instances):
+    if session.info.get("read_only"):
+        raise RuntimeError("Attempted to write through a read-replica session")
+
+
+def open_primary_session(request: Optional[Request] = None) -> Session:
+    """Primary session that records writes for read-your-writes routing"""
+    db = SessionLocal()
+    db.info["client_key"] = _client_key(request)
+    return db
+
+
+def open_read_session(request: Optional[Request] = None) -> Session:
+    """
+    Replica session, unless the client wrote recently (or asked for the
+    primary with an X-Read-Primary header) or no replica is configured.
+    """
+    if read_engine is engine:
+        return open_primary_session(request)
+
+    key = _client_key(request)
+    if _is_sticky(key) or (request is not None and request.headers.get("x-read-primary")):
+        return open_primary_session(request)
+
+    db = ReadSessionLocal()
+    db.info["read_only"] = True
+    return db
+
+
+def get_db(request: Request = None):
     """
     Dependency for FastAPI routes to get database session.
     
@@ -38,13 +144,174 @@ def get_db():
         def get_items(db: Session = Depends(get_db)):
             return db.query(Item).all()
     """
-    db = SessionLocal()
+    db = open_primary_session(request)
     try:
         yield db
     finally:
         db.close()
 
 
+def get_read_db(request: Request = None):
+    """
+    Dependency for read-only routes; uses the replica when configured.
+    
+    Clients that wrote within READ_AFTER_WRITE_SECONDS keep reading from
+    the primary so they always see their own writes.
+    
+    Usage:
+        @app.get("/items")
+        def get_items(db: Session = Depends(get_read_db)):
+            return db.query(Item).all()
+    """
+    db = open_read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ============================================================================
+# Replica Lag
+# ============================================================================
+
+_lag_cache = {"value": None, "checked_at": 0.0}
+LAG_CHECK_INTERVAL_SECONDS = 5.0
+
+
+def _sqlite_path(url: str) -> Optional[str]:
+    database = make_url(url).database
+    return database if database and database != ":memory:" else None
+
+
+def get_replica_lag_seconds() -> Optional[float]:
+    """
+    Replication lag of the read replica (None when no replica is configured).
+    
+    PostgreSQL: time since the last replayed transaction. SQLite stand-in:
+    age of the replica copy relative to the primary file. Cached for
+    LAG_CHECK_INTERVAL_SECONDS so health checks stay cheap.
+    """
+    if read_engine is engine:
+        return None
+    
+    now = time.monotonic()
+    if now - _lag_cache["checked_at"] < LAG_CHECK_INTERVAL_SECONDS:
+        return _lag_cache["value"]
+    
+    try:
+        if read_engine.dialect.name == "postgresql":
+            with read_engine.connect() as conn:
+                lag = conn.execute(text(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )).scalar()
+        else:
+            primary = _sqlite_path(DATABASE_URL)
+            replica = _sqlite_path(DATABASE_READ_URL)
+            lag = max(0.0, os.path.getmtime(primary) - os.path.getmtime(replica))
+        lag = round(float(lag), 3)
+    except Exception:
+        lag = None
+    
+    _lag_cache.update(value=lag, checked_at=now)
+    return lag
+
+
+def sync_sqlite_replica():
+    """
+    Refresh the local SQLite replica from the primary (online backup).
+    
+    Stands in for streaming replication in development; call periodically.
+    """
+    primary = _sqlite_path(DATABASE_URL)
+    replica = _sqlite_path(DATABASE_READ_URL) if DATABASE_READ_URL else None
+    if not primary or not replica:
+        raise ValueError("sync_sqlite_replica requires SQLite DATABASE_URL and DATABASE_READ_URL files")
+    
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+# ============================================================================
+# Metrics and Query Instrumentation
+# ============================================================================
+
+DB_QUERIES = counter("db_queries_total", "SQL statements executed", ("engine",))
+DB_QUERY_SECONDS = histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+
+def _engines() -> Dict[str, object]:
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    return engines
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, so a failed statement leaves nothing behind
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(label: str):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._query_started
+        DB_QUERIES.inc(label)
+        DB_QUERY_SECONDS.observe(seconds, label)
+        record_query(statement, seconds)
+    return after_cursor_execute
+
+
+def instrument_engine(eng, label: str):
+    """Count and time the engine's statements, per engine label and per request"""
+    event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+    event.listen(eng, "after_cursor_execute", _after_cursor_execute(label))
+
+
+for _label, _engine in _engines().items():
+    instrument_engine(_engine, _label)
+
+
+def _collect_pool_metrics():
+    """Connection pool state per engine (QueuePool; other pools report what they have)"""
+    stats = {"size": [], "checkedout": [], "checkedin": [], "overflow": []}
+    for label, eng in _engines().items():
+        for name, samples in stats.items():
+            method = getattr(eng.pool, name, None)
+            if method is not None:
+                samples.append(({"engine": label}, method()))
+    return [
+        ("db_pool_size", "gauge", "Configured pool size", stats["size"]),
+        ("db_pool_checked_out", "gauge", "Connections in use", stats["checkedout"]),
+        ("db_pool_checked_in", "gauge", "Idle connections in the pool", stats["checkedin"]),
+        ("db_pool_overflow", "gauge", "Connections beyond pool size", stats["overflow"]),
+    ]
+
+
+register_collector(_collect_pool_metrics)
+
+
+def _collect_replica_metrics():
+    if read_engine is engine:
+        return []
+    lag = get_replica_lag_seconds()
+    return [
+        ("db_replica_lag_seconds", "gauge", "Read replica replication lag",
+         [({}, lag)] if lag is not None else []),
+        ("db_sticky_clients", "gauge", "Clients whose reads are pinned to the primary after a write",
+         [({}, len(_sticky_until))]),
+    ]
+
+
+register_collector(_collect_replica_metrics)
+
+
 def init_db():
     """
     Initialize database - create all tables.
@@ -0,0 +1,339 @@
+"""
+ERP Ganadero - Logging Configuration (L1 Configuration)
+
+structlog routed through a non-blocking queue: a log call only filters
+the event and enqueues it; rendering (JSON or console) and the stdout /
+file writes happen on a background thread, in batches, with size-based
+rotation of LOG_FILE. High-frequency INFO events (cattle_created,
+event_created, ai_cache_hit, ...) are sampled or rate-limited per event
+name, and every dropped record is counted (get_log_stats, /metrics).
+Tracebacks are rendered on the calling thread, before the record is
+queued: by the time the writer runs, the exception is gone.
+
+tools/L1_config/logging_config.py carries the same pipeline classes: the
+backend is built and deployed from this directory on its own (Dockerfile,
+render.yaml) and cannot import tools/. test_logging_config checks that
+the two copies stay identical.
+
+Configured once by main.py before the rest of the app is imported.
+"""
+
+from collections import Counter
+from logging.handlers import QueueHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+import structlog
+
+from .metrics import register_collector
+from .system_config import LOG_FORMAT as DEFAULT_LOG_FORMAT, LOG_LEVEL as DEFAULT_LOG_LEVEL
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL).upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", DEFAULT_LOG_FORMAT).lower()  # json | console
+LOG_FILE = os.getenv("LOG_FILE", "")  # empty = stdout only
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# event=fraction kept / event=max per second; applied to DEBUG and INFO only
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "ai_cache_hit=0.1,ai_cache_set=0.1,ai_cache_expired=0.1")
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "cattle_created=50,event_created=50,request_queries=20")
+
+
+def _parse_event_map(value: str) -> Dict[str, float]:
+    """"a=0.1,b=5" -> {"a": 0.1, "b": 5.0}"""
+    parsed = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            parsed[name.strip()] = float(number)
+    return parsed
+
+
+class LogStats:
+    """Pipeline counters: records written and records dropped, by reason"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped_queue_full = 0
+        self.sampled_out: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+
+    def count(self, field: str, event: Optional[str] = None, amount: int = 1):
+        with self._lock:
+            if event is None:
+                setattr(self, field, getattr(self, field) + amount)
+            else:
+                getattr(self, field)[event] += amount
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped_queue_full": self.dropped_queue_full,
+                "dropped_total": self.dropped_queue_full
+                + sum(self.sampled_out.values()) + sum(self.rate_limited.values()),
+                "sampled_out": dict(self.sampled_out),
+                "rate_limited": dict(self.rate_limited),
+            }
+
+
+class EventSampler:
+    """
+    structlog processor keeping a random fraction of some events and
+    capping others at N per second. Warnings and errors always pass.
+    """
+
+    def __init__(self, stats: LogStats, sample_rates: Dict[str, float], rate_limits: Dict[str, float]):
+        self.stats = stats
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self._windows: Dict[str, List[float]] = {}  # event -> [window start, count]
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name not in ("debug", "info"):
+            return event_dict
+        event = event_dict.get("event")
+
+        rate = self.sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            self.stats.count("sampled_out", event)
+            raise structlog.DropEvent
+
+        limit = self.rate_limits.get(event)
+        if limit is not None:
+            now = time.monotonic()
+            with self._lock:
+                window = self._windows.setdefault(event, [now, 0])
+                if now - window[0] >= 1.0:
+                    window[0], window[1] = now, 0
+                window[1] += 1
+                over = window[1] > limit
+            if over:
+                self.stats.count("rate_limited", event)
+                raise structlog.DropEvent
+
+        return event_dict
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue unformatted records; drop (and count) when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue, stats: LogStats):
+        super().__init__(log_queue)
+        self.stats = stats
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Rendering happens on the writer thread, except for the traceback:
+        # it has to be captured while the exception is still being handled
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats.count("dropped_queue_full")
+
+
+class RotatingLogFile:
+    """Append-only file rotated to .1 ... .N once it passes max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self._size = self._stream.tell()
+
+    def write(self, text: str):
+        if self.max_bytes and self._size and self._size + len(text) > self.max_bytes:
+            self._rotate()
+        self._stream.write(text)
+        self._size += len(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def close(self):
+        self._stream.close()
+
+    def _rotate(self):
+        self._stream.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+
+class BatchingLogWriter(threading.Thread):
+    """Drains the queue, renders records and writes each batch once per output"""
+
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, formatter: logging.Formatter, outputs: List[Any],
+                 stats: LogStats, batch_size: int = 256, flush_interval: float = 0.2):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.formatter = formatter
+        self.outputs = outputs
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write([record for record in batch if record is not self._STOP])
+            if batch[-1] is self._STOP:
+                for output in self.outputs:
+                    if isinstance(output, RotatingLogFile):
+                        output.close()
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record) + "\n")
+            except Exception:
+                lines.append(f"log formatting failed: {record.getMessage()!r}\n")
+        if not lines:
+            return
+        text = "".join(lines)
+        for output in self.outputs:
+            try:
+                output.write(text)
+                output.flush()
+            except Exception as e:
+                sys.stderr.write(f"log write failed: {e}\n")
+        self.stats.count("written", amount=len(lines))
+
+    def stop(self, timeout: float = 5.0):
+        """Write what is queued, then stop"""
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.join(timeout)
+
+
+def _add_foreign_exception(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """foreign_pre_chain processor: traceback of a stdlib record, rendered by prepare()"""
+    record = event_dict.get("_record")
+    if record is not None and record.exc_text:
+        event_dict["exception"] = record.exc_text
+    return event_dict
+
+
+_traceback_formatter = logging.Formatter()
+_stats = LogStats()
+_writer: Optional[BatchingLogWriter] = None
+
+
+def _shared_processors() -> List[Any]:
+    """Run on the caller for structlog events, on the writer for stdlib records"""
+    return [
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso" if LOG_FORMAT == "json" else "%Y-%m-%d %H:%M:%S"),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+    ]
+
+
+def _build_formatter(shared_processors: List[Any]) -> logging.Formatter:
+    renderer = structlog.processors.JSONRenderer() if LOG_FORMAT == "json" \
+        else structlog.dev.ConsoleRenderer(colors=sys.stdout.isatty(),
+                                           exception_formatter=structlog.dev.plain_traceback)
+    return structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=shared_processors + [_add_foreign_exception],
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, renderer],
+    )
+
+
+def configure_logging():
+    """Route structlog and stdlib logging through the background writer (idempotent)"""
+    global _writer
+    if _writer is not None:
+        return
+
+    shared_processors = _shared_processors()
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            EventSampler(_stats, _parse_event_map(LOG_SAMPLE_RATES), _parse_event_map(LOG_RATE_LIMITS)),
+        ] + shared_processors + [
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    formatter = _build_formatter(shared_processors)
+
+    outputs: List[Any] = [sys.stdout]
+    if LOG_FILE:
+        outputs.append(RotatingLogFile(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _writer = BatchingLogWriter(log_queue, formatter, outputs, _stats)
+    _writer.start()
+    atexit.register(_writer.stop)
+
+    handler = NonBlockingQueueHandler(log_queue, _stats)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    # One INFO line per PostgREST request otherwise
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+
+def get_log_stats() -> Dict[str, Any]:
+    """Records written, dropped by reason, and currently queued"""
+    return {**_stats.as_dict(), "queued": _writer.queue.qsize() if _writer else 0}
+
+
+def _collect_metrics():
+    stats = get_log_stats()
+    dropped = [({"reason": "queue_full", "event": ""}, stats["dropped_queue_full"])]
+    dropped += [({"reason": "sampled", "event": event}, n) for event, n in stats["sampled_out"].items()]
+    dropped += [({"reason": "rate_limited", "event": event}, n) for event, n in stats["rate_limited"].items()]
+    return [
+        ("log_records_written_total", "counter", "Log records written by the background writer",
+         [({}, stats["written"])]),
+        ("log_records_dropped_total", "counter", "Log records dropped before writing", dropped),
+        ("log_queue_depth", "gauge", "Log records waiting for the writer", [({}, stats["queued"])]),
+    ]
+
+
+register_collector(_collect_metrics)
@@ -0,0 +1,184 @@
+"""
+Columnar Snapshots for the Mock Supabase Store
+
+Saves MockSupabaseClient tables to a single file and loads them back
+memory-mapped, so large fixtures start in well under a second and test
+runs can share one frozen dataset.
+
+File layout:
+    MAGIC | u32 header length | JSON header | column blocks
+
+Each column is dictionary-encoded: a marshal'd list of distinct values
+plus one uint32 code per row, read straight from the mmap. Columns with
+unhashable values (dicts, lists) are stored as a marshal'd {row: value}
+dict. Loaded rows stay in the file until a query returns or updates them.
+
+Bulk generators can hand over columns that are already dictionary-encoded
+by implementing encoded_column(column) -> (values, uint32 codes) on their
+tables; returning None falls back to column_values().
+"""
+
+from array import array
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Tuple
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"ERPMOCK1"
+ABSENT = 0xFFFFFFFF  # code for "row has no such key"
+
+
+class FrozenColumns:
+    """Read-only columnar view of one table in a mapped snapshot"""
+
+    def __init__(self, n_rows: int, columns: Dict[str, Tuple[str, Any, Any]], mapping: mmap.mmap):
+        self.n_rows = n_rows
+        # column -> ("dict", values, codes) or ("plain", {rid: value}, None)
+        self._columns = columns
+        self.columns = list(columns)
+        # Keep the mapping alive for as long as the code views are used
+        self._mapping = mapping
+
+    def get(self, rid: int, column: str, default: Any = None) -> Any:
+        kind, values, codes = self._columns.get(column, ("plain", {}, None))
+        if kind == "plain":
+            return values.get(rid, default)
+        code = codes[rid]
+        return default if code == ABSENT else values[code]
+
+    def row(self, rid: int) -> Dict:
+        row = {}
+        for column, (kind, values, codes) in self._columns.items():
+            if kind == "plain":
+                if rid in values:
+                    row[column] = values[rid]
+            else:
+                code = codes[rid]
+                if code != ABSENT:
+                    row[column] = values[code]
+        return row
+
+    def column_items(self, column: str, default: Any = None) -> Iterator[Tuple[int, Any]]:
+        kind, values, codes = self._columns.get(column, ("plain", {}, None))
+        if kind == "plain":
+            for rid in range(self.n_rows):
+                yield rid, values.get(rid, default)
+            return
+        decoded = values + [default]
+        absent = len(values)
+        for rid, code in enumerate(codes):
+            yield rid, decoded[code if code != ABSENT else absent]
+
+
+def _encode_column(table, column: str) -> Tuple[str, bytes, bytes]:
+    missing = object()
+    values = table.column_values(column, missing)
+
+    try:
+        if len(set(map(type, values)) - {type(None), object}) > 1:
+            # Mixed types: key by type too so 1, 1.0 and True keep their own entries
+            keys = [(type(value), value) for value in values]
+            unwrap = itemgetter(1)
+        else:
+            keys, unwrap = values, None
+        
+        missing_key = (type(missing), missing) if unwrap else missing
+        distinct = [key for key in dict.fromkeys(keys) if key is not missing_key]
+        positions: Dict[Any, int] = dict(zip(distinct, range(len(distinct))))
+        positions[missing_key] = ABSENT
+        codes = array("I", map(positions.__getitem__, keys))
+        if unwrap:
+            distinct = [unwrap(key) for key in distinct]
+        return "dict", marshal.dumps(distinct), codes.tobytes()
+    except TypeError:
+        present = {i: value for i, value in enumerate(values) if value is not missing}
+        return "plain", marshal.dumps(present), b""
+
+
+def save_snapshot(storage: Dict[str, Any], path: str):
+    """
+    Write every table in storage (name -> IndexedTable) to path.
+
+    Written to a temporary file and renamed, so readers that have the old
+    snapshot mapped are not affected.
+    """
+    header = {"byteorder": sys.byteorder, "tables": {}}
+    blocks: List[bytes] = []
+    offset = 0
+
+    def _add(blob: bytes) -> Tuple[int, int]:
+        nonlocal offset
+        padding = -offset % 8
+        if padding:
+            blocks.append(b"\0" * padding)
+            offset += padding
+        blocks.append(blob)
+        start, offset = offset, offset + len(blob)
+        return start, len(blob)
+
+    for name, table in storage.items():
+        columns = {}
+        encoder = getattr(table, "encoded_column", None)
+        for column in table.columns():
+            encoded = encoder(column) if encoder else None
+            if encoded is not None:
+                values, codes = encoded
+                kind, values_blob, codes_blob = "dict", marshal.dumps(values), codes.tobytes()
+            else:
+                kind, values_blob, codes_blob = _encode_column(table, column)
+            columns[column] = {
+                "kind": kind,
+                "values": _add(values_blob),
+                "codes": _add(codes_blob),
+            }
+        header["tables"][name] = {"rows": len(table), "columns": columns}
+
+    header_blob = json.dumps(header).encode()
+    prefix = MAGIC + struct.pack("<I", len(header_blob)) + header_blob
+    prefix += b"\0" * (-len(prefix) % 8)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> Dict[str, FrozenColumns]:
+    """Map a snapshot file; returns table name -> FrozenColumns"""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapping[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a mock store snapshot")
+
+    (header_len,) = struct.unpack_from("<I", mapping, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(mapping[header_start:header_start + header_len])
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+
+    data_start = header_start + header_len
+    data_start += -data_start % 8
+    view = memoryview(mapping)
+
+    tables = {}
+    for name, meta in header["tables"].items():
+        columns = {}
+        for column, spec in meta["columns"].items():
+            values_start, values_len = spec["values"]
+            values = marshal.loads(view[data_start + values_start:data_start + values_start + values_len])
+            if spec["kind"] == "plain":
+                columns[column] = ("plain", values, None)
+            else:
+                codes_start, codes_len = spec["codes"]
+                codes = view[data_start + codes_start:data_start + codes_start + codes_len].cast("I")
+                columns[column] = ("dict", values, codes)
+        tables[name] = FrozenColumns(meta["rows"], columns, mapping)
+
+    return tables
@@ -2,112 +2,561 @@
 Mock Supabase Client for Testing Without Real Database
 
 This allows the app to run and be tested without a real Supabase instance.
+
+Tables are small in-memory query engines: per-column hash indexes answer
+eq/in_ filters and sorted indexes answer order+range and gt/lt, so a
+50k-animal fixture stays fast enough for local benchmarks. Indexes are
+built on the first query that needs them and maintained on every
+insert/update/delete after that.
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from datetime import date, datetime
+from enum import Enum
+import atexit
+import os
+import re
 import uuid
 
+import structlog
+
+from .mock_snapshot import load_snapshot, save_snapshot
+
+logger = structlog.get_logger()
+
+# Optional snapshot file to load the store from (see mock_snapshot)
+MOCK_DB_SNAPSHOT = os.getenv("MOCK_DB_SNAPSHOT")
+# Save the store back to MOCK_DB_SNAPSHOT on exit
+MOCK_DB_PERSIST = os.getenv("MOCK_DB_PERSIST", "false").lower() == "true"
+
 
 class MockResponse:
     """Mock Supabase response"""
     def __init__(self, data: List[Dict] = None, count: int = None):
         self.data = data or []
-        self.count = count or len(self.data)
+        self.count = count if count is not None else len(self.data)
+
+
+def _to_json(value: Any) -> Any:
+    """Value as PostgREST stores it (dates and enums arrive as JSON strings)"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _index_entry(value: Any, rid: int) -> Tuple[bool, Any, int]:
+    """Sorted index entry; NULLs sort last (PostgreSQL default for ascending order)"""
+    return (value is None, value, rid)
+
+
+class IndexedTable:
+    """
+    Row storage for one mock table.
+
+    Rows are keyed by an internal row id (insertion sequence), so index
+    entries stay valid when rows are updated in place. A table can sit on
+    top of a frozen columnar snapshot (see mock_snapshot): snapshot rows are
+    only turned into dicts when a query returns or updates them.
+    """
+
+    def __init__(self, rows: Iterable[Dict] = (), base=None):
+        # Frozen snapshot columns (rids 0..base_rows-1), may be None
+        self._base = base
+        self._base_rows = base.n_rows if base is not None else 0
+        # Materialized snapshot rows and every row inserted since
+        self._rows: Dict[int, Dict] = {}
+        # Deleted snapshot rids
+        self._deleted: Set[int] = set()
+        self._next_rid = self._base_rows
+        self._count = self._base_rows
+        # column -> value -> row ids
+        self._hash: Dict[str, Dict[Any, Set[int]]] = {}
+        # column -> sorted [(is_null, value, rid)]
+        self._sorted: Dict[str, List[Tuple[bool, Any, int]]] = {}
+        # columns holding unhashable values (dicts, lists) fall back to scans
+        self._unhashable: Set[str] = set()
+
+        for row in rows:
+            self.insert(row)
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ------------------------------------------------------------------
+    # Row access
+    # ------------------------------------------------------------------
+
+    def rids(self) -> Iterator[int]:
+        """Live row ids in insertion order"""
+        if self._base_rows:
+            deleted = self._deleted
+            for rid in range(self._base_rows):
+                if rid not in deleted:
+                    yield rid
+        for rid in self._rows:
+            if rid >= self._base_rows:
+                yield rid
+
+    def row(self, rid: int) -> Dict:
+        """Row dict (materialized from the snapshot on first access)"""
+        row = self._rows.get(rid)
+        if row is None:
+            if rid >= self._base_rows or rid in self._deleted:
+                raise KeyError(rid)
+            row = self._base.row(rid)
+            self._rows[rid] = row
+        return row
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """All live rows (materializes snapshot rows)"""
+        for rid in self.rids():
+            yield self.row(rid)
+
+    def get(self, rid: int, column: str, default: Any = None) -> Any:
+        """Single column value without materializing the row"""
+        row = self._rows.get(rid)
+        if row is not None:
+            return row.get(column, default)
+        return self._base.get(rid, column, default)
+
+    def column_items(self, column: str, default: Any = None) -> Iterator[Tuple[int, Any]]:
+        """(rid, value) for every live row (not in rid order once snapshot rows change)"""
+        if self._base_rows:
+            skip = self._deleted | {rid for rid in self._rows if rid < self._base_rows}
+            for rid, value in self._base.column_items(column, default):
+                if rid not in skip:
+                    yield rid, value
+        for rid, row in self._rows.items():
+            yield rid, row.get(column, default)
+
+    def column_values(self, column: str, default: Any = None) -> List[Any]:
+        """Values of one column for every live row, in rid order"""
+        if not self._base_rows:
+            return [row.get(column, default) for row in self._rows.values()]
+        items = sorted(self.column_items(column, default), key=itemgetter(0))
+        return [value for _, value in items]
+
+    def columns(self) -> List[str]:
+        """Every column name seen in the table"""
+        seen = dict.fromkeys(self._base.columns if self._base is not None else ())
+        for row in self._rows.values():
+            seen.update(row)
+        return list(seen)
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def hash_index(self, column: str) -> Optional[Dict[Any, Set[int]]]:
+        """Equality index for a column (built on first use)"""
+        if column in self._unhashable:
+            return None
+        index = self._hash.get(column)
+        if index is None:
+            index = {}
+            try:
+                for rid, value in self.column_items(column):
+                    index.setdefault(value, set()).add(rid)
+            except TypeError:
+                self._unhashable.add(column)
+                return None
+            self._hash[column] = index
+        return index
+
+    def sorted_index(self, column: str) -> List[Tuple[bool, Any, int]]:
+        """Ordered index for a column (built on first use)"""
+        index = self._sorted.get(column)
+        if index is None:
+            items = sorted(self.column_items(column), key=itemgetter(0))
+            # Stable key sort keeps rid order among equal values, which
+            # matches full entry ordering without tuple comparisons
+            index = [(False, value, rid) for rid, value in items if value is not None]
+            index.sort(key=itemgetter(1))
+            index.extend((True, None, rid) for rid, value in items if value is None)
+            self._sorted[column] = index
+        return index
+
+    def _index_row(self, rid: int, row: Dict, columns: Optional[Iterable[str]] = None):
+        unhashable = []
+        for column, index in self._hash.items():
+            if columns is None or column in columns:
+                try:
+                    index.setdefault(row.get(column), set()).add(rid)
+                except TypeError:
+                    unhashable.append(column)
+        for column in unhashable:
+            self._hash.pop(column)
+            self._unhashable.add(column)
+        for column, index in self._sorted.items():
+            if columns is None or column in columns:
+                insort(index, _index_entry(row.get(column), rid))
+
+    def _unindex_row(self, rid: int, row: Dict, columns: Optional[Iterable[str]] = None):
+        for column, index in self._hash.items():
+            if columns is None or column in columns:
+                bucket = index.get(row.get(column))
+                if bucket is not None:
+                    bucket.discard(rid)
+                    if not bucket:
+                        del index[row.get(column)]
+        for column, index in self._sorted.items():
+            if columns is None or column in columns:
+                entry = _index_entry(row.get(column), rid)
+                pos = bisect_left(index, entry)
+                if pos < len(index) and index[pos] == entry:
+                    del index[pos]
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def insert(self, row: Dict) -> int:
+        rid = self._next_rid
+        self._next_rid += 1
+        self._rows[rid] = row
+        self._count += 1
+        self._index_row(rid, row)
+        return rid
+
+    def update(self, rid: int, data: Dict):
+        row = self.row(rid)
+        columns = set(data)
+        self._unindex_row(rid, row, columns)
+        row.update(data)
+        self._index_row(rid, row, columns)
+
+    def delete(self, rid: int):
+        row = self.row(rid)
+        del self._rows[rid]
+        if rid < self._base_rows:
+            self._deleted.add(rid)
+        self._count -= 1
+        self._unindex_row(rid, row)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def lookup(self, column: str, values: Iterable[Any]) -> Optional[Set[int]]:
+        """Row ids whose column is one of values (None if not indexable)"""
+        index = self.hash_index(column)
+        if index is None:
+            return None
+        rids: Set[int] = set()
+        for value in values:
+            bucket = index.get(value)
+            if bucket:
+                rids |= bucket
+        return rids
+
+    def range_lookup(self, column: str, op: str, value: Any) -> List[int]:
+        """Row ids matching a gt/gte/lt/lte bound, via the sorted index"""
+        index = self.sorted_index(column)
+        lowest, highest = _index_entry(value, -1), _index_entry(value, float("inf"))
+        nulls = bisect_left(index, _index_entry(None, -1))
+        if op == "gt":
+            start, end = bisect_right(index, highest), nulls
+        elif op == "gte":
+            start, end = bisect_left(index, lowest), nulls
+        elif op == "lt":
+            start, end = 0, bisect_left(index, lowest)
+        else:  # lte
+            start, end = 0, bisect_right(index, highest)
+        return [entry[2] for entry in index[start:end]]
+
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "in": lambda a, b: a in b,
+}
+
+# "*, cattle!inner(ranch_id)" -> embedded resource "cattle", inner join
+_EMBED_RE = re.compile(r"(\w+)(!inner)?\(([^)]*)\)")
 
 
 class MockTable:
-    """Mock Supabase table"""
-    def __init__(self, name: str, storage: Dict):
+    """Mock Supabase table (query builder)"""
+    def __init__(self, name: str, storage: Dict[str, IndexedTable]):
         self.name = name
         self.storage = storage
         self._query = {}
-        self._filters = []
-    
-    def select(self, columns: str = "*", count: str = None):
-        """Mock select"""
-        self._query["select"] = columns
+        self._filters: List[Tuple[str, str, Any]] = []
+
+    @property
+    def _table(self) -> IndexedTable:
+        return self.storage[self.name]
+
+    def _related(self, name: str) -> IndexedTable:
+        if name not in self.storage:
+            self.storage[name] = IndexedTable()
+        return self.storage[name]
+
+    def select(self, *columns: str, count: str = None):
+        """Mock select ("*", "id, name" or "*, cattle!inner(ranch_id)")"""
+        self._query["select"] = ",".join(columns) or "*"
         self._query["count"] = count
         return self
-    
-    def insert(self, data: Dict):
-        """Mock insert"""
-        if "id" not in data:
-            data["id"] = str(uuid.uuid4())
-        self.storage[self.name].append(data)
-        return MockResponse([data])
-    
+
+    def insert(self, data):
+        """Mock insert (applied on execute)"""
+        self._query["insert"] = _to_json(data if isinstance(data, list) else [data])
+        return self
+
     def update(self, data: Dict):
-        """Mock update"""
-        # Find and update matching records
-        updated = []
-        for item in self.storage[self.name]:
-            matches = all(
-                item.get(k) == v 
-                for k, v in self._filters
-            )
-            if matches:
-                item.update(data)
-                updated.append(item)
-        return MockResponse(updated)
-    
+        """Mock update (applied on execute to rows matching the filters)"""
+        self._query["update"] = _to_json(data)
+        return self
+
+    def delete(self):
+        """Mock delete (applied on execute to rows matching the filters)"""
+        self._query["delete"] = True
+        return self
+
     def eq(self, column: str, value: Any):
         """Mock equality filter"""
-        self._filters.append((column, value))
+        self._filters.append((column, "eq", value))
         return self
-    
+
+    def neq(self, column: str, value: Any):
+        """Mock inequality filter"""
+        self._filters.append((column, "neq", value))
+        return self
+
+    def gt(self, column: str, value: Any):
+        """Mock greater-than filter"""
+        self._filters.append((column, "gt", value))
+        return self
+
+    def gte(self, column: str, value: Any):
+        """Mock greater-or-equal filter"""
+        self._filters.append((column, "gte", value))
+        return self
+
+    def lt(self, column: str, value: Any):
+        """Mock less-than filter"""
+        self._filters.append((column, "lt", value))
+        return self
+
+    def lte(self, column: str, value: Any):
+        """Mock less-or-equal filter"""
+        self._filters.append((column, "lte", value))
+        return self
+
+    def in_(self, column: str, values: List[Any]):
+        """Mock membership filter"""
+        self._filters.append((column, "in", list(values)))
+        return self
+
     def order(self, column: str, desc: bool = False):
         """Mock order"""
         self._query["order"] = (column, desc)
         return self
-    
+
     def limit(self, count: int):
         """Mock limit"""
         self._query["limit"] = count
         return self
-    
+
     def range(self, start: int, end: int):
         """Mock range"""
         self._query["range"] = (start, end)
         return self
-    
+
     def execute(self):
         """Execute query"""
-        results = self.storage[self.name]
-        
-        # Apply filters
-        for column, value in self._filters:
-            results = [r for r in results if r.get(column) == value]
-        
-        # Apply order
-        if "order" in self._query:
-            column, desc = self._query["order"]
-            results = sorted(
-                results, 
-                key=lambda x: x.get(column, ""),
-                reverse=desc
-            )
-        
-        # Apply range/limit
+        try:
+            if "insert" in self._query:
+                return self._execute_insert(self._query["insert"])
+            if "update" in self._query:
+                rids = self._matching_rids()
+                for rid in rids:
+                    self._table.update(rid, self._query["update"])
+                return MockResponse([dict(self._table.row(rid)) for rid in sorted(rids)])
+            if "delete" in self._query:
+                rids = self._matching_rids()
+                deleted = [dict(self._table.row(rid)) for rid in sorted(rids)]
+                for rid in rids:
+                    self._table.delete(rid)
+                return MockResponse(deleted)
+            return self._execute_select()
+        finally:
+            # Reset for next query
+            self._filters = []
+            self._query = {}
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _execute_insert(self, rows: List[Dict]) -> MockResponse:
+        inserted = []
+        for data in rows:
+            row = dict(data)
+            if "id" not in row:
+                row["id"] = str(uuid.uuid4())
+            self._table.insert(row)
+            inserted.append(dict(row))
+        return MockResponse(inserted)
+
+    def _execute_select(self) -> MockResponse:
+        table = self._table
+        candidates = self._matching_rids()
+
+        start, stop = 0, None
         if "range" in self._query:
             start, end = self._query["range"]
-            results = results[start:end+1]
+            stop = end + 1
         elif "limit" in self._query:
-            results = results[:self._query["limit"]]
-        
-        # Reset for next query
-        self._filters = []
-        self._query = {}
-        
-        return MockResponse(results, len(results))
+            stop = self._query["limit"]
+
+        # Exact count comes from the row id set; rows are only built for the page
+        count = len(candidates) if candidates is not None else len(table)
+
+        rids = self._ordered_rids(candidates, stop)
+        page = rids[start:stop]
+
+        columns, embeds = self._parse_select(self._query.get("select", "*"))
+        data = [self._project(table.row(rid), columns, embeds) for rid in page]
+
+        return MockResponse(data, count if self._query.get("count") == "exact" else None)
+
+    def _ordered_rids(self, candidates: Optional[Set[int]], stop: Optional[int]) -> List[int]:
+        """Row ids in result order, materializing at most `stop` of them when possible"""
+        table = self._table
+        if "order" not in self._query:
+            if candidates is not None:
+                return sorted(candidates)
+            return list(islice(table.rids(), stop))
+
+        column, desc = self._query["order"]
+
+        # Few candidates: sorting them beats walking the whole index
+        if candidates is not None and len(candidates) * 8 < len(table):
+            return sorted(
+                candidates,
+                key=lambda rid: _index_entry(table.get(rid, column), rid),
+                reverse=desc
+            )
+
+        index = table.sorted_index(column)
+        walk = reversed(index) if desc else iter(index)
+        rids = []
+        for _, _, rid in walk:
+            if candidates is None or rid in candidates:
+                rids.append(rid)
+                if stop is not None and len(rids) >= stop:
+                    break
+        return rids
+
+    def _matching_rids(self) -> Optional[Set[int]]:
+        """Row ids matching all filters (None = every row)"""
+        table = self._table
+        candidates: Optional[Set[int]] = None
+        residual = []
+
+        # Indexed filters first, smallest result narrows the rest
+        for column, op, value in self._filters:
+            rids = None
+            if "." in column:
+                rids = self._embedded_lookup(column, op, value)
+            elif op in ("eq", "in"):
+                rids = table.lookup(column, [value] if op == "eq" else value)
+            elif op in ("gt", "gte", "lt", "lte") and candidates is None:
+                rids = set(table.range_lookup(column, op, value))
+
+            if rids is None:
+                residual.append((column, op, value))
+            else:
+                candidates = rids if candidates is None else candidates & rids
+
+            if candidates is not None and not candidates:
+                return candidates
+
+        for column, op, value in residual:
+            compare = _COMPARATORS[op]
+            if candidates is None:
+                candidates = {rid for rid, v in table.column_items(column) if compare(v, value)}
+            else:
+                candidates = {rid for rid in candidates if compare(table.get(rid, column), value)}
+
+        return candidates
+
+    def _embedded_lookup(self, column: str, op: str, value: Any) -> Optional[Set[int]]:
+        """Filter on an embedded resource column, e.g. eq("cattle.ranch_id", ...)"""
+        relation, related_column = column.split(".", 1)
+        related = self._related(relation)
+        fk = self._foreign_key(relation)
+
+        if op in ("eq", "in"):
+            related_rids = related.lookup(related_column, [value] if op == "eq" else value)
+        else:
+            related_rids = None
+        if related_rids is None:
+            compare = _COMPARATORS[op]
+            related_rids = {rid for rid, v in related.column_items(related_column) if compare(v, value)}
+
+        related_ids = [related.get(rid, "id") for rid in related_rids]
+        return self._table.lookup(fk, related_ids)
+
+    @staticmethod
+    def _foreign_key(relation: str) -> str:
+        """Column referencing an embedded table ("cattle" -> "cattle_id", "ranches" -> "ranch_id")"""
+        if relation.endswith("es") and not relation.endswith("ses"):
+            singular = relation[:-2] if relation.endswith("hes") else relation[:-1]
+        elif relation.endswith("s"):
+            singular = relation[:-1]
+        else:
+            singular = relation
+        return f"{singular}_id"
+
+    @staticmethod
+    def _parse_select(select: str) -> Tuple[Optional[List[str]], List[Tuple[str, bool, Optional[List[str]]]]]:
+        """Split a select string into plain columns (None = all) and embeds"""
+        embeds = []
+        for name, inner, cols in _EMBED_RE.findall(select):
+            cols = [c.strip() for c in cols.split(",") if c.strip()]
+            embeds.append((name, bool(inner), None if not cols or cols == ["*"] else cols))
+        plain = [c.strip() for c in _EMBED_RE.sub("", select).split(",") if c.strip()]
+        columns = None if not plain or "*" in plain else plain
+        return columns, embeds
+
+    def _project(self, row: Dict, columns: Optional[List[str]], embeds) -> Dict:
+        result = dict(row) if columns is None else {c: row.get(c) for c in columns}
+        for name, _, cols in embeds:
+            related = self._related(name)
+            rids = related.lookup("id", [row.get(self._foreign_key(name))]) or set()
+            match = related.row(min(rids)) if rids else None
+            if match is None:
+                result[name] = None
+            else:
+                result[name] = dict(match) if cols is None else {c: match.get(c) for c in cols}
+        return result
 
 
 class MockSupabaseClient:
     """Mock Supabase client with in-memory storage"""
-    
-    def __init__(self):
+
+    def __init__(self, storage: Optional[Dict[str, IndexedTable]] = None):
+        if storage is not None:
+            self.storage = storage
+            return
+        
         # In-memory storage
-        self.storage = {
+        seed = {
             "ranches": [
                 {
                     "id": "ranch-1",
@@ -177,12 +626,44 @@ class MockSupabaseClient:
             "user_profiles": [],
             "sync_queue": []
         }
-    
+        self.storage: Dict[str, IndexedTable] = {
+            name: IndexedTable(rows) for name, rows in seed.items()
+        }
+
     def table(self, name: str):
         """Get table"""
         if name not in self.storage:
-            self.storage[name] = []
+            self.storage[name] = IndexedTable()
         return MockTable(name, self.storage)
+    
+    @classmethod
+    def from_snapshot(cls, path: str) -> "MockSupabaseClient":
+        """Client backed by a frozen snapshot; writes stay in memory"""
+        tables = load_snapshot(path)
+        return cls({name: IndexedTable(base=columns) for name, columns in tables.items()})
+    
+    def save_snapshot(self, path: str):
+        """Write the current contents of every table to a snapshot file"""
+        save_snapshot(self.storage, path)
+        logger.info("mock_snapshot_saved", path=path, tables=len(self.storage))
+
+
+class AsyncMockTable(MockTable):
+    """Mock table whose execute() is awaitable, like postgrest's async builders"""
+    async def execute(self):
+        return super().execute()
+
+
+class AsyncMockSupabaseClient:
+    """Async view over a MockSupabaseClient (shares its storage)"""
+    
+    def __init__(self, client: MockSupabaseClient):
+        self.client = client
+    
+    def table(self, name: str):
+        """Get table"""
+        self.client.table(name)
+        return AsyncMockTable(name, self.client.storage)
 
 
 # Singleton instance
@@ -190,8 +671,20 @@ _mock_client = None
 
 
 def get_mock_supabase():
-    """Get mock Supabase client"""
+    """
+    Get mock Supabase client.
+    
+    Loads MOCK_DB_SNAPSHOT when it points at an existing snapshot; with
+    MOCK_DB_PERSIST=true the store is written back to it on exit.
+    """
     global _mock_client
     if _mock_client is None:
-        _mock_client = MockSupabaseClient()
+        if MOCK_DB_SNAPSHOT and os.path.exists(MOCK_DB_SNAPSHOT):
+            _mock_client = MockSupabaseClient.from_snapshot(MOCK_DB_SNAPSHOT)
+            logger.info("mock_snapshot_loaded", path=MOCK_DB_SNAPSHOT)
+        else:
+            _mock_client = MockSupabaseClient()
+        
+        if MOCK_DB_SNAPSHOT and MOCK_DB_PERSIST:
+            atexit.register(_mock_client.save_snapshot, MOCK_DB_SNAPSHOT)
     return _mock_client
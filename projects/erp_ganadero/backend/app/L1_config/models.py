@@ -4,7 +4,7 @@ SQLAlchemy Database Models for ERP Ganadero
 All database tables defined using SQLAlchemy ORM.
 """
 
-from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime, date
@@ -216,6 +216,55 @@ class InventoryItem(Base):
     
     # Relationships
     ranch = relationship("Ranch", back_populates="inventory")
+    
+    __table_args__ = (
+        # Partial index mirroring database/performance_indexes.sql: only
+        # items at or below their reorder point are indexed, so the
+        # low-stock query stays small even with thousands of SKUs.
+        Index(
+            "idx_inventory_low_stock",
+            "ranch_id",
+            "quantity",
+            sqlite_where=quantity <= min_stock,
+            postgresql_where=quantity <= min_stock,
+        ),
+    )
+
+
+class InventoryMovement(Base):
+    """Quantity change on an inventory item (negative delta = consumption)"""
+    __tablename__ = "inventory_movements"
+    
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    ranch_id = Column(String(36), ForeignKey("ranches.id"), nullable=False)
+    item_id = Column(String(36), ForeignKey("inventory.id", ondelete="CASCADE"), nullable=False)
+    delta = Column(Float, nullable=False)
+    quantity_after = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_inventory_movements_ranch_date", "ranch_id", "created_at"),
+    )
+
+
+class InventoryAlert(Base):
+    """Emitted when an item crosses its min_stock threshold"""
+    __tablename__ = "inventory_alerts"
+    
+    # Monotonic poll cursor: assigned by the database at insert, unlike the random id
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String(36), unique=True, nullable=False, default=generate_uuid)
+    ranch_id = Column(String(36), ForeignKey("ranches.id"), nullable=False)
+    item_id = Column(String(36), ForeignKey("inventory.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # low_stock, restocked
+    quantity = Column(Float, nullable=False)
+    min_stock = Column(Float)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_inventory_alerts_ranch_date", "ranch_id", "created_at"),
+        Index("idx_inventory_alerts_ranch_seq", "ranch_id", "seq"),
+    )
 
 
 # ============================================================================
@@ -264,3 +313,29 @@ class Worker(Base):
     
     # Relationships
     ranch = relationship("Ranch", back_populates="workers")
+
+
+# ============================================================================
+# AI Usage Models
+# ============================================================================
+
+class AIUsageDaily(Base):
+    """Daily rollup of AI calls, tokens and estimated cost per ranch, provider and analysis type"""
+    __tablename__ = "ai_usage_daily"
+    
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    day = Column(Date, nullable=False)
+    ranch_id = Column(String(36), nullable=False)  # no FK: demo and unassigned calls have no ranch row
+    provider = Column(String(100), nullable=False)  # model label, e.g. gemini-pro, ollama/llama3
+    analysis = Column(String(50), nullable=False)
+    calls = Column(Integer, default=0, nullable=False)
+    cache_hits = Column(Integer, default=0, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    response_tokens = Column(Integer, default=0, nullable=False)
+    cost_usd = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("day", "ranch_id", "provider", "analysis", name="uq_ai_usage_daily_key"),
+        Index("idx_ai_usage_daily_ranch_day", "ranch_id", "day"),
+    )
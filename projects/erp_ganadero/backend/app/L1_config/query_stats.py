@@ -0,0 +1,164 @@
+"""
+ERP Ganadero - Per-Request Query Stats (L1 Configuration)
+
+Attributes every SQL statement (engine hooks in database.py) and PostgREST
+request (supabase_http) to the HTTP request that issued it: query count,
+total DB time, the slowest statements, and how often each statement shape
+ran. A shape repeated more than N_PLUS_ONE_THRESHOLD times in one request
+is reported as a likely N+1.
+
+With DEBUG=true responses carry X-DB-Query-Count, X-DB-Time-Ms and a
+Server-Timing entry. N_PLUS_ONE_RAISE=true turns detections into errors
+(for CI runs); tests can use assert_queries() directly.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import heapq
+import os
+import re
+import time
+
+import structlog
+
+logger = structlog.get_logger()
+
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+N_PLUS_ONE_RAISE = os.getenv("N_PLUS_ONE_RAISE", "false").lower() == "true"
+SLOW_STATEMENTS_KEPT = 3
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(RuntimeError):
+    """Same statement shape repeated past the threshold (N_PLUS_ONE_RAISE / assert_queries)"""
+
+
+def statement_shape(statement: str) -> str:
+    """Statement with literals and IN-list lengths folded, for repeat counting"""
+    shape = _LITERALS.sub("?", statement)
+    shape = _IN_LISTS.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Queries issued while handling one request"""
+
+    def __init__(self, threshold: int = N_PLUS_ONE_THRESHOLD, raise_on_repeat: bool = N_PLUS_ONE_RAISE):
+        self.threshold = threshold
+        self.raise_on_repeat = raise_on_repeat
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, shape)
+
+    def record(self, shape: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+
+        if len(self._slowest) < SLOW_STATEMENTS_KEPT:
+            heapq.heappush(self._slowest, (seconds, shape))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, shape))
+
+        if self.shapes[shape] == self.threshold + 1 and self.raise_on_repeat:
+            raise NPlusOneError(f"Statement repeated more than {self.threshold} times: {shape}")
+
+    def repeated(self) -> Dict[str, int]:
+        """Shapes run more than the threshold"""
+        return {shape: n for shape, n in self.shapes.items() if n > self.threshold}
+
+    def slowest(self) -> List[Dict[str, object]]:
+        return [
+            {"ms": round(seconds * 1000, 2), "statement": shape}
+            for seconds, shape in sorted(self._slowest, reverse=True)
+        ]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def record_query(statement: str, seconds: float):
+    """Attribute a statement to the current request (no-op outside one)"""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement_shape(statement), seconds)
+
+
+@contextmanager
+def track_queries(stats: Optional[QueryStats] = None):
+    """Collect queries issued in this context (and threads/tasks it spawns)"""
+    stats = stats or QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_queries(max_queries: Optional[int] = None, max_repeats: int = N_PLUS_ONE_THRESHOLD):
+    """
+    Test helper: fail if the block runs more than max_queries statements,
+    or any statement shape more than max_repeats times.
+
+    Usage:
+        with assert_queries(max_queries=3):
+            client.get("/api/v1/events?ranch_id=r1")
+    """
+    with track_queries(QueryStats(threshold=max_repeats, raise_on_repeat=False)) as stats:
+        yield stats
+    repeated = stats.repeated()
+    if repeated:
+        shape, n = max(repeated.items(), key=lambda item: item[1])
+        raise NPlusOneError(f"Statement ran {n} times (max {max_repeats}): {shape}")
+    if max_queries is not None and stats.count > max_queries:
+        raise AssertionError(f"{stats.count} queries issued (max {max_queries})")
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware giving each HTTP request its own QueryStats.
+
+    Logs likely N+1 patterns after the response; in DEBUG mode adds the
+    query count and DB time to the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if DEBUG and message["type"] == "http.response.start":
+                db_ms = stats.seconds * 1000
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{db_ms:.2f}".encode()),
+                    (b"server-timing", f"db;dur={db_ms:.2f}, app;dur={(time.perf_counter() - started) * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        with track_queries(stats):
+            await self.app(scope, receive, send_wrapper)
+
+        repeated = stats.repeated()
+        if repeated:
+            logger.warning("n_plus_one_detected", method=scope["method"], path=scope["path"],
+                           queries=stats.count, repeated=repeated)
+        if DEBUG and stats.count:
+            logger.info("request_queries", method=scope["method"], path=scope["path"], queries=stats.count,
+                        db_ms=round(stats.seconds * 1000, 2), slowest=stats.slowest())
@@ -0,0 +1,322 @@
+"""
+Per-Ranch Database Sharding for ERP Ganadero
+
+Optional shard-per-ranch mode so one ranch's batch imports and exports do
+not contend with every other tenant:
+
+- SQLite: one database file per ranch under SHARD_DIR
+- PostgreSQL: one schema per ranch on the DATABASE_URL server
+
+Enable with SHARD_MODE=ranch. Users, ranches and memberships stay in the
+primary database; only ranch-scoped tables live in the shards.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from pathlib import Path
+import hashlib
+import os
+import re
+import threading
+
+from fastapi import HTTPException, Request
+from sqlalchemy import MetaData, create_engine, func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+import structlog
+
+from .database import Base, DATABASE_URL, instrument_engine, open_primary_session, open_read_session
+
+logger = structlog.get_logger()
+
+SHARD_MODE = os.getenv("SHARD_MODE", "none").lower()
+SHARD_DIR = os.getenv("SHARD_DIR", "./shards")
+SHARD_MAX_OPEN_ENGINES = int(os.getenv("SHARD_MAX_OPEN_ENGINES", "32"))
+SHARD_PREFIX = "ranch_"
+
+# Placeholder schema used for shard DDL on PostgreSQL
+_SHARD_SCHEMA = "__shard__"
+
+
+# Tables with a ranch_id column that still live in the primary database
+_PRIMARY_TABLES = {"user_ranches", "ai_usage_daily"}
+
+
+def _ranch_tables() -> List[str]:
+    """Tables partitioned by ranch (every table with a ranch_id column)"""
+    return [t.name for t in Base.metadata.sorted_tables if "ranch_id" in t.c and t.name not in _PRIMARY_TABLES]
+
+
+class ShardRouter:
+    """
+    Routes ranch_id to a shard engine.
+
+    Engines are created lazily on first use and kept in an LRU; least
+    recently used SQLite engines are disposed once more than
+    max_open_engines are open. On PostgreSQL all shards share one pool and
+    differ only in their schema_translate_map.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DATABASE_URL,
+        shard_dir: str = SHARD_DIR,
+        max_open_engines: int = SHARD_MAX_OPEN_ENGINES
+    ):
+        self.base_url = base_url
+        self.shard_dir = Path(shard_dir)
+        self.max_open_engines = max_open_engines
+        self.is_postgres = base_url.startswith("postgresql")
+
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._initialized = set()
+        self._lock = threading.Lock()  # engine LRU only; never held while a shard is created
+        self._shard_locks: Dict[str, threading.Lock] = {}
+        self._base_engine: Optional[Engine] = None
+        self._on_shard_created: List[Callable[[Engine], None]] = []
+
+        self.stats = {"engines_created": 0, "engines_evicted": 0}
+
+    def on_shard_created(self, callback: Callable[[Engine], None]):
+        """Register a hook run once per new shard (e.g. search indexes)"""
+        self._on_shard_created.append(callback)
+
+    @staticmethod
+    def shard_name(ranch_id: str) -> str:
+        """
+        Stable, identifier-safe shard name for a ranch. The readable part is
+        lossy ("ranch-1" and "RANCH_1" both give "ranch_1"), so a hash of the
+        raw ranch_id keeps the names distinct.
+        """
+        digest = hashlib.blake2b(ranch_id.encode(), digest_size=4).hexdigest()
+        safe = re.sub(r"[^a-z0-9_]", "_", ranch_id.lower())[:63 - len(SHARD_PREFIX) - len(digest) - 1]
+        return f"{SHARD_PREFIX}{safe}_{digest}"
+
+    # ------------------------------------------------------------------
+    # Engines
+    # ------------------------------------------------------------------
+
+    def get_engine(self, ranch_id: str) -> Engine:
+        """Get (or lazily create) the engine for a ranch's shard"""
+        return self._get_shard_engine(self.shard_name(ranch_id))
+
+    def _cached_engine(self, shard: str) -> Optional[Engine]:
+        with self._lock:
+            engine = self._engines.get(shard)
+            if engine is not None:
+                self._engines.move_to_end(shard)
+            return engine
+
+    def _get_shard_engine(self, shard: str) -> Engine:
+        engine = self._cached_engine(shard)
+        if engine is not None:
+            return engine
+
+        # Creating a shard runs DDL: only callers of the same shard wait for it
+        with self._lock:
+            shard_lock = self._shard_locks.setdefault(shard, threading.Lock())
+        with shard_lock:
+            engine = self._cached_engine(shard)
+            if engine is not None:
+                return engine
+            engine = self._create_engine(shard)
+
+            with self._lock:
+                self._shard_locks.pop(shard, None)
+                self._engines[shard] = engine
+                self.stats["engines_created"] += 1
+
+                while len(self._engines) > self.max_open_engines:
+                    evicted, old_engine = self._engines.popitem(last=False)
+                    if not self.is_postgres:
+                        old_engine.dispose()
+                    self.stats["engines_evicted"] += 1
+                    logger.info("shard_engine_evicted", shard=evicted)
+
+            return engine
+
+    def _get_base_engine(self) -> Engine:
+        """PostgreSQL engine shared by every shard schema"""
+        with self._lock:
+            if self._base_engine is None:
+                self._base_engine = create_engine(self.base_url, pool_pre_ping=True)
+                instrument_engine(self._base_engine, "shard")
+            return self._base_engine
+
+    def _create_engine(self, shard: str) -> Engine:
+        if self.is_postgres:
+            engine = self._get_base_engine().execution_options(
+                schema_translate_map={None: shard}
+            )
+        else:
+            self.shard_dir.mkdir(parents=True, exist_ok=True)
+            engine = create_engine(
+                f"sqlite:///{self.shard_dir / shard}.db",
+                connect_args={"check_same_thread": False}
+            )
+            instrument_engine(engine, "shard")
+
+        if shard not in self._initialized:
+            self._init_shard(shard, engine)
+            self._initialized.add(shard)
+
+        return engine
+
+    def _init_shard(self, shard: str, engine: Engine):
+        """Create the shard's tables (idempotent)"""
+        if self.is_postgres:
+            shard_metadata = MetaData()
+            ranch_tables = set(_ranch_tables())
+            for table in Base.metadata.sorted_tables:
+                if table.name in ranch_tables:
+                    # Shard tables keep their FKs to ranches/users in public
+                    table.to_metadata(
+                        shard_metadata,
+                        schema=_SHARD_SCHEMA,
+                        referred_schema_fn=lambda t, to_schema, constraint, referred_schema:
+                            _SHARD_SCHEMA if constraint.referred_table.name in ranch_tables else None
+                    )
+            with self._base_engine.begin() as conn:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{shard}"'))
+                shard_metadata.create_all(
+                    conn.execution_options(schema_translate_map={_SHARD_SCHEMA: shard})
+                )
+        else:
+            Base.metadata.create_all(bind=engine)
+
+        for callback in self._on_shard_created:
+            callback(engine)
+
+        logger.info("shard_initialized", shard=shard)
+
+    def session(self, ranch_id: str) -> Session:
+        """Open a session on a ranch's shard"""
+        return self._shard_session(self.shard_name(ranch_id))
+
+    def _shard_session(self, shard: str) -> Session:
+        return sessionmaker(autocommit=False, autoflush=False, bind=self._get_shard_engine(shard))()
+
+    # ------------------------------------------------------------------
+    # Cross-shard (admin) queries
+    # ------------------------------------------------------------------
+
+    def list_shards(self) -> List[str]:
+        """All shards that exist on disk / in the database"""
+        if self.is_postgres:
+            with self._get_base_engine().connect() as conn:
+                rows = conn.execute(
+                    text("SELECT schema_name FROM information_schema.schemata "
+                         "WHERE schema_name LIKE :prefix ORDER BY schema_name"),
+                    {"prefix": f"{SHARD_PREFIX}%"}
+                )
+                return [row[0] for row in rows]
+
+        if not self.shard_dir.exists():
+            return []
+        return sorted(p.stem for p in self.shard_dir.glob(f"{SHARD_PREFIX}*.db"))
+
+    def for_each_shard(self, fn: Callable[[Session], Any]) -> Dict[str, Any]:
+        """
+        Run fn(session) against every shard, one at a time.
+
+        Shards are visited sequentially so a fleet report never holds more
+        than one extra connection, and the engine LRU bounds open files.
+        """
+        results = {}
+        for shard in self.list_shards():
+            session = self._shard_session(shard)
+            try:
+                results[shard] = fn(session)
+            except Exception as e:
+                logger.error("shard_query_failed", shard=shard, error=str(e))
+                results[shard] = {"error": str(e)}
+            finally:
+                session.close()
+        return results
+
+    def fleet_report(self) -> List[Dict[str, Any]]:
+        """Herd, event and cost totals per shard"""
+        from .models import Animal, AnimalStatus, Event, Cost
+
+        def _summarize(db: Session) -> Dict[str, Any]:
+            return {
+                "animals": db.query(func.count(Animal.id)).scalar(),
+                "active_animals": db.query(func.count(Animal.id))
+                    .filter(Animal.status == AnimalStatus.ACTIVE).scalar(),
+                "events": db.query(func.count(Event.id)).scalar(),
+                "costs_mxn": float(db.query(func.coalesce(func.sum(Cost.amount_mxn), 0)).scalar()),
+            }
+
+        return [
+            {"shard": shard, **summary}
+            for shard, summary in self.for_each_shard(_summarize).items()
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Engine LRU statistics"""
+        return {
+            **self.stats,
+            "open_engines": len(self._engines),
+            "max_open_engines": self.max_open_engines,
+        }
+
+
+# Singleton router
+_router: Optional[ShardRouter] = None
+
+
+def is_sharding_enabled() -> bool:
+    return SHARD_MODE == "ranch"
+
+
+def get_shard_router() -> ShardRouter:
+    """Get shard router instance"""
+    global _router
+    if _router is None:
+        _router = ShardRouter()
+    return _router
+
+
+def get_ranch_db(request: Request = None, ranch_id: Optional[str] = None):
+    """
+    Dependency for ranch-scoped routes.
+
+    Yields a session on the ranch's shard in shard mode, otherwise on the
+    shared database (same as get_db).
+
+    Usage:
+        @app.get("/items")
+        def get_items(ranch_id: str, db: Session = Depends(get_ranch_db)):
+            ...
+    """
+    if is_sharding_enabled():
+        if not ranch_id:
+            raise HTTPException(status_code=400, detail="ranch_id is required in shard mode")
+        db = get_shard_router().session(ranch_id)
+    else:
+        db = open_primary_session(request)
+
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_ranch_read_db(request: Request = None, ranch_id: Optional[str] = None):
+    """
+    Dependency for read-only ranch-scoped routes.
+
+    Shards are read from directly in shard mode; otherwise reads follow
+    get_read_db (replica, or primary right after the client wrote).
+    """
+    if is_sharding_enabled():
+        if not ranch_id:
+            raise HTTPException(status_code=400, detail="ranch_id is required in shard mode")
+        db = get_shard_router().session(ranch_id)
+    else:
+        db = open_read_session(request)
+
+    try:
+        yield db
+    finally:
+        db.close()
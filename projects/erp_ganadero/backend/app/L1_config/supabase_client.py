@@ -20,8 +20,6 @@ USE_MOCK = os.getenv("USE_MOCK_DB", "false").lower() == "true"
 if USE_MOCK:
     from .mock_supabase import get_mock_supabase
     logger.info("using_mock_supabase")
-else:
-    from supabase import create_client, Client
 
 
 class SupabaseClient:
@@ -45,6 +43,9 @@ class SupabaseClient:
                         "SUPABASE_URL and SUPABASE_KEY must be set in environment"
                     )
                 
+                # Imported on first use: supabase pulls in httpx/postgrest/gotrue
+                from supabase import create_client
+                
                 cls._instance = create_client(url, key)
                 logger.info("supabase_client_initialized", url=url)
         
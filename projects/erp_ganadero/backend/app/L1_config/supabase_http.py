@@ -0,0 +1,185 @@
+"""
+ERP Ganadero - Pooled Supabase HTTP Client (L1 Configuration)
+
+Async PostgREST access for production: every request shares one HTTP/2
+connection pool with explicit timeouts, and failed requests are retried
+within a budget so an upstream outage does not multiply load.
+"""
+
+from typing import Any, Dict
+import asyncio
+import os
+import random
+import time
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+import structlog
+
+from .query_stats import record_query
+
+logger = structlog.get_logger()
+
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "3"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+SUPABASE_MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", "2"))
+# Retries allowed as a fraction of requests (plus a small reserve)
+SUPABASE_RETRY_BUDGET_RATIO = float(os.getenv("SUPABASE_RETRY_BUDGET_RATIO", "0.1"))
+
+RETRYABLE_STATUS = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Raised before the request reached the server: safe to retry any method
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Request may have reached the server: retry idempotent methods only
+_MAYBE_SENT_ERRORS = (httpx.ReadTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of traffic.
+
+    Every request deposits `ratio` tokens (capped at max_tokens) and every
+    retry spends one, so retries stay around ratio * requests even when
+    the upstream is down.
+    """
+
+    def __init__(self, ratio: float = SUPABASE_RETRY_BUDGET_RATIO, reserve: float = 5.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = reserve
+        self.stats = {"requests": 0, "retries": 0, "retries_denied": 0}
+
+    def record_request(self):
+        self.stats["requests"] += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.stats["retries"] += 1
+            return True
+        self.stats["retries_denied"] += 1
+        return False
+
+
+def _request_shape(request: httpx.Request) -> str:
+    """Method, table and filter operators, without the filtered values"""
+    params = "&".join(f"{key}={value.split('.', 1)[0]}" for key, value in request.url.params.multi_items())
+    return f"{request.method} {request.url.path}?{params}"
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Retries connection failures and 502/503/504 with jittered backoff"""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        budget: RetryBudget,
+        max_retries: int = SUPABASE_MAX_RETRIES,
+        backoff_seconds: float = 0.05
+    ):
+        self._transport = transport
+        self.budget = budget
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            return await self._send(request)
+        finally:
+            record_query(_request_shape(request), time.perf_counter() - started)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        self.budget.record_request()
+        idempotent = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            try:
+                response = await self._transport.handle_async_request(request)
+            except _NOT_SENT_ERRORS as e:
+                if not self._should_retry(attempt):
+                    raise
+                reason = type(e).__name__
+            except _MAYBE_SENT_ERRORS as e:
+                if not idempotent or not self._should_retry(attempt):
+                    raise
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRYABLE_STATUS or not idempotent \
+                        or not self._should_retry(attempt):
+                    return response
+                await response.aclose()
+                reason = response.status_code
+
+            attempt += 1
+            logger.warning("supabase_request_retry", method=request.method,
+                           path=request.url.path, attempt=attempt, reason=reason)
+            await asyncio.sleep(self.backoff_seconds * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+    def _should_retry(self, attempt: int) -> bool:
+        return attempt < self.max_retries and self.budget.try_spend()
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient whose session uses the given transport"""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout,
+                 transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout,
+                                 transport=self._transport)
+
+
+class AsyncSupabaseClient:
+    """
+    Async PostgREST client with the supabase-py table() API.
+
+    Builders come from postgrest's AsyncPostgrestClient; only its HTTP
+    session is built differently so every table shares the pooled,
+    retrying transport.
+    """
+
+    def __init__(self, url: str, key: str):
+        self.budget = RetryBudget()
+        transport = RetryTransport(
+            httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=SUPABASE_MAX_CONNECTIONS
+                )
+            ),
+            budget=self.budget
+        )
+        self._postgrest = _PooledPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": key,
+                "Authorization": f"Bearer {key}",
+            },
+            timeout=httpx.Timeout(SUPABASE_TIMEOUT_SECONDS, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS),
+            transport=transport
+        )
+
+    def table(self, name: str):
+        """Query builder for a table (await .execute())"""
+        return self._postgrest.from_(name)
+
+    async def aclose(self):
+        await self._postgrest.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request and retry counters"""
+        return dict(self.budget.stats)
@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.L1_config.supabase_http import AsyncSupabaseClient, RetryBudget, RetryTransport
+from app.L1_config.mock_supabase import AsyncMockSupabaseClient, MockSupabaseClient
+from app.L2_foundation.cattle_crud import CattleCRUD
+
+
+ANIMAL = {
+    "id": "cattle-9", "ranch_id": "ranch-1", "arete_number": "TX-9", "species": "vaca",
+    "gender": "F", "birth_date": "2021-03-01", "status": "active",
+    "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+}
+
+
+def _client_with(handler):
+    client = AsyncSupabaseClient("https://example.supabase.co", "anon-key")
+    # Swap the network transport under the retry layer for a stub
+    client._postgrest.session._transport._transport = httpx.MockTransport(handler)
+    client._postgrest.session._transport.backoff_seconds = 0
+    return client
+
+
+def test_crud_uses_pooled_async_client():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[ANIMAL])
+
+    client = _client_with(handler)
+    animal = asyncio.run(CattleCRUD(client).get_by_arete("ranch-1", "TX-9"))
+
+    assert animal.id == "cattle-9"
+    assert seen[0].url.path == "/rest/v1/cattle"
+    assert seen[0].url.params["arete_number"] == "eq.TX-9"
+    assert seen[0].headers["apikey"] == "anon-key"
+
+
+def test_idempotent_requests_retry_on_503_within_budget():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503 if len(calls) < 3 else 200, json=[ANIMAL])
+
+    client = _client_with(handler)
+    animal = asyncio.run(CattleCRUD(client).get_by_id("cattle-9"))
+
+    assert animal.id == "cattle-9"
+    assert calls == ["GET", "GET", "GET"]
+    assert client.get_stats()["retries"] == 2
+
+
+def test_writes_are_not_retried_after_a_response():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503, json={"message": "unavailable"})
+
+    client = _client_with(handler)
+    with pytest.raises(Exception):
+        asyncio.run(client.table("cattle").insert(ANIMAL).execute())
+    assert calls == ["POST"]
+
+
+def test_retry_budget_caps_retries():
+    budget = RetryBudget(ratio=0.0, reserve=1.0)
+
+    async def run():
+        transport = RetryTransport(
+            httpx.MockTransport(lambda request: httpx.Response(503)),
+            budget=budget, max_retries=5, backoff_seconds=0
+        )
+        async with httpx.AsyncClient(transport=transport) as http:
+            return await http.get("https://example.test/")
+
+    assert asyncio.run(run()).status_code == 503
+    assert budget.stats == {"requests": 1, "retries": 1, "retries_denied": 1}
+
+
+def test_async_mock_shares_the_mock_store():
+    store = MockSupabaseClient()
+    animals = asyncio.run(CattleCRUD(AsyncMockSupabaseClient(store)).list_by_ranch("ranch-1"))
+    assert len(animals) == len(store.storage["cattle"])
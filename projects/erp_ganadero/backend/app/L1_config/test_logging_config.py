@@ -0,0 +1,126 @@
+import ast
+import io
+import logging
+import queue
+from pathlib import Path
+
+import pytest
+import structlog
+
+from app.L1_config import logging_config
+from app.L1_config.logging_config import (
+    BatchingLogWriter, EventSampler, LogStats, NonBlockingQueueHandler, RotatingLogFile
+)
+
+TOOLS_COPY = Path(__file__).resolve().parents[5] / "tools" / "L1_config" / "logging_config.py"
+
+
+def _sample(sampler, event, method_name="info"):
+    try:
+        return sampler(None, method_name, {"event": event})
+    except structlog.DropEvent:
+        return None
+
+
+def test_sampling_drops_a_fraction_of_info_events_only():
+    stats = LogStats()
+    sampler = EventSampler(stats, {"ai_cache_hit": 0.0, "ai_cache_set": 1.0}, {})
+
+    assert _sample(sampler, "ai_cache_hit") is None
+    assert _sample(sampler, "ai_cache_hit", "warning") == {"event": "ai_cache_hit"}
+    assert _sample(sampler, "ai_cache_set") == {"event": "ai_cache_set"}
+    assert _sample(sampler, "cattle_created") == {"event": "cattle_created"}
+    assert stats.as_dict()["sampled_out"] == {"ai_cache_hit": 1}
+
+
+def test_rate_limit_caps_an_event_per_second(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    stats = LogStats()
+    sampler = EventSampler(stats, {}, {"cattle_created": 2})
+
+    kept = [_sample(sampler, "cattle_created") for _ in range(5)]
+    now[0] += 1.0
+    kept.append(_sample(sampler, "cattle_created"))
+
+    assert [event is not None for event in kept] == [True, True, False, False, False, True]
+    assert _sample(sampler, "cattle_created", "error") is not None
+    assert stats.as_dict()["rate_limited"] == {"cattle_created": 3}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stats = LogStats()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1), stats)
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "event_created", (), None)
+
+    for _ in range(3):
+        handler.emit(record)
+
+    assert handler.queue.qsize() == 1
+    assert stats.as_dict()["dropped_queue_full"] == 2
+    assert stats.as_dict()["dropped_total"] == 2
+
+
+def test_log_file_rotates_and_keeps_backup_count(tmp_path):
+    log = RotatingLogFile(str(tmp_path / "logs" / "app.log"), max_bytes=20, backup_count=2)
+    for line in ("first line\n", "second line\n", "third line\n", "fourth line\n"):
+        log.write(line)
+    log.close()
+
+    assert (tmp_path / "logs" / "app.log").read_text() == "fourth line\n"
+    assert (tmp_path / "logs" / "app.log.1").read_text() == "third line\n"
+    assert (tmp_path / "logs" / "app.log.2").read_text() == "second line\n"
+    assert not (tmp_path / "logs" / "app.log.3").exists()
+
+
+def test_tracebacks_survive_the_queue():
+    stats = LogStats()
+    log_queue: queue.Queue = queue.Queue()
+    output = io.StringIO()
+    shared = logging_config._shared_processors()
+    writer = BatchingLogWriter(log_queue, logging_config._build_formatter(shared), [output], stats)
+    writer.start()
+
+    stdlib_logger = logging.getLogger("test_logging_config")
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.DEBUG)
+    handler = NonBlockingQueueHandler(log_queue, stats)
+    stdlib_logger.addHandler(handler)
+    logger = structlog.wrap_logger(
+        stdlib_logger,
+        processors=shared + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter],
+        wrapper_class=structlog.stdlib.BoundLogger,
+    )
+    try:
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("herd_sync_failed")
+        try:
+            {}["ranch"]
+        except KeyError:
+            stdlib_logger.exception("foreign_failure")
+    finally:
+        stdlib_logger.removeHandler(handler)
+        writer.stop()
+
+    text = output.getvalue()
+    assert "herd_sync_failed" in text and "ZeroDivisionError" in text
+    assert "foreign_failure" in text and "KeyError" in text
+    assert stats.as_dict()["written"] == 2
+
+
+@pytest.mark.skipif(not TOOLS_COPY.exists(), reason="tools/ is not part of the backend image")
+def test_tools_copy_of_the_pipeline_matches():
+    def definitions(path):
+        source = path.read_text()
+        return {
+            node.name: ast.get_source_segment(source, node)
+            for node in ast.parse(source).body
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef))
+        }
+
+    ours, theirs = definitions(Path(logging_config.__file__)), definitions(TOOLS_COPY)
+    for name in ("_parse_event_map", "LogStats", "EventSampler", "NonBlockingQueueHandler",
+                 "RotatingLogFile", "BatchingLogWriter", "_add_foreign_exception"):
+        assert ours[name] == theirs[name], name
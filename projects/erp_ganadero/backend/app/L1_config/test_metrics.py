@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.L1_config.metrics import (
+    HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, MetricsMiddleware, Registry, Counter, Histogram
+)
+
+
+def test_text_format_renders_cumulative_buckets_and_collectors():
+    registry = Registry()
+    latency = registry.get_or_create(Histogram, "op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    errors = registry.get_or_create(Counter, "op_errors_total", "Op errors", ("op",))
+    latency.observe(0.05, "read")
+    latency.observe(0.5, "read")
+    latency.observe(3.0, "read")
+    errors.inc('say "hi"')
+    registry.register_collector(lambda: [("pool_size", "gauge", "Pool size", [({"engine": "primary"}, 5)])])
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE op_seconds histogram" in lines
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="read",le="1"} 2' in lines
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in lines
+    assert 'op_seconds_count{op="read"} 3' in lines
+    assert 'op_errors_total{op="say \\"hi\\""} 1' in lines
+    assert 'pool_size{engine="primary"} 5' in lines
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: str):
+        return {"id": thing_id}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/things/1")
+            await client.get("/things/2")
+            await client.get("/nowhere")
+
+    before = HTTP_REQUESTS.get("GET", "/things/{thing_id}", "200")
+    missing = HTTP_REQUESTS.get("GET", "unmatched", "404")
+    asyncio.run(run())
+
+    assert HTTP_REQUESTS.get("GET", "/things/{thing_id}", "200") == before + 2
+    assert HTTP_REQUESTS.get("GET", "unmatched", "404") == missing + 1
+    assert HTTP_REQUEST_SECONDS.get_count("GET", "/things/{thing_id}") >= 2
+    assert HTTP_IN_FLIGHT.get() == 0
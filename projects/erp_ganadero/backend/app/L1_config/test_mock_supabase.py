@@ -0,0 +1,110 @@
+import asyncio
+import random
+from datetime import date
+
+from app.L1_config.mock_supabase import MockSupabaseClient
+from app.L1_config.cattle_types import AnimalUpdate, EventCreate, EventType, Status
+from app.L2_foundation.cattle_crud import CattleCRUD
+from app.L2_foundation.event_crud import EventCRUD
+
+
+def _seeded_client(n=2000):
+    rng = random.Random(7)
+    client = MockSupabaseClient()
+    client.table("cattle").insert([
+        {
+            "id": f"c-{i}",
+            "ranch_id": f"ranch-{i % 5}",
+            "arete_number": f"TX-{i}",
+            "status": rng.choice(["active", "sold", "dead"]),
+            "weight_kg": rng.choice([None, rng.uniform(50, 900)]),
+            "created_at": f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+        }
+        for i in range(n)
+    ]).execute()
+    return client
+
+
+def test_filters_order_and_range_match_a_full_scan():
+    client = _seeded_client()
+    rows = [dict(r) for r in client.storage["cattle"].iter_rows() if r["id"].startswith("c-")]
+
+    result = client.table("cattle").select("id", "weight_kg", count="exact")\
+        .eq("ranch_id", "ranch-2")\
+        .in_("status", ["active", "sold"])\
+        .gt("weight_kg", 300)\
+        .order("weight_kg", desc=True)\
+        .range(5, 14)\
+        .execute()
+
+    expected = sorted(
+        (r for r in rows if r["ranch_id"] == "ranch-2" and r["status"] in ("active", "sold")
+         and r["weight_kg"] is not None and r["weight_kg"] > 300),
+        key=lambda r: r["weight_kg"], reverse=True
+    )
+    assert result.count == len(expected)
+    assert result.data == [{"id": r["id"], "weight_kg": r["weight_kg"]} for r in expected[5:15]]
+
+
+def test_indexes_follow_updates_and_deletes():
+    client = _seeded_client()
+    table = client.table("cattle")
+    assert table.select("id").eq("ranch_id", "ranch-1").eq("status", "active").execute().data
+
+    table.update({"status": "sold"}).eq("ranch_id", "ranch-1").execute()
+    assert table.select("id", count="exact").eq("ranch_id", "ranch-1").eq("status", "active").execute().count == 0
+
+    table.delete().eq("ranch_id", "ranch-1").execute()
+    assert table.select("id", count="exact").eq("ranch_id", "ranch-1").execute().count == 0
+
+    newest = table.select("*").order("created_at", desc=True).limit(1).execute().data[0]
+    assert newest["ranch_id"] != "ranch-1"
+
+
+def test_crud_round_trip_through_mock():
+    client = MockSupabaseClient()
+    cattle, events = CattleCRUD(client), EventCRUD(client)
+
+    animals = asyncio.run(cattle.list_by_ranch("ranch-1"))
+    assert {a.arete_number for a in animals} == {"TX-452", "TX-789", "BEC-102"}
+
+    asyncio.run(cattle.update("cattle-2", AnimalUpdate(status=Status.SOLD)))
+    assert asyncio.run(cattle.count_by_ranch("ranch-1", Status.ACTIVE)) == 2
+
+    recent = asyncio.run(events.get_recent_by_ranch("ranch-1"))
+    assert [e.id for e in recent] == ["event-1", "event-2"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "mock.snap")
+    client = _seeded_client(500)
+    client.table("cattle").update({"status": "sold"}).eq("id", "c-3").execute()
+    client.save_snapshot(path)
+
+    loaded = MockSupabaseClient.from_snapshot(path)
+    assert len(loaded.storage["cattle"]) == len(client.storage["cattle"])
+    assert list(loaded.storage["events"].iter_rows()) == list(client.storage["events"].iter_rows())
+
+    query = lambda c: c.table("cattle").select("*").eq("ranch_id", "ranch-3")\
+        .order("weight_kg").range(0, 19).execute().data
+    assert query(loaded) == query(client)
+
+    # Writes land in memory on top of the frozen snapshot
+    loaded.table("cattle").update({"status": "dead"}).eq("id", "c-3").execute()
+    loaded.table("cattle").delete().eq("id", "c-4").execute()
+    assert loaded.table("cattle").select("status").eq("id", "c-3").execute().data == [{"status": "dead"}]
+    assert loaded.table("cattle").select("id", count="exact").eq("id", "c-4").execute().count == 0
+    assert MockSupabaseClient.from_snapshot(path).table("cattle").select("status")\
+        .eq("id", "c-3").execute().data == [{"status": "sold"}]
+
+
+def test_writes_store_json_values_like_postgrest():
+    client = MockSupabaseClient()
+    events = EventCRUD(client)
+    asyncio.run(events.create(EventCreate(
+        cattle_id="cattle-1", type=EventType.WEIGHING, event_date=date(2024, 2, 1), data={"weight_kg": 530}
+    )))
+
+    history = asyncio.run(events.get_by_cattle("cattle-1"))
+    assert [e.event_date for e in history] == [date(2024, 2, 1), date(2024, 1, 15)]
+    assert client.table("events").select("type").eq("event_date", "2024-02-01").execute().data == [{"type": "weighing"}]
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.L1_config import query_stats
+from app.L1_config.database import instrument_engine
+from app.L1_config.query_stats import (
+    NPlusOneError, QueryStatsMiddleware, assert_queries, statement_shape, track_queries
+)
+from app.L1_config.supabase_http import AsyncSupabaseClient
+from app.L2_foundation.event_crud import EventCRUD
+
+
+@pytest.fixture
+def engine():
+    # One shared connection, so the threadpool sees the same in-memory DB
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    instrument_engine(engine, "test")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE events (id INTEGER, cattle_id TEXT)"))
+    return engine
+
+
+def _events_for_each_animal(engine, n):
+    with engine.connect() as conn:
+        for i in range(n):
+            conn.execute(text("SELECT * FROM events WHERE cattle_id = :id"), {"id": f"cattle-{i}"})
+
+
+def test_statement_shape_folds_literals_and_in_lists():
+    assert statement_shape("SELECT * FROM cattle WHERE id IN (?, ?, ?) LIMIT 50") == \
+        statement_shape("SELECT *\n FROM cattle WHERE id IN (?) LIMIT 10")
+    assert statement_shape("SELECT 'a' WHERE x = 1.5") == "SELECT ? WHERE x = ?"
+
+
+def test_queries_are_attributed_to_the_current_context(engine):
+    _events_for_each_animal(engine, 2)  # outside any request: not recorded
+
+    with track_queries() as stats:
+        _events_for_each_animal(engine, 3)
+
+    assert stats.count == 3
+    assert stats.seconds > 0
+    assert list(stats.shapes.values()) == [3]
+    assert len(stats.slowest()) == 3
+
+
+def test_assert_queries_flags_repeated_statements(engine):
+    with assert_queries(max_queries=5, max_repeats=5):
+        _events_for_each_animal(engine, 5)
+
+    with pytest.raises(NPlusOneError):
+        with assert_queries(max_repeats=5):
+            _events_for_each_animal(engine, 6)
+
+
+def test_postgrest_requests_count_as_queries():
+    def handler(request):
+        return httpx.Response(200, json=[])
+
+    client = AsyncSupabaseClient("https://example.supabase.co", "anon-key")
+    client._postgrest.session._transport._transport = httpx.MockTransport(handler)
+    crud = EventCRUD(client)
+
+    async def per_animal():
+        for i in range(4):
+            await crud.get_by_cattle(f"cattle-{i}")
+
+    with track_queries() as stats:
+        asyncio.run(per_animal())
+
+    assert stats.count == 4
+    [(shape, n)] = stats.shapes.items()
+    assert n == 4 and shape.startswith("GET /rest/v1/events?") and "cattle-" not in shape
+
+
+def test_middleware_adds_debug_headers(engine, monkeypatch):
+    monkeypatch.setattr(query_stats, "DEBUG", True)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/events")
+    def list_events():
+        _events_for_each_animal(engine, 2)
+        return []
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/events")
+
+    response = asyncio.run(run())
+
+    assert response.headers["x-db-query-count"] == "2"
+    assert float(response.headers["x-db-time-ms"]) > 0
+    assert response.headers["server-timing"].startswith("db;dur=")
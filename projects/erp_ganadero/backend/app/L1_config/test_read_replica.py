@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.L1_config import database
+from app.L1_config.models import Ranch
+
+
+def _request(token):
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    read = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    database.Base.metadata.create_all(primary)
+    database.Base.metadata.create_all(read)
+
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "read_engine", read)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary))
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=read))
+    monkeypatch.setattr(database, "_sticky_until", {})
+
+
+def _is_on_replica(db):
+    return db.get_bind() is database.read_engine
+
+
+def test_reads_go_to_replica_until_client_writes(replica):
+    db = database.open_read_session(_request("alice"))
+    assert _is_on_replica(db)
+    db.close()
+
+    db = database.open_primary_session(_request("alice"))
+    db.add(Ranch(owner_id="u-1", name="Rancho Norte"))
+    db.commit()
+    db.close()
+
+    # Writer reads its own write from the primary; other clients stay on the replica
+    db = database.open_read_session(_request("alice"))
+    assert not _is_on_replica(db)
+    assert db.query(Ranch).count() == 1
+    db.close()
+
+    db = database.open_read_session(_request("bob"))
+    assert _is_on_replica(db)
+    db.close()
+
+
+def test_sticky_window_expires(replica, monkeypatch):
+    monkeypatch.setattr(database, "READ_AFTER_WRITE_SECONDS", -1)
+    db = database.open_primary_session(_request("alice"))
+    db.add(Ranch(owner_id="u-1", name="Rancho Sur"))
+    db.commit()
+    db.close()
+
+    db = database.open_read_session(_request("alice"))
+    assert _is_on_replica(db)
+    db.close()
+
+
+def test_replica_sessions_reject_writes(replica):
+    db = database.open_read_session(_request("alice"))
+    db.add(Ranch(owner_id="u-1", name="Rancho Este"))
+    with pytest.raises(RuntimeError):
+        db.flush()
+    db.close()
+
+
+def test_expired_sticky_clients_are_pruned_on_write(replica, monkeypatch):
+    monkeypatch.setattr(database, "READ_AFTER_WRITE_SECONDS", -1)
+    for token in ("alice", "bob", "carol"):
+        db = database.open_primary_session(_request(token))
+        db.add(Ranch(owner_id="u-1", name=f"Rancho {token}"))
+        db.commit()
+        db.close()
+
+    # None of them read again, yet their expired windows are gone
+    assert database._sticky_until == {}
+
+
+def test_replica_lag_is_exported_as_a_gauge(replica, monkeypatch):
+    from app.L1_config.metrics import render_metrics
+
+    monkeypatch.setattr(database, "_lag_cache", {"value": 2.5, "checked_at": float("inf")})
+
+    assert "db_replica_lag_seconds 2.5" in render_metrics()
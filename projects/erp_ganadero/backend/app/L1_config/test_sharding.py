@@ -0,0 +1,84 @@
+from datetime import date
+import threading
+
+from app.L1_config.models import Animal, AnimalSpecies, Gender
+from app.L1_config.sharding import ShardRouter
+
+
+def _add_animal(router, ranch_id, arete):
+    db = router.session(ranch_id)
+    db.add(Animal(ranch_id=ranch_id, arete_number=arete, species=AnimalSpecies.VACA,
+                  gender=Gender.F, birth_date=date(2020, 1, 1)))
+    db.commit()
+    db.close()
+
+
+def test_ranches_are_isolated_in_their_own_files(tmp_path):
+    router = ShardRouter(base_url="sqlite://", shard_dir=str(tmp_path))
+    _add_animal(router, "ranch-1", "TX-1")
+    _add_animal(router, "ranch-2", "TX-2")
+    
+    db = router.session("ranch-1")
+    assert [a.arete_number for a in db.query(Animal).all()] == ["TX-1"]
+    db.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        f"{router.shard_name(ranch_id)}.db" for ranch_id in ("ranch-1", "ranch-2")
+    )
+
+
+def test_shard_names_keep_similar_ranch_ids_apart():
+    names = {ShardRouter.shard_name(ranch_id) for ranch_id in ("ranch-1", "ranch_1", "RANCH-1")}
+
+    assert len(names) == 3
+    assert all(name.startswith("ranch_ranch_1_") for name in names)
+    assert ShardRouter.shard_name("ranch-1") == ShardRouter.shard_name("ranch-1")
+    assert len(ShardRouter.shard_name("x" * 100)) <= 63
+
+
+def test_creating_one_shard_does_not_block_others(tmp_path):
+    router = ShardRouter(base_url="sqlite://", shard_dir=str(tmp_path))
+    slow_shard = router.shard_name("slow")
+    started, release = threading.Event(), threading.Event()
+
+    def hold_slow_shard(engine):
+        if slow_shard in str(engine.url):
+            started.set()
+            release.wait(5)
+
+    router.on_shard_created(hold_slow_shard)
+    slow = threading.Thread(target=router.get_engine, args=("slow",))
+    slow.start()
+    try:
+        assert started.wait(5)
+        # Another ranch's shard is created while "slow" is still initializing
+        _add_animal(router, "fast", "TX-1")
+        assert router.get_stats()["engines_created"] == 1
+    finally:
+        release.set()
+        slow.join()
+    assert router.get_stats()["engines_created"] == 2
+
+
+def test_engine_lru_evicts_and_reopens(tmp_path):
+    router = ShardRouter(base_url="sqlite://", shard_dir=str(tmp_path), max_open_engines=2)
+    for ranch_id in ("a", "b", "c"):
+        _add_animal(router, ranch_id, f"TX-{ranch_id}")
+    
+    assert router.get_stats()["open_engines"] == 2
+    assert router.get_stats()["engines_evicted"] == 1
+    
+    # Evicted shard reopens lazily with its data intact
+    db = router.session("a")
+    assert db.query(Animal).count() == 1
+    db.close()
+
+
+def test_fleet_report_spans_all_shards(tmp_path):
+    router = ShardRouter(base_url="sqlite://", shard_dir=str(tmp_path))
+    _add_animal(router, "ranch-1", "TX-1")
+    _add_animal(router, "ranch-1", "TX-2")
+    _add_animal(router, "ranch-2", "MX-1")
+    
+    report = {row["shard"]: row for row in router.fleet_report()}
+    assert report[router.shard_name("ranch-1")]["animals"] == 2
+    assert report[router.shard_name("ranch-2")]["active_animals"] == 1
@@ -6,9 +6,11 @@ JWT token generation, validation, and password hashing.
 
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
+import os
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -21,6 +23,9 @@ SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Move to environment
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Operator token for fleet-wide admin endpoints (disabled when unset)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -131,3 +136,23 @@ async def get_current_active_user(
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check an X-Admin-Token value against ADMIN_API_TOKEN"""
+    if not ADMIN_API_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, ADMIN_API_TOKEN)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency for operator-only routes (cross-ranch reports, diagnostics).
+    
+    Requires the X-Admin-Token header to match ADMIN_API_TOKEN.
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
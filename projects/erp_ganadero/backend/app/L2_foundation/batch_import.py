@@ -10,6 +10,7 @@ from fastapi import HTTPException
 import structlog
 
 from ..L1_config.models import Animal, Cost, InventoryItem, Client, Worker
+from ..L1_config.cattle_types import AnimalCreate
 from .cattle_crud_db import create_animal
 from .cost_crud_db import create_cost
 from .inventory_crud_db import create_inventory_item
@@ -61,7 +62,7 @@ class BatchImporter:
                     raise ValueError("birth_date is required")
                 
                 # Create animal
-                animal = create_animal(self.db, **record)
+                animal = create_animal(self.db, AnimalCreate(**record))
                 
                 self.results["success"].append({
                     "index": index,
@@ -4,24 +4,26 @@ ERP Ganadero - Cattle CRUD Operations (L2 Foundation)
 Database operations for cattle management.
 """
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from datetime import datetime
-from supabase import Client
 
 from ..L1_config.cattle_types import (
     Animal, AnimalCreate, AnimalUpdate, Status, Species
 )
-from ..L1_config.supabase_client import get_supabase
+from ..L1_config.async_supabase import execute, get_async_supabase
 import structlog
 
+if TYPE_CHECKING:
+    from ..L1_config.supabase_http import AsyncSupabaseClient
+
 logger = structlog.get_logger()
 
 
 class CattleCRUD:
     """CRUD operations for cattle"""
     
-    def __init__(self, supabase: Optional[Client] = None):
-        self.db = supabase or get_supabase()
+    def __init__(self, supabase: Optional["AsyncSupabaseClient"] = None):
+        self.db = supabase or get_async_supabase()
     
     async def create(self, animal: AnimalCreate) -> Animal:
         """Create new animal"""
@@ -29,7 +31,7 @@ class CattleCRUD:
         data["created_at"] = datetime.utcnow().isoformat()
         data["updated_at"] = datetime.utcnow().isoformat()
         
-        result = self.db.table("cattle").insert(data).execute()
+        result = await execute(self.db.table("cattle").insert(data))
         
         logger.info("cattle_created", 
                    arete=animal.arete_number,
@@ -39,10 +41,11 @@ class CattleCRUD:
     
     async def get_by_id(self, cattle_id: str) -> Optional[Animal]:
         """Get animal by ID"""
-        result = self.db.table("cattle")\
-            .select("*")\
-            .eq("id", cattle_id)\
-            .execute()
+        result = await execute(
+            self.db.table("cattle")
+            .select("*")
+            .eq("id", cattle_id)
+        )
         
         if not result.data:
             return None
@@ -51,11 +54,12 @@ class CattleCRUD:
     
     async def get_by_arete(self, ranch_id: str, arete_number: str) -> Optional[Animal]:
         """Get animal by arete number"""
-        result = self.db.table("cattle")\
-            .select("*")\
-            .eq("ranch_id", ranch_id)\
-            .eq("arete_number", arete_number)\
-            .execute()
+        result = await execute(
+            self.db.table("cattle")
+            .select("*")
+            .eq("ranch_id", ranch_id)
+            .eq("arete_number", arete_number)
+        )
         
         if not result.data:
             return None
@@ -81,10 +85,11 @@ class CattleCRUD:
         if species:
             query = query.eq("species", species.value)
         
-        result = query\
-            .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        result = await execute(
+            query
+            .order("created_at", desc=True)
+            .range(offset, offset + limit - 1)
+        )
         
         return [Animal(**row) for row in result.data]
     
@@ -93,10 +98,11 @@ class CattleCRUD:
         data = update.model_dump(exclude_unset=True)
         data["updated_at"] = datetime.utcnow().isoformat()
         
-        result = self.db.table("cattle")\
-            .update(data)\
-            .eq("id", cattle_id)\
-            .execute()
+        result = await execute(
+            self.db.table("cattle")
+            .update(data)
+            .eq("id", cattle_id)
+        )
         
         logger.info("cattle_updated", cattle_id=cattle_id)
         
@@ -122,7 +128,7 @@ class CattleCRUD:
         if status:
             query = query.eq("status", status.value)
         
-        result = query.execute()
+        result = await execute(query)
         return result.count or 0
     
     async def get_productive_count(self, ranch_id: str) -> int:
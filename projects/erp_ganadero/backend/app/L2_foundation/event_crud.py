@@ -2,22 +2,24 @@
 ERP Ganadero - Event CRUD Operations (L2 Foundation)
 """
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from datetime import datetime
-from supabase import Client
 
 from ..L1_config.cattle_types import Event, EventCreate, EventType
-from ..L1_config.supabase_client import get_supabase
+from ..L1_config.async_supabase import execute, get_async_supabase
 import structlog
 
+if TYPE_CHECKING:
+    from ..L1_config.supabase_http import AsyncSupabaseClient
+
 logger = structlog.get_logger()
 
 
 class EventCRUD:
     """CRUD operations for events"""
     
-    def __init__(self, supabase: Optional[Client] = None):
-        self.db = supabase or get_supabase()
+    def __init__(self, supabase: Optional["AsyncSupabaseClient"] = None):
+        self.db = supabase or get_async_supabase()
     
     async def create(self, event: EventCreate, user_id: Optional[str] = None) -> Event:
         """Create new event"""
@@ -26,7 +28,7 @@ class EventCRUD:
         data["created_at"] = datetime.utcnow().isoformat()
         data["updated_at"] = datetime.utcnow().isoformat()
         
-        result = self.db.table("events").insert(data).execute()
+        result = await execute(self.db.table("events").insert(data))
         
         logger.info("event_created", 
                    type=event.type,
@@ -48,10 +50,11 @@ class EventCRUD:
         if event_type:
             query = query.eq("type", event_type.value)
         
-        result = query\
-            .order("event_date", desc=True)\
-            .limit(limit)\
-            .execute()
+        result = await execute(
+            query
+            .order("event_date", desc=True)
+            .limit(limit)
+        )
         
         return [Event(**row) for row in result.data]
     
@@ -64,12 +67,13 @@ class EventCRUD:
         """Get recent events for a ranch"""
         # Note: This requires joining with cattle table
         # Simplified version for now
-        result = self.db.table("events")\
-            .select("*, cattle!inner(ranch_id)")\
-            .eq("cattle.ranch_id", ranch_id)\
-            .order("event_date", desc=True)\
-            .limit(limit)\
-            .execute()
+        result = await execute(
+            self.db.table("events")
+            .select("*, cattle!inner(ranch_id)")
+            .eq("cattle.ranch_id", ranch_id)
+            .order("event_date", desc=True)
+            .limit(limit)
+        )
         
         return [Event(**row) for row in result.data]
 
@@ -4,11 +4,69 @@ Inventory CRUD Operations - Database Version
 Database operations for inventory management using SQLAlchemy.
 """
 
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
 import uuid
+import structlog
 
-from ..L1_config.models import InventoryItem as DBInventoryItem
+from ..L1_config.models import (
+    InventoryItem as DBInventoryItem,
+    InventoryMovement as DBInventoryMovement,
+    InventoryAlert as DBInventoryAlert,
+)
+
+logger = structlog.get_logger()
+
+# Window used to estimate average daily consumption
+CONSUMPTION_WINDOW_DAYS = 30
+
+
+def _is_low(quantity: Optional[float], min_stock: Optional[float]) -> bool:
+    """Same predicate as the idx_inventory_low_stock partial index"""
+    return quantity is not None and min_stock is not None and quantity <= min_stock
+
+
+def _check_stock_threshold(
+    db: Session,
+    item: DBInventoryItem,
+    was_low: bool
+) -> Optional[DBInventoryAlert]:
+    """
+    Emit an alert only when the item crosses its min_stock threshold.
+    
+    Items that stay low (or stay healthy) across an update produce nothing,
+    so the alert stream grows with threshold crossings, not with writes.
+    """
+    is_low = _is_low(item.quantity, item.min_stock)
+    if is_low == was_low:
+        return None
+    
+    if db.get_bind().dialect.name == "postgresql":
+        # Serialize the ranch's alert inserts until commit, so seq order is commit order
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                   {"key": f"inventory_alerts:{item.ranch_id}"})
+    
+    alert = DBInventoryAlert(
+        id=str(uuid.uuid4()),
+        ranch_id=item.ranch_id,
+        item_id=item.id,
+        kind="low_stock" if is_low else "restocked",
+        quantity=item.quantity,
+        min_stock=item.min_stock,
+        created_at=datetime.utcnow()
+    )
+    db.add(alert)
+    
+    logger.info("inventory_threshold_crossed",
+                item_id=item.id,
+                ranch_id=item.ranch_id,
+                kind=alert.kind,
+                quantity=item.quantity,
+                min_stock=item.min_stock)
+    
+    return alert
 
 
 def create_inventory_item(
@@ -38,6 +96,7 @@ def create_inventory_item(
     )
     
     db.add(db_item)
+    _check_stock_threshold(db, db_item, was_low=False)
     db.commit()
     db.refresh(db_item)
     
@@ -69,6 +128,100 @@ def list_inventory(
     return query.offset(offset).limit(limit).all()
 
 
+def list_low_stock(
+    db: Session,
+    ranch_id: str,
+    limit: int = 100,
+    offset: int = 0
+) -> List[DBInventoryItem]:
+    """
+    List items at or below min_stock, most depleted first.
+    
+    The filter repeats the partial index predicate verbatim so both SQLite
+    and PostgreSQL serve it from idx_inventory_low_stock (ranch_id, quantity)
+    instead of scanning every SKU of the ranch.
+    """
+    return db.query(DBInventoryItem)\
+        .filter(DBInventoryItem.ranch_id == ranch_id)\
+        .filter(DBInventoryItem.quantity <= DBInventoryItem.min_stock)\
+        .order_by(DBInventoryItem.quantity)\
+        .offset(offset)\
+        .limit(limit)\
+        .all()
+
+
+def list_inventory_alerts(
+    db: Session,
+    ranch_id: str,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+    after_seq: Optional[int] = None
+) -> List[DBInventoryAlert]:
+    """
+    List threshold alerts for a ranch in insertion order (seq).
+    
+    Pass the seq of the last alert seen as `after_seq` to poll the stream
+    incrementally. Unlike created_at (set before commit), seq is assigned
+    by the database as alerts are inserted, and inserts are serialized per
+    ranch until commit, so nothing sorts in behind a cursor. `since` filters on
+    created_at for clients that only need a time window.
+    """
+    query = db.query(DBInventoryAlert).filter(DBInventoryAlert.ranch_id == ranch_id)
+    
+    if after_seq is not None:
+        query = query.filter(DBInventoryAlert.seq > after_seq)
+    if since:
+        query = query.filter(DBInventoryAlert.created_at > since)
+    
+    return query.order_by(DBInventoryAlert.seq).limit(limit).all()
+
+
+def get_days_of_supply(
+    db: Session,
+    ranch_id: str,
+    window_days: int = CONSUMPTION_WINDOW_DAYS
+) -> List[Dict]:
+    """
+    Project days of supply per item from consumption in the last window.
+    
+    Consumption is aggregated in a single GROUP BY over the ranch's
+    movements, so the cost is two queries per ranch regardless of SKU count.
+    Items without recent consumption get days_of_supply=None.
+    """
+    window_days = max(1, window_days)
+    since = datetime.utcnow() - timedelta(days=window_days)
+    
+    consumed = dict(
+        db.query(DBInventoryMovement.item_id, func.sum(-DBInventoryMovement.delta))
+        .filter(DBInventoryMovement.ranch_id == ranch_id)
+        .filter(DBInventoryMovement.created_at >= since)
+        .filter(DBInventoryMovement.delta < 0)
+        .group_by(DBInventoryMovement.item_id)
+        .all()
+    )
+    
+    items = db.query(DBInventoryItem).filter(DBInventoryItem.ranch_id == ranch_id).all()
+    
+    projections = []
+    for item in items:
+        daily_usage = (consumed.get(item.id) or 0.0) / window_days
+        days_of_supply = round(item.quantity / daily_usage, 1) if daily_usage > 0 else None
+        projections.append({
+            "item_id": item.id,
+            "name": item.name,
+            "quantity": item.quantity,
+            "unit": item.unit,
+            "min_stock": item.min_stock,
+            "avg_daily_usage": round(daily_usage, 3),
+            "days_of_supply": days_of_supply,
+            "is_low_stock": _is_low(item.quantity, item.min_stock)
+        })
+    
+    # Soonest to run out first; items with no usage go last
+    projections.sort(key=lambda p: (p["days_of_supply"] is None, p["days_of_supply"] or 0))
+    return projections
+
+
 def update_inventory_item(
     db: Session,
     item_id: str,
@@ -82,7 +235,17 @@ def update_inventory_item(
     if not db_item:
         return None
     
-    if quantity is not None:
+    was_low = _is_low(db_item.quantity, db_item.min_stock)
+    
+    if quantity is not None and quantity != db_item.quantity:
+        db.add(DBInventoryMovement(
+            id=str(uuid.uuid4()),
+            ranch_id=db_item.ranch_id,
+            item_id=db_item.id,
+            delta=quantity - db_item.quantity,
+            quantity_after=quantity,
+            created_at=datetime.utcnow()
+        ))
         db_item.quantity = quantity
     if unit_cost is not None:
         db_item.unit_cost = unit_cost
@@ -91,6 +254,7 @@ def update_inventory_item(
     if notes is not None:
         db_item.notes = notes
     
+    _check_stock_threshold(db, db_item, was_low)
     db.commit()
     db.refresh(db_item)
     
@@ -0,0 +1,272 @@
+"""
+ERP Ganadero - On-Demand Sampling Profiler (L2 Foundation)
+
+Opt-in wall-clock profiling of live requests. A request is profiled when:
+- it carries X-Profile: 1 together with a valid X-Admin-Token,
+- it falls in the PROFILE_SAMPLE_PERCENT random sample, or
+- an admin opened a profiling window (start_window) that is still running.
+
+One background thread wakes every PROFILE_INTERVAL_MS while profiled
+requests are in flight and reads sys._current_frames(). A request running
+on a thread contributes the frames below its middleware frame; a request
+suspended at an await contributes its coroutine chain, so time spent
+waiting on the database or an upstream API shows up too. Samples are
+aggregated per route as collapsed stacks ("a;b;c 42"), the input format
+of flamegraph.pl and speedscope.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+import structlog
+
+from ..L1_config.metrics import RouteTemplates
+from .auth_service import is_admin_token
+
+logger = structlog.get_logger()
+
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Distinct stacks kept per route; further stacks are counted under "[other]"
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "2000"))
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _awaited_frames(coro) -> List:
+    """Frames of a suspended coroutine chain, outermost first"""
+    frames = []
+    while coro is not None and len(frames) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+class ProfiledRequest:
+    """Stack samples of one in-flight request"""
+
+    def __init__(self, frame, task: Optional[asyncio.Task]):
+        self.frame = frame
+        self.task = task
+        self.samples: Counter = Counter()
+
+    def suspended_stack(self) -> List:
+        """Frames below the middleware while the request awaits something"""
+        if self.task is None:
+            return []
+        frames = _awaited_frames(self.task.get_coro())
+        for index, frame in enumerate(frames):
+            if frame is self.frame:
+                return frames[index + 1:]
+        return []
+
+
+class Profiler:
+    """Sampler thread plus per-route collapsed-stack aggregates"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, sample_percent: float = PROFILE_SAMPLE_PERCENT,
+                 max_stacks: int = PROFILE_MAX_STACKS):
+        self.interval = interval_ms / 1000
+        self.sample_percent = sample_percent
+        self.max_stacks = max_stacks
+        self.window_until = 0.0
+        self.window_percent = 100.0
+        self.stats = {"requests_profiled": 0, "samples": 0}
+        self._active: Dict[int, ProfiledRequest] = {}
+        self._routes: Dict[Tuple[str, str], Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Enabling
+    # ------------------------------------------------------------------
+
+    def start_window(self, seconds: float, percent: float = 100.0):
+        """Profile percent of requests for the next seconds"""
+        self.window_until = time.monotonic() + seconds
+        self.window_percent = percent
+        logger.info("profiling_window_started", seconds=seconds, percent=percent)
+
+    def stop_window(self):
+        self.window_until = 0.0
+
+    def window_remaining(self) -> float:
+        return max(0.0, self.window_until - time.monotonic())
+
+    def should_profile(self, scope) -> bool:
+        percent = self.sample_percent
+        if self.window_until and time.monotonic() < self.window_until:
+            percent = max(percent, self.window_percent)
+        if percent > 0 and random.random() * 100 < percent:
+            return True
+
+        headers = dict(scope.get("headers") or ())
+        if headers.get(b"x-profile") not in (b"1", b"true"):
+            return False
+        token = headers.get(b"x-admin-token")
+        return is_admin_token(token.decode("latin-1") if token else None)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def begin(self, frame) -> ProfiledRequest:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        request = ProfiledRequest(frame, task)
+        self._ensure_thread()
+        with self._lock:
+            self._active[id(request)] = request
+            self.stats["requests_profiled"] += 1
+        self._wake.set()
+        return request
+
+    def end(self, request: ProfiledRequest, method: str, route: str):
+        with self._lock:
+            self._active.pop(id(request), None)
+            stacks = self._routes.setdefault((method, route), Counter())
+            for stack, count in request.samples.items():
+                if stack not in stacks and len(stacks) >= self.max_stacks:
+                    stack = "[other]"
+                stacks[stack] += count
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("profiler_sample_failed", error=str(e))
+            time.sleep(self.interval)
+
+    def sample(self):
+        """Take one sample of every profiled request"""
+        with self._lock:
+            active = list(self._active.values())
+        if not active:
+            return
+
+        # id(frame) -> (thread stack leaf-first, position) for every running frame
+        running: Dict[int, Tuple[List, int]] = {}
+        for thread_id, leaf in sys._current_frames().items():
+            stack = []
+            frame = leaf
+            while frame is not None and len(stack) < MAX_STACK_DEPTH * 4:
+                stack.append(frame)
+                frame = frame.f_back
+            for position, frame in enumerate(stack):
+                running[id(frame)] = (stack, position)
+
+        taken = []
+        for request in active:
+            found = running.get(id(request.frame))
+            if found is not None:
+                stack, position = found
+                frames = list(reversed(stack[:position]))
+            else:
+                frames = request.suspended_stack()
+            if frames:
+                taken.append((request, ";".join(_frame_label(f) for f in frames[:MAX_STACK_DEPTH])))
+
+        # end() merges request.samples under the same lock; skip requests it already took
+        with self._lock:
+            for request, stack in taken:
+                if id(request) in self._active:
+                    request.samples[stack] += 1
+                    self.stats["samples"] += 1
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Collapsed stacks rooted at "METHOD route", one "stack count" per line"""
+        lines = []
+        with self._lock:
+            for (method, path), stacks in sorted(self._routes.items()):
+                if route is not None and path != route:
+                    continue
+                root = f"{method} {path}"
+                for stack, count in stacks.most_common():
+                    lines.append(f"{root};{stack} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = len(self._active)
+            routes = [
+                {"method": method, "route": path, "samples": sum(stacks.values()), "stacks": len(stacks)}
+                for (method, path), stacks in self._routes.items()
+            ]
+        routes.sort(key=lambda r: r["samples"], reverse=True)
+        return {
+            **stats,
+            "in_flight": in_flight,
+            "interval_ms": self.interval * 1000,
+            "sample_percent": self.sample_percent,
+            "window_seconds_remaining": round(self.window_remaining(), 1),
+            "routes": routes,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.stats = {"requests_profiled": 0, "samples": 0}
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware that profiles the requests Profiler selects"""
+
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or get_profiler()
+        self._route_template = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request = self.profiler.begin(sys._getframe())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(request, scope["method"], self._route_template(scope))
+
+
+# Singleton instance
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    """Get profiler instance"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
@@ -0,0 +1,389 @@
+"""
+Search Operations - Database Version
+
+Prefix/fuzzy search over arete numbers, animal notes, client and worker names.
+
+SQLite uses external-content FTS5 tables with the trigram tokenizer, kept in
+sync by triggers. PostgreSQL uses pg_trgm GIN indexes. Other dialects fall
+back to a plain LIKE scan.
+
+Statements are raw SQL, so they qualify table names themselves with the
+schema a shard engine maps the default schema to (schema_translate_map).
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Sequence, Union
+import structlog
+
+logger = structlog.get_logger()
+
+SEARCH_TYPES = ("animal", "client", "worker")
+
+# Minimum trigram similarity for fuzzy matches (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Candidates pulled from the index before re-ranking, per requested result
+CANDIDATE_FACTOR = 5
+
+
+# ============================================================================
+# Index Setup
+# ============================================================================
+
+# table -> (fts table, indexed columns)
+_FTS_TABLES = {
+    "cattle": ("cattle_fts", ("arete_number", "notes")),
+    "clients": ("clients_fts", ("name", "contact_name")),
+    "workers": ("workers_fts", ("full_name",)),
+}
+
+_PG_TRGM_INDEXES = {
+    "idx_cattle_arete_trgm": ("cattle", "arete_number"),
+    "idx_cattle_notes_trgm": ("cattle", "notes"),
+    "idx_clients_name_trgm": ("clients", "name"),
+    "idx_workers_name_trgm": ("workers", "full_name"),
+}
+
+
+def _schema_prefix(bind: Union[Engine, Connection]) -> str:
+    """'"schema".' for binds whose schema_translate_map moves the default schema, else ''"""
+    schema = (bind.get_execution_options().get("schema_translate_map") or {}).get(None)
+    return f'"{schema}".' if schema else ""
+
+
+def _sqlite_fts_ddl(table: str, fts: str, columns: Sequence[str], prefix: str = "") -> List[str]:
+    """
+    DDL for an external-content FTS5 table plus its sync triggers.
+
+    Only the created objects take the schema prefix: SQLite resolves the
+    content table, trigger targets and trigger bodies in that same schema.
+    """
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {prefix}{fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='rowid', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}{fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}{fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}{fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_cols}); END",
+        f"INSERT INTO {prefix}{fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_search_indexes(engine: Engine):
+    """
+    Create search indexes if missing. Call after init_db().
+
+    Safe to run on every startup: existing FTS tables are left untouched,
+    new ones are backfilled from their content table once.
+    """
+    dialect = engine.dialect.name
+    prefix = _schema_prefix(engine)
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            existing = {
+                row[0] for row in conn.exec_driver_sql(
+                    f"SELECT name FROM {prefix}sqlite_master WHERE type = 'table'"
+                )
+            }
+            for table, (fts, columns) in _FTS_TABLES.items():
+                if fts not in existing:
+                    for statement in _sqlite_fts_ddl(table, fts, columns, prefix):
+                        conn.exec_driver_sql(statement)
+                    logger.info("search_index_created", table=table, index=fts)
+                # Term statistics used to skip overly common trigrams
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {prefix}{fts}_vocab USING fts5vocab({fts}, 'row')"
+                )
+
+        elif dialect == "postgresql":
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for index, (table, column) in _PG_TRGM_INDEXES.items():
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS {index} "
+                    f"ON {prefix}{table} USING gin ({column} gin_trgm_ops)"
+                )
+
+        else:
+            logger.warning("search_index_unsupported", dialect=dialect)
+
+
+# ============================================================================
+# Scoring
+# ============================================================================
+
+def _trigrams(value: str) -> set:
+    """pg_trgm-style trigrams: lowercased, each word padded with spaces"""
+    grams = set()
+    for word in value.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(query: str, value: Optional[str]) -> float:
+    """Trigram similarity in [0, 1], best match over the words of value"""
+    if not value:
+        return 0.0
+    query_grams = _trigrams(query)
+    if not query_grams:
+        return 0.0
+
+    best = 0.0
+    for word in value.split():
+        word_grams = _trigrams(word)
+        shared = len(query_grams & word_grams)
+        best = max(best, shared / len(query_grams | word_grams))
+    return best
+
+
+def _score(query: str, label: Optional[str], detail: Optional[str]) -> float:
+    """
+    Rank prefix matches above substring matches above fuzzy matches.
+
+    Scores fall in bands: prefix 0.9-1.0, substring 0.6-0.9, fuzzy 0-0.6.
+    """
+    q = query.lower()
+    label_l = (label or "").lower()
+    if label_l.startswith(q):
+        return 0.9 + 0.1 * (len(q) / max(len(label_l), 1))
+    if q in label_l:
+        return 0.6 + 0.3 * (len(q) / max(len(label_l), 1))
+    if detail and q in detail.lower():
+        return 0.6
+    return 0.6 * max(_similarity(query, label), _similarity(query, detail))
+
+
+# ============================================================================
+# Queries
+# ============================================================================
+
+def _fts_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+# Fuzzy matching ignores trigrams present in more than this share of rows
+# (e.g. the "TX-" every arete starts with); ranking their postings would
+# cost more than the whole search budget.
+MAX_TRIGRAM_DOC_SHARE = 0.02
+MIN_TRIGRAM_DOC_LIMIT = 500
+
+_SQLITE_QUERIES = {
+    "animal": (
+        "SELECT c.id, c.arete_number, c.notes FROM {prefix}cattle_fts "
+        "CROSS JOIN {prefix}cattle c ON c.rowid = cattle_fts.rowid "
+        "WHERE cattle_fts MATCH :match AND +c.ranch_id = :ranch_id "
+        "{order} LIMIT :limit"
+    ),
+    "client": (
+        "SELECT c.id, c.name, c.contact_name FROM {prefix}clients_fts "
+        "CROSS JOIN {prefix}clients c ON c.rowid = clients_fts.rowid "
+        "WHERE clients_fts MATCH :match AND +c.ranch_id = :ranch_id "
+        "{order} LIMIT :limit"
+    ),
+    "worker": (
+        "SELECT w.id, w.full_name, w.position FROM {prefix}workers_fts "
+        "CROSS JOIN {prefix}workers w ON w.rowid = workers_fts.rowid "
+        "WHERE workers_fts MATCH :match AND +w.ranch_id = :ranch_id "
+        "{order} LIMIT :limit"
+    ),
+}
+
+# CROSS JOIN pins the FTS table as the outer loop and the unary "+" keeps
+# SQLite from driving the query from the ranch_id index instead (which would
+# run one MATCH per animal of the ranch). Arete prefixes are answered from
+# the plain arete_number index for the same reason.
+_SQLITE_ARETE_PREFIX = (
+    "SELECT id, arete_number, notes FROM {prefix}cattle "
+    "WHERE arete_number >= :low AND arete_number < :high AND +ranch_id = :ranch_id "
+    "LIMIT :limit"
+)
+
+_ENTITY_FTS = {"animal": "cattle_fts", "client": "clients_fts", "worker": "workers_fts"}
+
+
+def _selective_trigrams(db: Session, fts: str, query: str, prefix: str) -> List[str]:
+    """Query trigrams rare enough to rank cheaply, via the fts5vocab table"""
+    q = query.lower()
+    grams = sorted({q[i:i + 3] for i in range(len(q) - 2)})
+    if not grams:
+        return []
+
+    params = {f"t{i}": gram for i, gram in enumerate(grams)}
+    placeholders = ", ".join(f":{name}" for name in params)
+    doc_counts = dict(db.execute(
+        text(f"SELECT term, doc FROM {prefix}{fts}_vocab WHERE term IN ({placeholders})"),
+        params
+    ).fetchall())
+    total = db.execute(text(f"SELECT count(*) FROM {prefix}{fts}_docsize")).scalar() or 0
+
+    max_docs = max(MIN_TRIGRAM_DOC_LIMIT, int(total * MAX_TRIGRAM_DOC_SHARE))
+    return [g for g in grams if 0 < doc_counts.get(g, 0) <= max_docs]
+
+
+def _sqlite_candidates(
+    db: Session, entity: str, ranch_id: str, query: str, limit: int, prefix: str
+) -> list:
+    """Prefix, then substring, then fuzzy candidates until `limit` are found"""
+    candidate_limit = limit * CANDIDATE_FACTOR
+    rows = []
+
+    if entity == "animal":
+        low = query.upper()
+        rows += db.execute(
+            text(_SQLITE_ARETE_PREFIX.format(prefix=prefix)),
+            {"low": low, "high": low + "\U0010ffff", "ranch_id": ranch_id, "limit": candidate_limit}
+        ).fetchall()
+
+    if len(query) < 3:
+        return rows
+
+    seen = {row[0] for row in rows}
+    statement = _SQLITE_QUERIES[entity]
+
+    # Substring matches need no ranking here, so skip bm25 and stop early
+    substring = db.execute(
+        text(statement.format(prefix=prefix, order="")),
+        {"match": _fts_phrase(query), "ranch_id": ranch_id, "limit": candidate_limit}
+    ).fetchall()
+    rows += [row for row in substring if row[0] not in seen]
+
+    if len(rows) >= limit or len(query) < 4:
+        return rows
+
+    grams = _selective_trigrams(db, _ENTITY_FTS[entity], query, prefix)
+    if not grams:
+        return rows
+
+    seen = {row[0] for row in rows}
+    fts = _ENTITY_FTS[entity]
+    fuzzy = db.execute(
+        text(statement.format(prefix=prefix, order=f"ORDER BY bm25({fts})")),
+        {"match": " OR ".join(_fts_phrase(g) for g in grams), "ranch_id": ranch_id, "limit": candidate_limit}
+    ).fetchall()
+    rows += [row for row in fuzzy if row[0] not in seen]
+    return rows
+
+
+_PG_QUERIES = {
+    "animal": (
+        "SELECT id, arete_number, notes FROM {prefix}cattle "
+        "WHERE ranch_id = :ranch_id AND (arete_number ILIKE :like OR arete_number % :q "
+        "OR notes ILIKE :like) "
+        "ORDER BY similarity(arete_number, :q) DESC LIMIT :limit"
+    ),
+    "client": (
+        "SELECT id, name, contact_name FROM {prefix}clients "
+        "WHERE ranch_id = :ranch_id AND (name ILIKE :like OR name % :q) "
+        "ORDER BY similarity(name, :q) DESC LIMIT :limit"
+    ),
+    "worker": (
+        "SELECT id, full_name, position FROM {prefix}workers "
+        "WHERE ranch_id = :ranch_id AND (full_name ILIKE :like OR full_name % :q) "
+        "ORDER BY similarity(full_name, :q) DESC LIMIT :limit"
+    ),
+}
+
+_LIKE_QUERIES = {
+    "animal": (
+        "SELECT id, arete_number, notes FROM {prefix}cattle WHERE ranch_id = :ranch_id "
+        "AND (arete_number LIKE :like OR notes LIKE :like) LIMIT :limit"
+    ),
+    "client": (
+        "SELECT id, name, contact_name FROM {prefix}clients WHERE ranch_id = :ranch_id "
+        "AND (name LIKE :like OR contact_name LIKE :like) LIMIT :limit"
+    ),
+    "worker": (
+        "SELECT id, full_name, position FROM {prefix}workers WHERE ranch_id = :ranch_id "
+        "AND full_name LIKE :like LIMIT :limit"
+    ),
+}
+
+
+def _has_fts(db: Session, prefix: str) -> bool:
+    return db.execute(
+        text(f"SELECT 1 FROM {prefix}sqlite_master WHERE name = 'cattle_fts'")
+    ).first() is not None
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fetch_candidates(db: Session, entity: str, ranch_id: str, query: str, limit: int) -> list:
+    """Pull candidate rows for one entity type from the dialect's index"""
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    prefix = _schema_prefix(bind)
+    like = f"%{_escape_like(query)}%"
+
+    if dialect == "sqlite" and _has_fts(db, prefix):
+        return _sqlite_candidates(db, entity, ranch_id, query, limit, prefix)
+
+    if dialect == "postgresql":
+        return db.execute(
+            text(_PG_QUERIES[entity].format(prefix=prefix)),
+            {"ranch_id": ranch_id, "q": query, "like": like, "limit": limit}
+        ).fetchall()
+
+    # Databases without search indexes: substring scan
+    statement = _LIKE_QUERIES[entity].format(prefix=prefix)
+    if dialect == "sqlite":
+        statement = statement.replace("LIKE :like", "LIKE :like ESCAPE '\\'")
+    return db.execute(
+        text(statement),
+        {"ranch_id": ranch_id, "like": like, "limit": limit}
+    ).fetchall()
+
+
+def search(
+    db: Session,
+    ranch_id: str,
+    query: str,
+    types: Optional[Sequence[str]] = None,
+    limit: int = 20
+) -> List[Dict]:
+    """
+    Search animals, clients and workers of a ranch.
+
+    Args:
+        db: Database session
+        ranch_id: Ranch to search in
+        query: Partial arete number or name
+        types: Subset of SEARCH_TYPES (default: all)
+        limit: Maximum number of results
+
+    Returns:
+        Matches sorted by score (1.0 = exact prefix match)
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    results = []
+    for entity in types or SEARCH_TYPES:
+        if entity not in SEARCH_TYPES:
+            raise ValueError(f"Unknown search type: {entity}")
+
+        for entity_id, label, detail in _fetch_candidates(db, entity, ranch_id, query, limit):
+            score = _score(query, label, detail)
+            if score < SIMILARITY_THRESHOLD * 0.6:
+                continue
+            results.append({
+                "type": entity,
+                "id": entity_id,
+                "label": label,
+                "detail": detail,
+                "score": round(score, 3)
+            })
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:limit]
@@ -0,0 +1,128 @@
+"""
+ERP Ganadero - Single-Flight Request Coalescing (L2 Foundation)
+
+Concurrent identical calls share one in-flight computation: when a ranch's
+whole team opens the dashboard at once, KPIs and AI insights are computed
+once and every waiter gets the same result (or the same exception).
+"""
+
+from enum import Enum
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+
+import structlog
+
+from ..L1_config.metrics import register_collector
+
+logger = structlog.get_logger()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable, order-independent form of a parameter value"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        frozen = [_freeze(v) for v in value]
+        return tuple(sorted(frozen, key=repr) if isinstance(value, (set, frozenset)) else frozen)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def make_key(*parts: Any, **params: Any) -> Tuple:
+    """
+    Coalescing key from positional parts and normalized params.
+
+    None-valued params are dropped and dicts are order-independent, so
+    ?a=1&b=2 and ?b=2&a=1 coalesce.
+    """
+    return tuple(_freeze(p) for p in parts) + tuple(
+        sorted((k, _freeze(v)) for k, v in params.items() if v is not None)
+    )
+
+
+class SingleFlight:
+    """One in-flight computation per key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the identical call already running for key"""
+        self.stats["calls"] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["executions"] += 1
+            # Own task, so a caller disconnecting doesn't cancel the others
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._finished(key, t))
+
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+            logger.warning("single_flight_failed", group=self.name, error=str(task.exception()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._inflight)}
+
+
+# Named groups
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get (or create) the single-flight group for name"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Coalescing counters for every group"""
+    return {name: group.get_stats() for name, group in _groups.items()}
+
+
+def _collect_metrics():
+    stats = get_single_flight_stats()
+    families = [
+        (f"single_flight_{counter}_total", "counter", f"Single-flight {counter} per group",
+         [({"group": name}, group[counter]) for name, group in stats.items()])
+        for counter in ("calls", "executions", "coalesced", "errors")
+    ]
+    families.append(("single_flight_in_flight", "gauge", "Executions currently in flight",
+                     [({"group": name}, group["in_flight"]) for name, group in stats.items()]))
+    return families
+
+
+register_collector(_collect_metrics)
+
+
+def single_flight(name: str, key: Callable[..., Hashable]):
+    """
+    Decorator coalescing concurrent calls of an async function.
+
+    Usage:
+        @single_flight("kpis", key=lambda self, ranch_id: make_key(ranch_id))
+        async def calculate_herd_metrics(self, ranch_id): ...
+    """
+    group = get_single_flight(name)
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await group.do(key(*args, **kwargs), lambda: fn(*args, **kwargs))
+        return wrapper
+
+    return decorator
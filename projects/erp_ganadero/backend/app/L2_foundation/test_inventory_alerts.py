@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.L1_config.database import Base
+from app.L1_config import models  # noqa: F401 - registers tables
+from app.L2_foundation.inventory_crud_db import (
+    create_inventory_item, update_inventory_item,
+    list_low_stock, list_inventory_alerts, get_days_of_supply
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_alerts_only_on_threshold_crossing(db):
+    item = create_inventory_item(db, "ranch-1", "feed", "Alfalfa", 500, "kg", min_stock=100)
+    
+    update_inventory_item(db, item.id, quantity=300)   # still healthy
+    update_inventory_item(db, item.id, quantity=80)    # crosses down
+    update_inventory_item(db, item.id, quantity=50)    # stays low
+    update_inventory_item(db, item.id, quantity=400)   # restocked
+    
+    kinds = [a.kind for a in list_inventory_alerts(db, "ranch-1")]
+    assert kinds == ["low_stock", "restocked"]
+
+
+def test_create_below_min_stock_emits_alert(db):
+    create_inventory_item(db, "ranch-1", "vaccine", "Clostridial", 2, "dosis", min_stock=10)
+    
+    alerts = list_inventory_alerts(db, "ranch-1")
+    assert len(alerts) == 1
+    assert alerts[0].kind == "low_stock"
+
+
+def test_low_stock_query_uses_partial_index(db):
+    create_inventory_item(db, "ranch-1", "feed", "Maiz", 5, "kg", min_stock=10)
+    create_inventory_item(db, "ranch-1", "feed", "Sorgo", 50, "kg", min_stock=10)
+    create_inventory_item(db, "ranch-1", "feed", "Sal", 1, "kg")
+    
+    assert [i.name for i in list_low_stock(db, "ranch-1")] == ["Maiz"]
+    
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT * FROM inventory "
+        "WHERE ranch_id = 'ranch-1' AND quantity <= min_stock ORDER BY quantity"
+    ).fetchall()
+    assert any("idx_inventory_low_stock" in str(row) for row in plan)
+
+
+def test_days_of_supply_from_consumption(db):
+    item = create_inventory_item(db, "ranch-1", "feed", "Alfalfa", 600, "kg", min_stock=100)
+    update_inventory_item(db, item.id, quantity=300)  # 300 kg consumed
+    
+    projection = get_days_of_supply(db, "ranch-1", window_days=30)[0]
+    assert projection["avg_daily_usage"] == 10.0
+    assert projection["days_of_supply"] == 30.0
+
+
+
+def test_seq_cursor_returns_alerts_inserted_after_a_poll(db):
+    first = create_inventory_item(db, "ranch-1", "feed", "Alfalfa", 5, "kg", min_stock=10)
+    
+    page = list_inventory_alerts(db, "ranch-1")
+    assert [a.item_id for a in page] == [first.id]
+    cursor = page[-1].seq
+    
+    # Written after the poll advanced the cursor, in the same clock tick and
+    # with a random id that may sort before the one already seen
+    second = create_inventory_item(db, "ranch-1", "feed", "Maiz", 1, "kg", min_stock=10)
+    db.query(models.InventoryAlert).filter_by(item_id=second.id).update(
+        {"created_at": page[-1].created_at, "id": "0" * 36}
+    )
+    db.commit()
+    
+    assert [a.item_id for a in list_inventory_alerts(db, "ranch-1", after_seq=cursor)] == [second.id]
+    assert list_inventory_alerts(db, "ranch-1", after_seq=cursor + 1) == []
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.L2_foundation import auth_service
+from app.L2_foundation.profiler import Profiler, ProfilerMiddleware
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _app(profiler):
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+    @app.get("/herd/{ranch_id}/busy")
+    async def busy(ranch_id: str):
+        _spin(0.05)
+        return {}
+
+    @app.get("/herd/{ranch_id}/waiting")
+    async def waiting(ranch_id: str):
+        await asyncio.sleep(0.05)
+        return {}
+
+    return app
+
+
+def _get(app, *paths, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in paths:
+                await client.get(path, headers=headers)
+    asyncio.run(run())
+
+
+def test_samples_running_and_awaiting_requests_per_route():
+    profiler = Profiler(interval_ms=1, sample_percent=100)
+    _get(_app(profiler), "/herd/r1/busy", "/herd/r2/busy", "/herd/r1/waiting")
+
+    collapsed = profiler.collapsed()
+    busy = [line for line in collapsed.splitlines() if line.startswith("GET /herd/{ranch_id}/busy;")]
+    waiting = [line for line in collapsed.splitlines() if line.startswith("GET /herd/{ranch_id}/waiting;")]
+
+    assert any("_spin" in line for line in busy)
+    assert any("sleep" in line for line in waiting)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+    assert profiler.summary()["requests_profiled"] == 3
+    assert profiler.summary()["in_flight"] == 0
+
+
+def test_only_admin_header_or_window_enables_profiling(monkeypatch):
+    monkeypatch.setattr(auth_service, "ADMIN_API_TOKEN", "secret")
+    profiler = Profiler(interval_ms=1, sample_percent=0)
+    app = _app(profiler)
+
+    _get(app, "/herd/r1/busy")
+    _get(app, "/herd/r1/busy", headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+    assert profiler.stats["requests_profiled"] == 0
+
+    _get(app, "/herd/r1/busy", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert profiler.stats["requests_profiled"] == 1
+
+    profiler.start_window(60)
+    _get(app, "/herd/r1/busy")
+    profiler.stop_window()
+    _get(app, "/herd/r1/busy")
+    assert profiler.stats["requests_profiled"] == 2
+
+
+def test_samples_after_end_are_not_counted():
+    profiler = Profiler(interval_ms=1000, sample_percent=100)
+    request = profiler.begin(sys._getframe())
+    profiler.sample()
+    profiler.sample()
+    profiler.end(request, "GET", "/herd")
+    samples = profiler.summary()["samples"]
+
+    profiler.sample()
+
+    assert samples >= 2
+    assert profiler.summary()["samples"] == samples
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in profiler.collapsed().splitlines()) == samples
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.L1_config.database import Base
+from app.L1_config import models  # noqa: F401 - registers tables
+from app.L2_foundation.search_db import ensure_search_indexes, search
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_indexes(engine)
+    session = sessionmaker(bind=engine)()
+    for i, arete in enumerate(["TX-452", "TX-4521", "MX-1452", "BEC-102"]):
+        session.execute(text(
+            "INSERT INTO cattle (id, ranch_id, arete_number, species, gender, birth_date, notes) "
+            "VALUES (:id, 'ranch-1', :arete, 'VACA', 'F', '2020-01-01', :notes)"
+        ), {"id": f"c{i}", "arete": arete, "notes": "vaca pinta" if i == 3 else None})
+    session.execute(text(
+        "INSERT INTO workers (id, ranch_id, full_name) VALUES ('w1', 'ranch-1', 'Juan Perez')"
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_prefix_matches_rank_first(db):
+    results = search(db, "ranch-1", "TX-45")
+    assert [r["label"] for r in results[:2]] == ["TX-452", "TX-4521"]
+    assert results[0]["score"] > results[-1]["score"]
+
+
+def test_substring_and_notes(db):
+    assert {r["id"] for r in search(db, "ranch-1", "452")} == {"c0", "c1", "c2"}
+    assert [r["id"] for r in search(db, "ranch-1", "pinta")] == ["c3"]
+
+
+def test_fuzzy_and_type_filter(db):
+    assert search(db, "ranch-1", "peres", types=["worker"])[0]["id"] == "w1"
+    assert search(db, "ranch-1", "perez", types=["animal"]) == []
+
+
+def test_triggers_keep_index_in_sync(db):
+    db.execute(text("UPDATE cattle SET arete_number = 'AR-999' WHERE id = 'c3'"))
+    db.commit()
+    assert search(db, "ranch-1", "AR-99")[0]["id"] == "c3"
+    assert search(db, "ranch-1", "BEC-1") == []
+
+
+def test_other_ranch_not_returned(db):
+    assert search(db, "ranch-2", "TX") == []
+
+
+def test_search_follows_the_schema_translate_map():
+    # A shard engine maps the default schema to the ranch's schema; on
+    # SQLite an attached database stands in for the Postgres schema
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ':memory:' AS ranch_x")
+    shard = engine.execution_options(schema_translate_map={None: "ranch_x"})
+    Base.metadata.create_all(bind=shard)
+    ensure_search_indexes(shard)
+
+    session = sessionmaker(bind=shard)()
+    session.execute(text(
+        "INSERT INTO ranch_x.cattle (id, ranch_id, arete_number, species, gender, birth_date) "
+        "VALUES ('c1', 'ranch-1', 'TX-452', 'VACA', 'F', '2020-01-01')"
+    ))
+    session.commit()
+
+    assert [r["id"] for r in search(session, "ranch-1", "TX-45")] == ["c1"]
+    assert [r["id"] for r in search(session, "ranch-1", "x-452")] == ["c1"]
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT name FROM main.sqlite_master WHERE name = 'cattle_fts'").first() is None
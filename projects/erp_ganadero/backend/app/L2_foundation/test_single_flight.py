@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.L2_foundation.single_flight import SingleFlight, make_key
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight("test")
+    runs = []
+
+    async def compute(ranch_id):
+        runs.append(ranch_id)
+        await asyncio.sleep(0.01)
+        return {"ranch_id": ranch_id}
+
+    async def main():
+        calls = [group.do(make_key("kpis", ranch_id=r), lambda r=r: compute(r))
+                 for r in ["ranch-1"] * 5 + ["ranch-2"] * 2]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(main())
+
+    assert runs == ["ranch-1", "ranch-2"]
+    assert results[0] is results[4]
+    assert group.get_stats() == {"calls": 7, "executions": 2, "coalesced": 5, "errors": 0, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    group = SingleFlight("test")
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def main():
+        first = await asyncio.gather(*[group.do("k", flaky) for _ in range(3)], return_exceptions=True)
+        return first, await group.do("k", flaky)
+
+    first, second = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert second == "ok"
+    assert group.stats["errors"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    group = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def main():
+        leader = asyncio.ensure_future(group.do("k", slow))
+        follower = asyncio.ensure_future(group.do("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == 42
+
+
+def test_keys_ignore_param_order_and_none():
+    assert make_key("r", a=1, b={"x": 1, "y": 2}, c=None) == make_key("r", b={"y": 2, "x": 1}, a=1)
@@ -10,6 +10,7 @@ from ..L2_foundation.cattle_crud import get_cattle_crud
 from ..L2_foundation.event_crud import get_event_crud
 from ..L1_config.cattle_types import EventType, Status, HerdMetrics
 from ..L1_config.system_config import KPI_TARGETS
+from ..L2_foundation.single_flight import make_key, single_flight
 import structlog
 
 logger = structlog.get_logger()
@@ -22,6 +23,7 @@ class KPICalculator:
         self.cattle_crud = get_cattle_crud()
         self.event_crud = get_event_crud()
     
+    @single_flight("herd_metrics", key=lambda self, ranch_id: make_key(ranch_id))
     async def calculate_herd_metrics(self, ranch_id: str) -> HerdMetrics:
         """Calculate all KPIs for a ranch"""
         
@@ -1,124 +1,362 @@
 """
 AI Analytics Service
 Generates insights for health, reproduction, finance, and growth
+
+Generations are accounted per ranch in ai_usage; a ranch over its AI
+budget gets cached insights only, or the local provider.
 """
 
-from typing import Dict, Any
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Dict, Any, List, Optional, Tuple, TypeVar
 from app.L4_synthesis.ai_provider import get_ai_provider, AIProvider
 from app.L4_synthesis.ai_cache import get_cache
+from app.L4_synthesis.ai_cache_keys import get_cache_keying
+from app.L4_synthesis.ai_usage import AI_BUDGET_LIMITED, estimate_tokens, get_usage_ledger
+from app.L2_foundation.single_flight import make_key, single_flight
+from app.L1_config.metrics import counter, histogram
 from app.L1_config.ai_prompts import (
     build_health_prompt,
     build_reproduction_prompt,
     build_financial_prompt,
-    build_growth_prompt
+    build_growth_prompt,
+    build_overview_prompt,
+    split_overview_sections
 )
+import asyncio
+import os
 import structlog
+import time
 
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+# gemini | openai | ollama | router (see ai_router)
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")
+# Response budget per section of a combined (analyze_all) prompt
+OVERVIEW_TOKENS_PER_SECTION = int(os.getenv("AI_OVERVIEW_TOKENS_PER_SECTION", "300"))
+
+PROMPT_BUILDERS = {
+    "health": build_health_prompt,
+    "reproduction": build_reproduction_prompt,
+    "financial": build_financial_prompt,
+    "growth": build_growth_prompt,
+}
+
+AI_PROVIDER_SECONDS = histogram(
+    "ai_provider_request_seconds", "AI provider generation latency", ("provider", "analysis"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+)
+AI_PROVIDER_ERRORS = counter("ai_provider_errors_total", "Failed AI provider generations", ("provider", "analysis"))
+AI_STREAM_TTFB = histogram(
+    "ai_stream_ttfb_seconds", "Time to the first event of a streamed insight", ("analysis", "source"),
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0)
+)
+
+# Completion fields in the order the prompts ask for them
+SECTION_FIELDS = ("INSIGHT", "RECOMMENDATION", "ALERT", "CONFIDENCE")
+
+
+def _completed_fields(text: str, sent: set) -> List[str]:
+    """Fields not yet sent whose text is final (a later field has started)"""
+    positions = {field: text.find(f"{field}:") for field in SECTION_FIELDS}
+    completed = []
+    for field in SECTION_FIELDS:
+        start = positions[field]
+        if field not in sent and start >= 0 and any(pos > start for pos in positions.values()):
+            completed.append(field)
+    return completed
+
+
+def _response_text(result: Dict[str, Any]) -> str:
+    """Completion as the prompts ask for it, rebuilt from a parsed insight"""
+    return "\n".join(f"{field}: {result.get(field.lower())}" for field in SECTION_FIELDS)
+
+
+def _metrics_key(service: "AIAnalyticsService", metrics: Dict[str, Any], ranch_id: Optional[str] = None):
+    """Identical metrics on the same provider share one generation (per ranch, which pays for it)"""
+    return make_key(service.provider_name, metrics, ranch_id=ranch_id)
+
 
 class AIAnalyticsService:
     """Service for generating AI-powered analytics insights"""
     
     def __init__(self, provider_name: str = "gemini"):
-        self.provider: AIProvider = get_ai_provider(provider_name)
+        self.provider_name = provider_name
+        self._provider: Optional[AIProvider] = None
+        self._local_provider: Optional[AIProvider] = None
         self.cache = get_cache()
+        self.keying = get_cache_keying()
+        self.usage = get_usage_ledger()
     
-    async def analyze_health(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate health insights"""
-        prompt = build_health_prompt(metrics)
-        context = {"type": "health", "metrics": metrics}
+    @property
+    def provider(self) -> AIProvider:
+        """Provider, constructed on first use"""
+        if self._provider is None:
+            self._provider = get_ai_provider(self.provider_name)
+        return self._provider
+    
+    @property
+    def local_provider(self) -> AIProvider:
+        """Ollama provider for ranches over budget with AI_BUDGET_ACTION=local"""
+        if self.provider_name == "ollama":
+            return self.provider
+        if self._local_provider is None:
+            self._local_provider = get_ai_provider("ollama")
+        return self._local_provider
+    
+    def warmup(self):
+        """Construct the provider and load its SDK (blocking; run off the event loop)"""
+        self.provider.warmup()
+    
+    async def aclose(self):
+        """Close provider connections (only if the provider was built), flush usage and cache writes"""
+        for provider in (self._provider, self._local_provider):
+            if provider is not None:
+                await provider.aclose()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.usage.close)
+        await loop.run_in_executor(None, self.cache.close)
+    
+    def _budget_provider(self, ranch_id: Optional[str]) -> Optional[AIProvider]:
+        """Provider for the ranch's next generation; None when its budget allows cached insights only"""
+        exceeded = self.usage.over_budget(ranch_id)
+        if exceeded is None:
+            return self.provider
+        AI_BUDGET_LIMITED.inc(self.usage.action)
+        logger.info("ai_budget_exceeded", ranch_id=ranch_id, budget=exceeded, action=self.usage.action)
+        if self.usage.action == "local":
+            return self.local_provider
+        return None
+    
+    def _account(self, ranch_id: Optional[str], analysis: str, provider: AIProvider,
+                 prompt: str, response: str, label: str):
+        """Record estimated tokens and cost of one generation"""
+        prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(response)
+        cost = provider.cost_for(label, prompt_tokens, response_tokens)
+        self.usage.record(ranch_id, label, analysis, prompt_tokens, response_tokens, cost)
+    
+    async def _timed(self, analysis: str, call: Awaitable[T]) -> T:
+        """Provider call, timed and counted per analysis type"""
+        started = time.perf_counter()
+        try:
+            return await call
+        except Exception:
+            AI_PROVIDER_ERRORS.inc(self.provider_name, analysis)
+            raise
+        finally:
+            AI_PROVIDER_SECONDS.observe(time.perf_counter() - started, self.provider_name, analysis)
+    
+    def _lookup(self, analysis: str, metrics: Dict[str, Any],
+                ranch_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Cached response on the quantized metrics (exact band, then nearest
+        answered metrics), and the quantized metrics. Hits count toward
+        the ranch's usage at no cost.
+        """
+        build_prompt = PROMPT_BUILDERS[analysis]
+        quantized = self.keying.quantize(analysis, metrics)
+        raw_key = make_key(analysis, metrics)
         
-        # Check cache first
-        cached = self.cache.get(prompt, context)
+        cached = self.cache.get(build_prompt(quantized), {"type": analysis, "metrics": quantized})
         if cached:
-            return cached
+            self.keying.record(analysis, raw_key, "exact")
+            self.usage.record(ranch_id, cached.get("provider", self.provider_name), analysis, cache_hit=True)
+            return {**cached, "cache": {"match": "exact", "similarity": 1.0}}, quantized
         
-        # Generate new insight
-        try:
-            result = await self.provider.generate_insight(prompt, context)
-            self.cache.set(prompt, context, result)
-            
-            logger.info("health_insight_generated", 
-                       confidence=result.get('confidence'),
-                       cached=False)
-            
-            return result
-        except Exception as e:
-            logger.error("health_analysis_failed", error=str(e))
-            return self._fallback_response("health")
+        near = self.keying.nearest(analysis, metrics)
+        if near is not None:
+            near_metrics, similarity = near
+            cached = self.cache.get(build_prompt(near_metrics), {"type": analysis, "metrics": near_metrics})
+            if cached:
+                self.keying.record(analysis, raw_key, "near", similarity)
+                self.usage.record(ranch_id, cached.get("provider", self.provider_name), analysis, cache_hit=True)
+                return {**cached, "cache": {"match": "near", "similarity": round(similarity, 3)}}, quantized
+        self.keying.record(analysis, raw_key, None)
+        return None, quantized
     
-    async def analyze_reproduction(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate reproductive performance insights"""
-        prompt = build_reproduction_prompt(metrics)
-        context = {"type": "reproduction", "metrics": metrics}
-        
-        # Check cache
-        cached = self.cache.get(prompt, context)
+    def _store(self, analysis: str, metrics: Dict[str, Any], quantized: Dict[str, Any], result: Dict[str, Any]):
+        """Cache a generated response under its quantized key (never placeholders or fallbacks)"""
+        if result.get("error") or str(result.get("provider", "")).endswith("(unavailable)"):
+            return
+        self.cache.set(PROMPT_BUILDERS[analysis](quantized), {"type": analysis, "metrics": quantized}, result)
+        self.keying.remember(analysis, metrics, quantized)
+    
+    async def _cached_insight(self, analysis: str, metrics: Dict[str, Any],
+                              ranch_id: Optional[str]) -> Dict[str, Any]:
+        """Cached insight, else one generated from the exact metrics"""
+        cached, quantized = self._lookup(analysis, metrics, ranch_id)
         if cached:
             return cached
-        
-        # Generate new insight
+        return await self._generate_insight(analysis, metrics, quantized, ranch_id, self._budget_provider(ranch_id))
+    
+    async def _generate_insight(self, analysis: str, metrics: Dict[str, Any], quantized: Dict[str, Any],
+                                ranch_id: Optional[str], provider: Optional[AIProvider]) -> Dict[str, Any]:
+        if provider is None:
+            return self._budget_response(analysis)
+        prompt = PROMPT_BUILDERS[analysis](metrics)
         try:
-            result = await self.provider.generate_insight(prompt, context)
-            self.cache.set(prompt, context, result)
+            result = await self._timed(analysis, provider.generate_insight(prompt, {"type": analysis, "metrics": metrics}))
+            self._store(analysis, metrics, quantized, result)
+            self._account(ranch_id, analysis, provider, prompt, _response_text(result),
+                          result.get("provider", provider.name))
             
-            logger.info("reproduction_insight_generated",
+            logger.info(f"{analysis}_insight_generated",
                        confidence=result.get('confidence'),
                        cached=False)
             
             return result
         except Exception as e:
-            logger.error("reproduction_analysis_failed", error=str(e))
-            return self._fallback_response("reproduction")
+            logger.error(f"{analysis}_analysis_failed", error=str(e))
+            return self._fallback_response(analysis)
+    
+    @single_flight("ai_health", key=_metrics_key)
+    async def analyze_health(self, metrics: Dict[str, Any], ranch_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate health insights"""
+        return await self._cached_insight("health", metrics, ranch_id)
     
-    async def analyze_financial(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    @single_flight("ai_reproduction", key=_metrics_key)
+    async def analyze_reproduction(self, metrics: Dict[str, Any], ranch_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate reproductive performance insights"""
+        return await self._cached_insight("reproduction", metrics, ranch_id)
+    
+    @single_flight("ai_financial", key=_metrics_key)
+    async def analyze_financial(self, metrics: Dict[str, Any], ranch_id: Optional[str] = None) -> Dict[str, Any]:
         """Generate financial insights"""
-        prompt = build_financial_prompt(metrics)
-        context = {"type": "financial", "metrics": metrics}
+        return await self._cached_insight("financial", metrics, ranch_id)
+    
+    @single_flight("ai_growth", key=_metrics_key)
+    async def analyze_growth(self, metrics: Dict[str, Any], ranch_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate growth & production insights"""
+        return await self._cached_insight("growth", metrics, ranch_id)
+    
+    @single_flight("ai_overview", key=_metrics_key)
+    async def analyze_all(self, metrics: Dict[str, Dict[str, Any]],
+                          ranch_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Insights for every analysis type in metrics ({"health": {...}, ...}).
         
-        # Check cache
-        cached = self.cache.get(prompt, context)
-        if cached:
-            return cached
+        Types already cached are served from the cache; the rest share one
+        combined prompt, and each parsed section is cached under its own
+        type so later single-type calls hit.
+        """
+        unknown = set(metrics) - set(PROMPT_BUILDERS)
+        if unknown:
+            raise ValueError(f"Unknown analysis types: {sorted(unknown)}")
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for analysis, values in metrics.items():
+            cached, quantized = self._lookup(analysis, values, ranch_id)
+            if cached:
+                results[analysis] = cached
+            else:
+                missing[analysis] = (values, quantized)
+        
+        provider = self._budget_provider(ranch_id) if missing else None
+        if provider is not None and len(missing) > 1:
+            sections = await self._generate_overview(
+                {analysis: values for analysis, (values, _) in missing.items()}, ranch_id, provider
+            )
+            for analysis, result in sections.items():
+                values, quantized = missing.pop(analysis)
+                if not result.get("error"):
+                    self._store(analysis, values, quantized, result)
+                results[analysis] = result
         
-        # Generate new insight
+        # A single missing type, or sections the combined answer left out
+        if missing:
+            generated = await asyncio.gather(*[
+                self._generate_insight(analysis, values, quantized, ranch_id, provider)
+                for analysis, (values, quantized) in missing.items()
+            ])
+            results.update(zip(missing, generated))
+        
+        return {analysis: results[analysis] for analysis in metrics}
+    
+    async def _generate_overview(self, metrics: Dict[str, Dict[str, Any]], ranch_id: Optional[str],
+                                 provider: AIProvider) -> Dict[str, Dict[str, Any]]:
+        """Parsed sections of one combined generation (fallbacks if the provider fails)"""
+        prompt = build_overview_prompt(metrics)
+        max_tokens = OVERVIEW_TOKENS_PER_SECTION * len(metrics)
         try:
-            result = await self.provider.generate_insight(prompt, context)
-            self.cache.set(prompt, context, result)
-            
-            logger.info("financial_insight_generated",
-                       confidence=result.get('confidence'),
-                       cached=False)
-            
-            return result
+            text, label = await self._timed("overview", provider.generate_text(prompt, max_tokens))
+        except NotImplementedError:
+            return {}  # provider only does single insights
         except Exception as e:
-            logger.error("financial_analysis_failed", error=str(e))
-            return self._fallback_response("financial")
-    
-    async def analyze_growth(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate growth & production insights"""
-        prompt = build_growth_prompt(metrics)
-        context = {"type": "growth", "metrics": metrics}
+            logger.error("overview_analysis_failed", error=str(e))
+            return {analysis: self._fallback_response(analysis) for analysis in metrics}
         
-        # Check cache
-        cached = self.cache.get(prompt, context)
+        self._account(ranch_id, "overview", provider, prompt, text, label)
+        generated_at = datetime.now().isoformat()
+        sections = {}
+        for analysis, block in split_overview_sections(text).items():
+            insight = provider.parse_insight(block)
+            if analysis in metrics and insight["insight"] != "N/A":
+                sections[analysis] = {**insight, "provider": label, "generated_at": generated_at}
+        
+        logger.info("overview_insight_generated", sections=sorted(sections),
+                   missing=sorted(set(metrics) - set(sections)))
+        return sections
+    
+    async def stream_insight(self, analysis: str, metrics: Dict[str, Any],
+                             ranch_id: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        (event, data) pairs for server-sent events: "token" chunks and
+        finished "section" fields while the provider writes, then the parsed
+        "result", cached like analyze_*. A cache hit is a lone "result".
+        Streams are not coalesced by single_flight.
+        """
+        started = time.perf_counter()
+        cached, quantized = self._lookup(analysis, metrics, ranch_id)
         if cached:
-            return cached
+            AI_STREAM_TTFB.observe(time.perf_counter() - started, analysis, "cache")
+            yield "result", cached
+            return
+        
+        provider = self._budget_provider(ranch_id)
+        if provider is None:
+            yield "result", self._budget_response(analysis)
+            return
         
-        # Generate new insight
+        prompt = PROMPT_BUILDERS[analysis](metrics)
+        text, label, sent = "", self.provider_name, set()
         try:
-            result = await self.provider.generate_insight(prompt, context)
-            self.cache.set(prompt, context, result)
-            
-            logger.info("growth_insight_generated",
-                       confidence=result.get('confidence'),
-                       cached=False)
-            
-            return result
+            async for chunk, label in provider.stream_text(prompt):
+                if not text:
+                    AI_STREAM_TTFB.observe(time.perf_counter() - started, analysis, "provider")
+                text += chunk
+                yield "token", {"text": chunk}
+                for field in _completed_fields(text, sent):
+                    sent.add(field)
+                    yield "section", {"field": field.lower(), "text": provider.parse_insight(text)[field.lower()]}
         except Exception as e:
-            logger.error("growth_analysis_failed", error=str(e))
-            return self._fallback_response("growth")
+            AI_PROVIDER_ERRORS.inc(self.provider_name, analysis)
+            logger.error(f"{analysis}_analysis_failed", error=str(e), streamed=True, chars=len(text))
+            if text:
+                self._account(ranch_id, analysis, provider, prompt, text, label)  # tokens already billed
+            yield "result", self._fallback_response(analysis)
+            return
+        finally:
+            AI_PROVIDER_SECONDS.observe(time.perf_counter() - started, self.provider_name, analysis)
+        
+        if text:
+            self._account(ranch_id, analysis, provider, prompt, text, label)
+        result = {**provider.parse_insight(text), "provider": label, "generated_at": datetime.now().isoformat()}
+        if result["insight"] == "N/A":
+            AI_PROVIDER_ERRORS.inc(self.provider_name, analysis)
+            logger.error(f"{analysis}_analysis_failed", error="incomplete stream", streamed=True, chars=len(text))
+            yield "result", self._fallback_response(analysis)
+            return
+        
+        # Only a complete answer is cached; a truncated one is returned once
+        missing = [field for field in SECTION_FIELDS if f"{field}:" not in text]
+        if missing:
+            logger.warning(f"{analysis}_stream_incomplete", missing=missing)
+        else:
+            self._store(analysis, metrics, quantized, result)
+        logger.info(f"{analysis}_insight_generated", confidence=result["confidence"], cached=False, streamed=True)
+        yield "result", result
     
     def _fallback_response(self, analysis_type: str) -> Dict[str, Any]:
         """Fallback response when AI fails"""
@@ -131,6 +369,37 @@ class AIAnalyticsService:
             "error": True
         }
     
+    def _budget_response(self, analysis_type: str) -> Dict[str, Any]:
+        """Response for a ranch over its AI budget in cache-only mode"""
+        return {
+            "insight": f"New {analysis_type} insights are paused: the AI budget has been used.",
+            "recommendation": "Cached insights are still served; new ones resume when the budget resets.",
+            "alert": None,
+            "confidence": 0,
+            "provider": "budget",
+            "error": True,
+            "budget_exceeded": True
+        }
+    
+    def get_usage(self, ranch_id: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+        """Daily usage rollups, with the ranch's budget status when one is given (blocking)"""
+        usage = {"days": self.usage.rollups(ranch_id, days)}
+        if ranch_id:
+            usage["budget"] = self.usage.budget_status(ranch_id)
+        return usage
+    
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        return self.cache.get_stats()
+        """Get cache statistics, with the hit rate gained by quantized keys"""
+        return {**self.cache.get_stats(), "keying": self.keying.get_stats()}
+
+
+# Singleton instance
+_ai_service: Optional[AIAnalyticsService] = None
+
+
+def get_ai_service() -> AIAnalyticsService:
+    """Get AI analytics service instance (provider is loaded lazily)"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIAnalyticsService(provider_name=AI_PROVIDER)
+    return _ai_service
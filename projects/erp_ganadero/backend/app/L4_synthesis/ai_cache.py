@@ -1,101 +1,285 @@
 """
 AI Response Caching Layer
 Reduces API costs by caching responses for 24 hours
+
+Bounded LRU: entries are evicted least-recently-used first once the cache
+passes AI_CACHE_MAX_ENTRIES or AI_CACHE_MAX_BYTES (approximate, from the
+JSON size of each response). A background sweeper drops expired entries
+every AI_CACHE_SWEEP_SECONDS so memory is returned without a lookup.
+
+With AI_CACHE_PATH set, a SQLite tier (ai_cache_store) sits behind the
+memory tier: reads fall through to it, writes go to both, so workers and
+restarts share responses. Store writes are queued to a single writer
+thread, so a busy database never holds up the event loop; reads only wait
+briefly (see ai_cache_store). The sweeper compacts it every
+AI_CACHE_COMPACT_SECONDS.
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
 import hashlib
 import json
+import os
+import threading
+import time
 import structlog
 
+from app.L1_config.metrics import register_collector
+from app.L4_synthesis.ai_cache_store import SQLiteCacheStore
+
 logger = structlog.get_logger()
 
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+AI_CACHE_SWEEP_SECONDS = float(os.getenv("AI_CACHE_SWEEP_SECONDS", "300"))
+# Shared SQLite tier (empty = memory only)
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "")
+AI_CACHE_COMPACT_SECONDS = float(os.getenv("AI_CACHE_COMPACT_SECONDS", "3600"))
+
+# Dict, key and bookkeeping overhead per entry (rough CPython figure)
+ENTRY_OVERHEAD_BYTES = 400
+
+
+class _Entry:
+    __slots__ = ("value", "created", "expires", "size")
+
+    def __init__(self, value: Dict[str, Any], created: float, expires: float, size: int):
+        self.value = value
+        self.created = created
+        self.expires = expires
+        self.size = size
+
 
 class AICache:
-    """In-memory cache for AI responses"""
-    
-    def __init__(self, ttl_hours: int = 24):
-        self.cache: Dict[str, tuple[Any, datetime]] = {}
-        self.ttl = timedelta(hours=ttl_hours)
-        self.hits = 0
+    """In-memory LRU + TTL cache for AI responses, optionally backed by a shared store"""
+
+    def __init__(self, ttl_hours: float = 24, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 max_bytes: int = AI_CACHE_MAX_BYTES, sweep_seconds: float = AI_CACHE_SWEEP_SECONDS,
+                 store: Optional[SQLiteCacheStore] = None,
+                 compact_seconds: float = AI_CACHE_COMPACT_SECONDS):
+        self.cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.store = store
+        self._store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-cache-store") \
+            if store is not None else None
+        self.compact_seconds = compact_seconds
+        self._last_compact = time.monotonic()
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_seconds = sweep_seconds
+        self.memory_bytes = 0
+        self.hits = 0  # either tier
+        self.store_hits = 0
+        self.store_errors = 0
         self.misses = 0
-    
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
     def _generate_key(self, prompt: str, context: Dict[str, Any]) -> str:
-        """Generate cache key from prompt and context"""
-        # Create deterministic key from prompt + context
-        data = {
-            "prompt": prompt,
-            "context": json.dumps(context, sort_keys=True)
-        }
-        key_string = json.dumps(data, sort_keys=True)
-        return hashlib.md5(key_string.encode()).hexdigest()
-    
+        """Cache key: blake2b over one canonical JSON encoding of prompt + context"""
+        canonical = json.dumps([prompt, context], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
     def get(self, prompt: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Get cached response if available and not expired"""
         key = self._generate_key(prompt, context)
-        
-        if key in self.cache:
-            value, timestamp = self.cache[key]
-            
-            # Check if expired
-            if datetime.now() - timestamp < self.ttl:
-                self.hits += 1
-                logger.info("ai_cache_hit", key=key[:8], age_hours=(datetime.now() - timestamp).total_seconds() / 3600)
-                return value
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                if now < entry.expires:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    hit = entry
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+                    hit = None
+                    logger.info("ai_cache_expired", key=key[:8])
             else:
-                # Expired, remove
-                del self.cache[key]
-                logger.info("ai_cache_expired", key=key[:8])
-        
-        self.misses += 1
-        return None
-    
+                hit = None
+
+        if hit is not None:
+            logger.info("ai_cache_hit", key=key[:8], tier="memory", age_hours=(now - hit.created) / 3600)
+            return hit.value
+
+        stored = self._store_get(key)
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.store_hits += 1
+
+        # Promote into memory for the rest of its shared lifetime
+        value, created_at, expires_at = stored
+        self._put(key, value, now - (time.time() - created_at), now + (expires_at - time.time()))
+        logger.info("ai_cache_hit", key=key[:8], tier="store", age_hours=(time.time() - created_at) / 3600)
+        return value
+
+    def _store_get(self, key: str):
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning("ai_cache_store_read_failed", error=str(e))
+            return None
+
+    def _store_set(self, key: str, value: Dict[str, Any]):
+        try:
+            self.store.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning("ai_cache_store_write_failed", error=str(e))
+
     def set(self, prompt: str, context: Dict[str, Any], value: Dict[str, Any]):
-        """Cache a response"""
+        """Cache a response in memory and the store, evicting LRU entries past the limits"""
         key = self._generate_key(prompt, context)
-        self.cache[key] = (value, datetime.now())
-        logger.info("ai_cache_set", key=key[:8], cache_size=len(self.cache))
-    
+        if self._store_writer is not None and not self._stop.is_set():
+            self._store_writer.submit(self._store_set, key, value)
+
+        now = time.monotonic()
+        self._put(key, value, now, now + self.ttl_seconds)
+
+    def _put(self, key: str, value: Dict[str, Any], created: float, expires: float):
+        size = len(json.dumps(value, default=str)) + len(key) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            logger.warning("ai_cache_entry_too_large", key=key[:8], bytes=size)
+            return
+
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+            self.cache[key] = _Entry(value, created, expires, size)
+            self.memory_bytes += size
+
+            evicted = 0
+            while len(self.cache) > self.max_entries or self.memory_bytes > self.max_bytes:
+                self._remove(next(iter(self.cache)))
+                evicted += 1
+            self.evictions += evicted
+            cache_size = len(self.cache)
+
+        self._ensure_sweeper()
+        logger.info("ai_cache_set", key=key[:8], cache_size=cache_size, evicted=evicted)
+
+    def _remove(self, key: str):
+        entry = self.cache.pop(key)
+        self.memory_bytes -= entry.size
+
     def clear(self):
-        """Clear all cached responses"""
-        size = len(self.cache)
-        self.cache.clear()
+        """Clear all cached responses (both tiers)"""
+        with self._lock:
+            size = len(self.cache)
+            self.cache.clear()
+            self.memory_bytes = 0
+        if self._store_writer is not None:
+            self._store_writer.submit(self.store.clear)  # after the writes already queued
         logger.info("ai_cache_cleared", entries_removed=size)
-    
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         total_requests = self.hits + self.misses
         hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
-        
+        memory_hits = self.hits - self.store_hits
+        # Store lookups are the memory tier's misses
+        store_lookups = total_requests - memory_hits
+
+        tiers = {"memory": {
+            "hits": memory_hits,
+            "hit_rate_percent": round(memory_hits / total_requests * 100, 2) if total_requests else 0,
+        }}
+        if self.store is not None:
+            tiers["sqlite"] = {
+                "path": self.store.path,
+                "hits": self.store_hits,
+                "lookups": store_lookups,
+                "hit_rate_percent": round(self.store_hits / store_lookups * 100, 2) if store_lookups else 0,
+                "errors": self.store_errors,
+            }
+
         return {
             "hits": self.hits,
             "misses": self.misses,
             "total_requests": total_requests,
             "hit_rate_percent": round(hit_rate, 2),
             "cache_size": len(self.cache),
-            "ttl_hours": self.ttl.total_seconds() / 3600
+            "max_entries": self.max_entries,
+            "memory_bytes": self.memory_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttl_hours": self.ttl_seconds / 3600,
+            "tiers": tiers
         }
-    
-    def cleanup_expired(self):
+
+    def cleanup_expired(self) -> int:
         """Remove expired entries"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, (_, timestamp) in self.cache.items()
-            if now - timestamp >= self.ttl
-        ]
-        
-        for key in expired_keys:
-            del self.cache[key]
-        
+        now = time.monotonic()
+        with self._lock:
+            expired_keys = [key for key, entry in self.cache.items() if entry.expires <= now]
+            for key in expired_keys:
+                self._remove(key)
+            self.expirations += len(expired_keys)
+
         if expired_keys:
             logger.info("ai_cache_cleanup", expired_count=len(expired_keys))
+        return len(expired_keys)
+
+    def _ensure_sweeper(self):
+        """Start the expiry sweeper on first write"""
+        if self._sweeper is None and self.sweep_seconds > 0:
+            self._sweeper = threading.Thread(target=self._sweep, name="ai-cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                self.cleanup_expired()
+                if self.store is not None and time.monotonic() - self._last_compact >= self.compact_seconds:
+                    self._last_compact = time.monotonic()
+                    self.store.compact()
+            except Exception as e:
+                logger.error("ai_cache_sweep_failed", error=str(e))
+
+    def close(self):
+        """Stop the sweeper thread and finish queued store writes (blocking)"""
+        self._stop.set()
+        if self._store_writer is not None:
+            self._store_writer.shutdown(wait=True)
 
 
 # Global cache instance
-_cache = AICache(ttl_hours=24)
+_cache = AICache(ttl_hours=24, store=SQLiteCacheStore(AI_CACHE_PATH) if AI_CACHE_PATH else None)
 
 
 def get_cache() -> AICache:
     """Get global cache instance"""
     return _cache
+
+
+def _collect_metrics():
+    stats = _cache.get_stats()
+    return [
+        ("ai_cache_hits_total", "counter", "AI response cache hits by tier",
+         [({"tier": tier}, values["hits"]) for tier, values in stats["tiers"].items()]),
+        ("ai_cache_misses_total", "counter", "AI response cache misses", [({}, stats["misses"])]),
+        ("ai_cache_evictions_total", "counter", "AI cache LRU evictions", [({}, stats["evictions"])]),
+        ("ai_cache_expirations_total", "counter", "AI cache entries dropped after their TTL",
+         [({}, stats["expirations"])]),
+        ("ai_cache_entries", "gauge", "Cached AI responses", [({}, stats["cache_size"])]),
+        ("ai_cache_bytes", "gauge", "Approximate memory held by cached AI responses",
+         [({}, stats["memory_bytes"])]),
+        ("ai_cache_hit_ratio", "gauge", "AI cache hits / lookups since start",
+         [({}, stats["hits"] / stats["total_requests"] if stats["total_requests"] else 0)]),
+    ]
+
+
+register_collector(_collect_metrics)
@@ -0,0 +1,308 @@
+"""
+AI Cache Keying
+Quantizes analytics metrics into tolerance bands before they key the cache
+
+A herd of 150 vs 151 head or a margin of 27.4% vs 27.5% gets the same
+insight, so each metric is snapped to a band (QUANTIZATION_RULES, per
+analysis type and field) and the prompt built from the banded values is
+the cache key. Bucket edges still split close values (27.4 -> 27, 27.5 ->
+28), so on a miss the most similar recently answered metrics are looked
+up too and served as a near-hit with their similarity score.
+
+Lookups are also replayed against exact keying, so get_stats() reports
+how much of the hit rate the bands add.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+import math
+import os
+import threading
+import time
+
+from app.L1_config.metrics import register_collector
+
+AI_CACHE_QUANTIZE = os.getenv("AI_CACHE_QUANTIZE", "true").lower() == "true"
+# Overrides, e.g. "financial.margin=step:0.5,health.herd_size=relative:0.1,growth.feed_efficiency=exact"
+AI_CACHE_QUANTIZE_RULES = os.getenv("AI_CACHE_QUANTIZE_RULES", "")
+# Minimum similarity served as a near-hit (1.0 disables near-hits)
+AI_CACHE_NEAR_HIT_SIMILARITY = float(os.getenv("AI_CACHE_NEAR_HIT_SIMILARITY", "0.8"))
+# Answered metric sets remembered per analysis type for near-hit lookups
+AI_CACHE_NEAR_HIT_CANDIDATES = int(os.getenv("AI_CACHE_NEAR_HIT_CANDIDATES", "256"))
+
+# Band distance at which two values stop being similar at all
+SIMILARITY_BANDS = 2.0
+
+
+class StepRule:
+    """Fixed-width bands: 27.4 -> 27 with step 1"""
+
+    def __init__(self, step: float):
+        self.step = step
+
+    def quantize(self, value):
+        band = math.floor(value / self.step + 0.5)
+        return round(band * self.step, 6)
+
+    def distance(self, a, b) -> float:
+        return abs(a - b) / self.step
+
+    def __repr__(self):
+        return f"step:{self.step:g}"
+
+
+class RelativeRule:
+    """Log-width bands of about fraction of the value: 150 and 151 head share one"""
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self._log_width = math.log1p(fraction)
+
+    def quantize(self, value):
+        if value <= 0:
+            return value
+        band = math.floor(math.log(value) / self._log_width + 0.5)
+        return round(math.exp(band * self._log_width), 2)
+
+    def distance(self, a, b) -> float:
+        if a <= 0 or b <= 0:
+            return 0.0 if a == b else math.inf
+        return abs(math.log(a) - math.log(b)) / self._log_width
+
+    def __repr__(self):
+        return f"relative:{self.fraction:g}"
+
+
+class ExactRule:
+    """Categorical fields (cost_trend, feed_efficiency) only match themselves"""
+
+    def quantize(self, value):
+        return value
+
+    def distance(self, a, b) -> float:
+        return 0.0 if a == b else math.inf
+
+    def __repr__(self):
+        return "exact"
+
+
+QUANTIZATION_RULES: Dict[str, Dict[str, Any]] = {
+    "health": {
+        "calf_mortality": StepRule(0.5),
+        "recent_deaths": StepRule(1),
+        "vaccination_rate": StepRule(2.5),
+        "herd_size": RelativeRule(0.05),
+    },
+    "reproduction": {
+        "pregnancy_rate": StepRule(2.5),
+        "calving_interval": StepRule(5),
+        "open_cows": StepRule(2),
+        "herd_size": RelativeRule(0.05),
+    },
+    "financial": {
+        "total_costs": RelativeRule(0.05),
+        "revenue": RelativeRule(0.05),
+        "margin": StepRule(1),
+        "cost_per_kg": StepRule(0.1),
+        "cost_trend": ExactRule(),
+    },
+    "growth": {
+        "avg_daily_gain": StepRule(0.05),
+        "weaning_weight": StepRule(5),
+        "feed_efficiency": ExactRule(),
+        "herd_size": RelativeRule(0.05),
+    },
+}
+
+
+def parse_rule(spec: str):
+    """"step:1" / "relative:0.05" / "exact" -> rule"""
+    kind, _, number = spec.strip().partition(":")
+    if kind == "step":
+        return StepRule(float(number))
+    if kind == "relative":
+        return RelativeRule(float(number))
+    if kind == "exact":
+        return ExactRule()
+    raise ValueError(f"Unknown quantization rule: {spec!r}")
+
+
+def build_rules(overrides: str) -> Dict[str, Dict[str, Any]]:
+    """Default rules with "analysis.field=rule,..." overrides applied"""
+    rules = {analysis: dict(fields) for analysis, fields in QUANTIZATION_RULES.items()}
+    for item in overrides.split(","):
+        if "=" not in item:
+            continue
+        name, spec = item.split("=", 1)
+        analysis, _, field = name.strip().partition(".")
+        rules.setdefault(analysis, {})[field] = parse_rule(spec)
+    return rules
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _KeyingStats:
+    __slots__ = ("lookups", "exact_hits", "near_hits", "raw_hits", "similarity_sum")
+
+    def __init__(self):
+        self.lookups = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.raw_hits = 0  # hits exact (unquantized) keying would have had
+        self.similarity_sum = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits
+
+        def percent(n):
+            return round(n / self.lookups * 100, 2) if self.lookups else 0
+
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "hit_rate_percent": percent(hits),
+            "unquantized_hit_rate_percent": percent(self.raw_hits),
+            "hit_rate_uplift_points": round(percent(hits) - percent(self.raw_hits), 2),
+            "avg_near_hit_similarity": round(self.similarity_sum / self.near_hits, 3) if self.near_hits else None,
+        }
+
+
+class CacheKeying:
+    """Quantizes metrics, finds near-hits and tracks the hit-rate uplift"""
+
+    def __init__(self, rules: Optional[Dict[str, Dict[str, Any]]] = None, enabled: bool = AI_CACHE_QUANTIZE,
+                 near_similarity: float = AI_CACHE_NEAR_HIT_SIMILARITY,
+                 candidates: int = AI_CACHE_NEAR_HIT_CANDIDATES,
+                 shadow_entries: int = 10000, shadow_ttl_seconds: float = 24 * 3600):
+        self.rules = rules if rules is not None else build_rules(AI_CACHE_QUANTIZE_RULES)
+        self.enabled = enabled
+        self.near_similarity = near_similarity
+        self.candidates = candidates
+        self.shadow_entries = shadow_entries
+        self.shadow_ttl_seconds = shadow_ttl_seconds
+        self._recent: Dict[str, Deque[Tuple[Dict[str, Any], Dict[str, Any]]]] = {}
+        self._shadow: "OrderedDict[Hashable, float]" = OrderedDict()  # raw key -> expires
+        self._stats: Dict[str, _KeyingStats] = {}
+        self._lock = threading.Lock()
+
+    def quantize(self, analysis: str, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Metrics with every ruled numeric field snapped to its band"""
+        if not self.enabled:
+            return metrics
+        rules = self.rules.get(analysis, {})
+        return {
+            field: rules[field].quantize(value) if field in rules and _is_number(value) else value
+            for field, value in metrics.items()
+        }
+
+    def similarity(self, analysis: str, a: Dict[str, Any], b: Dict[str, Any]) -> float:
+        """
+        1.0 for identical metrics, falling linearly to 0 as the furthest
+        field moves SIMILARITY_BANDS bands away. Unruled or categorical
+        fields must match exactly.
+        """
+        rules = self.rules.get(analysis, {})
+        if a.keys() != b.keys():
+            return 0.0
+        worst = 0.0
+        for field, value in a.items():
+            other = b[field]
+            if field in rules and _is_number(value) and _is_number(other):
+                worst = max(worst, rules[field].distance(value, other))
+            elif value != other:
+                return 0.0
+        return max(0.0, 1.0 - worst / SIMILARITY_BANDS)
+
+    def nearest(self, analysis: str, metrics: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(quantized metrics, similarity) of the closest answered metrics above the threshold"""
+        if not self.enabled or self.near_similarity >= 1.0:
+            return None
+        with self._lock:
+            recent = list(self._recent.get(analysis, ()))
+        best = None
+        for answered, quantized in recent:
+            score = self.similarity(analysis, metrics, answered)
+            if score >= self.near_similarity and (best is None or score > best[1]):
+                best = (quantized, score)
+        return best
+
+    def remember(self, analysis: str, metrics: Dict[str, Any], quantized: Dict[str, Any]):
+        """Make a freshly answered metric set a near-hit candidate"""
+        if not self.enabled:
+            return
+        with self._lock:
+            recent = self._recent.setdefault(analysis, deque(maxlen=self.candidates))
+            recent.append((dict(metrics), quantized))
+
+    def record(self, analysis: str, raw_key: Hashable, match: Optional[str], similarity: float = 1.0):
+        """Count one lookup (match: "exact", "near" or None) and replay it on exact keying"""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(analysis, _KeyingStats())
+            stats.lookups += 1
+            if match == "exact":
+                stats.exact_hits += 1
+            elif match == "near":
+                stats.near_hits += 1
+                stats.similarity_sum += similarity
+
+            expires = self._shadow.get(raw_key)
+            if expires is not None and now < expires:
+                stats.raw_hits += 1
+                self._shadow.move_to_end(raw_key)
+            else:
+                # Exact keying would have generated and cached this one
+                self._shadow[raw_key] = now + self.shadow_ttl_seconds
+                self._shadow.move_to_end(raw_key)
+                while len(self._shadow) > self.shadow_entries:
+                    self._shadow.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_type = {analysis: stats.as_dict() for analysis, stats in self._stats.items()}
+            total = _KeyingStats()
+            for stats in self._stats.values():
+                for field in _KeyingStats.__slots__:
+                    setattr(total, field, getattr(total, field) + getattr(stats, field))
+            rules = {analysis: {field: repr(rule) for field, rule in fields.items()}
+                     for analysis, fields in self.rules.items()}
+        return {
+            "quantize": self.enabled,
+            "near_hit_similarity": self.near_similarity,
+            **total.as_dict(),
+            "by_type": per_type,
+            "rules": rules,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+            self._shadow.clear()
+
+
+# Global keying instance
+_keying = CacheKeying()
+
+
+def get_cache_keying() -> CacheKeying:
+    """Get global keying instance"""
+    return _keying
+
+
+def _collect_metrics():
+    stats = _keying.get_stats()["by_type"]
+    return [
+        ("ai_cache_keyed_lookups_total", "counter", "AI insight cache lookups by analysis and match",
+         [({"analysis": analysis, "match": match}, values[field])
+          for analysis, values in stats.items()
+          for match, field in (("exact", "exact_hits"), ("near", "near_hits"), ("all", "lookups"))]),
+        ("ai_cache_hit_rate_uplift_points", "gauge",
+         "Hit rate gained by quantized keys and near-hits over exact keying",
+         [({"analysis": analysis}, values["hit_rate_uplift_points"]) for analysis, values in stats.items()]),
+    ]
+
+
+register_collector(_collect_metrics)
@@ -0,0 +1,94 @@
+"""
+Persistent AI Cache Tier
+SQLite store shared by every worker process and surviving restarts
+
+WAL mode lets all uvicorn workers read while one writes; expiry is a
+column checked on every read, and compact() deletes expired rows and
+truncates the WAL. Point lookups take tens of microseconds, cheap next
+to the provider call they save.
+
+Reads run on the event loop, so they wait at most
+AI_CACHE_STORE_READ_TIMEOUT_MS for a lock and otherwise count as a miss.
+Writes wait longer (AICache runs them on its own writer thread).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+AI_CACHE_STORE_READ_TIMEOUT_MS = float(os.getenv("AI_CACHE_STORE_READ_TIMEOUT_MS", "50"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_ai_cache_expires_at ON ai_cache (expires_at);
+"""
+
+
+class SQLiteCacheStore:
+    """Key -> JSON value with wall-clock expiry, one connection per thread"""
+
+    def __init__(self, path: str, read_timeout: float = AI_CACHE_STORE_READ_TIMEOUT_MS / 1000,
+                 write_timeout: float = 5.0):
+        self.path = path
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connect(write_timeout)  # create the schema up front
+
+    def _connect(self, timeout: float) -> sqlite3.Connection:
+        """This thread's connection; its busy timeout is set by the first use (reads or writes)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float, float]]:
+        """(value, created_at, expires_at) if present and unexpired"""
+        row = self._connect(self.read_timeout).execute(
+            "SELECT value, created_at, expires_at FROM ai_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: float):
+        now = time.time()
+        self._connect(self.write_timeout).execute(
+            "INSERT OR REPLACE INTO ai_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, default=str), now, now + ttl_seconds)
+        )
+
+    def count(self) -> int:
+        return self._connect(self.read_timeout).execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+
+    def compact(self) -> int:
+        """Delete expired rows, return freed pages and truncate the WAL"""
+        conn = self._connect(self.write_timeout)
+        removed = conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if removed:
+            logger.info("ai_cache_store_compacted", removed=removed, path=self.path)
+        return removed
+
+    def clear(self):
+        self._connect(self.write_timeout).execute("DELETE FROM ai_cache")
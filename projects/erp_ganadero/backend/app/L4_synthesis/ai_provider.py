@@ -1,21 +1,81 @@
 """
 AI Provider Abstraction Layer for ERP Ganadero
-Supports multiple LLM providers with unified interface
+Supports multiple LLM providers with unified interface (Gemini, OpenAI,
+and a local Ollama model for offline use)
+
+Provider calls never block the event loop: SDKs are called through their
+async clients, and anything synchronous (SDK import, older clients) runs
+on a dedicated thread pool instead of the default one shared with sync
+endpoints. Each provider admits AI_PROVIDER_CONCURRENCY calls at once;
+further calls queue for at most AI_PROVIDER_QUEUE_TIMEOUT_SECONDS and each
+call is cut off after AI_PROVIDER_TIMEOUT_SECONDS.
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Optional, Dict, Any, Tuple, TypeVar
+import asyncio
+import json
 import os
+import threading
+import time
 from datetime import datetime
+import re
+import httpx
 import structlog
 
+from app.L1_config.metrics import counter, gauge, histogram
+
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+AI_PROVIDER_CONCURRENCY = int(os.getenv("AI_PROVIDER_CONCURRENCY", "4"))
+AI_PROVIDER_TIMEOUT_SECONDS = float(os.getenv("AI_PROVIDER_TIMEOUT_SECONDS", "30"))
+AI_PROVIDER_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_PROVIDER_QUEUE_TIMEOUT_SECONDS", "10"))
+AI_PROVIDER_THREADS = int(os.getenv("AI_PROVIDER_THREADS", "8"))
+
+# Local model server (same variables as tools/L1_config/ollama_config.py)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_DEFAULT_MODEL = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
+OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+# How long Ollama keeps the model loaded after a request (Ollama duration syntax)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "4"))
+
+PROVIDER_QUEUE_SECONDS = histogram(
+    "ai_provider_queue_seconds", "Time AI calls waited for a provider slot", ("provider",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+PROVIDER_WAITING = gauge("ai_provider_waiting", "AI calls waiting for a provider slot", ("provider",))
+PROVIDER_ACTIVE = gauge("ai_provider_active", "AI calls holding a provider slot", ("provider",))
+PROVIDER_TIMEOUTS = counter("ai_provider_timeouts_total", "AI calls that timed out, by stage (queue|call)",
+                            ("provider", "stage"))
+
+# Blocking SDK work only; kept apart from the threadpool serving sync endpoints
+_executor = ThreadPoolExecutor(max_workers=AI_PROVIDER_THREADS, thread_name_prefix="ai-provider")
+
+
+class ProviderTimeout(TimeoutError):
+    """No provider slot freed up in time, or the provider call overran"""
+
+
+class ProviderUnavailable(RuntimeError):
+    """Provider can only answer with its placeholder (SDK missing, no key)"""
+
 
 class AIProvider(ABC):
     """Abstract base class for AI providers"""
     
-    @abstractmethod
+    name = "provider"
+    max_concurrency = AI_PROVIDER_CONCURRENCY
+    timeout_seconds = AI_PROVIDER_TIMEOUT_SECONDS
+    queue_timeout_seconds = AI_PROVIDER_QUEUE_TIMEOUT_SECONDS
+    _slots: Optional[asyncio.Semaphore] = None
+    _slots_loop: Optional[asyncio.AbstractEventLoop] = None
+    
     async def generate_insight(
         self, 
         prompt: str, 
@@ -33,23 +93,178 @@ class AIProvider(ABC):
                 "confidence": int (0-100)
             }
         """
-        pass
+        text, label = await self.generate_text(prompt, max_tokens)
+        return {**self.parse_insight(text), "provider": label, "generated_at": datetime.now().isoformat()}
+    
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """Raw completion and the label of the model that wrote it"""
+        raise NotImplementedError(f"{self.name} does not return raw completions")
+    
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """
+        (text chunk, model label) pairs as the completion is written.
+        Providers without a streaming API yield the whole completion once.
+        """
+        text, label = await self.generate_text(prompt, max_tokens)
+        yield text, label
+    
+    def parse_insight(self, text: str) -> Dict[str, Any]:
+        """INSIGHT / RECOMMENDATION / ALERT / CONFIDENCE fields of a completion"""
+        alert = self._extract_field(text, "ALERT")
+        return {
+            "insight": self._extract_field(text, "INSIGHT"),
+            "recommendation": self._extract_field(text, "RECOMMENDATION"),
+            "alert": alert if alert != "None" else None,
+            "confidence": self._extract_confidence(text),
+        }
     
     @abstractmethod
     def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
         """Estimate cost in USD for a request"""
         pass
+    
+    def serves(self, label: str) -> bool:
+        """Whether a result's "provider" label was written by this provider"""
+        return label == self.name
+    
+    def cost_for(self, label: str, prompt_tokens: int, response_tokens: int) -> float:
+        """Cost in USD of a call whose result carries this "provider" label"""
+        return self.get_cost_estimate(prompt_tokens, response_tokens)
+    
+    def warmup(self):
+        """Load the provider SDK ahead of the first request (optional)"""
+        pass
+    
+    def is_available(self) -> bool:
+        """False once the provider knows it can only return placeholders"""
+        return True
+    
+    async def aclose(self):
+        """Release connections held by the provider (optional)"""
+        pass
+    
+    def _extract_field(self, text: str, field: str) -> str:
+        """Extract field from formatted response"""
+        try:
+            marker = f"{field}:"
+            if marker in text:
+                start = text.index(marker) + len(marker)
+                # Find next field or end
+                end = len(text)
+                for next_field in ["INSIGHT:", "RECOMMENDATION:", "ALERT:", "CONFIDENCE:"]:
+                    if next_field in text[start:]:
+                        end = start + text[start:].index(next_field)
+                        break
+                return text[start:end].strip()
+            return "N/A"
+        except Exception:
+            return "N/A"
+    
+    def _extract_confidence(self, text: str) -> int:
+        """Extract confidence score"""
+        try:
+            if "CONFIDENCE:" in text:
+                conf_text = self._extract_field(text, "CONFIDENCE")
+                # Extract number
+                match = re.search(r'\d+', conf_text)
+                if match:
+                    return min(100, max(0, int(match.group())))
+            return 75  # Default confidence
+        except Exception:
+            return 75
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Slot semaphore of the running loop (recreated if the loop changes)"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+    
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the provider's slots, waiting at most queue_timeout_seconds"""
+        slots = self._semaphore()
+        PROVIDER_WAITING.inc(self.name)
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            PROVIDER_TIMEOUTS.inc(self.name, "queue")
+            logger.warning("ai_provider_queue_timeout", provider=self.name, waited=self.queue_timeout_seconds)
+            raise ProviderTimeout(f"{self.name}: no free slot after {self.queue_timeout_seconds}s")
+        finally:
+            PROVIDER_WAITING.dec(self.name)
+            PROVIDER_QUEUE_SECONDS.observe(time.perf_counter() - queued, self.name)
+        
+        PROVIDER_ACTIVE.inc(self.name)
+        try:
+            yield
+        finally:
+            PROVIDER_ACTIVE.dec(self.name)
+            slots.release()
+    
+    def _call_timeout(self) -> ProviderTimeout:
+        PROVIDER_TIMEOUTS.inc(self.name, "call")
+        logger.warning("ai_provider_call_timeout", provider=self.name, timeout=self.timeout_seconds)
+        return ProviderTimeout(f"{self.name}: no response after {self.timeout_seconds}s")
+    
+    async def _limited(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Await call() once a slot is free, with queue and call timeouts"""
+        async with self._slot():
+            try:
+                return await asyncio.wait_for(call(), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                raise self._call_timeout()
+    
+    async def _limited_stream(self, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Chunks of open_stream() under a slot; the call timeout covers the whole stream"""
+        async with self._slot():
+            deadline = time.monotonic() + self.timeout_seconds
+            chunks = open_stream().__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise self._call_timeout()
+                if chunk:
+                    yield chunk
+    
+    @staticmethod
+    async def _run_blocking(fn: Callable[..., T], *args) -> T:
+        """Run a synchronous SDK call on the provider thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
 
 
 class GeminiProvider(AIProvider):
     """Google Gemini Pro provider"""
     
+    name = "gemini"
+    
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             logger.warning("GOOGLE_API_KEY not found - AI analytics will not work")
             self.api_key = "dummy-key-for-development"  # Allow server to start
         
+        # SDK is imported on first use (see warmup) to keep it off the startup path
+        self.model = None
+        self.genai = None
+        self.available = False
+        self._loaded = False
+        # Held while the SDK loads, so callers arriving mid-load wait for it
+        self._load_lock = threading.Lock()
+    
+    def warmup(self):
+        """Import and configure google-generativeai (idempotent)"""
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+    
+    def _load(self):
         try:
             import google.generativeai as genai
             genai.configure(api_key=self.api_key)
@@ -68,6 +283,10 @@ class GeminiProvider(AIProvider):
             self.genai = None
             self.available = False
     
+    def is_available(self) -> bool:
+        # Unknown until the SDK has been loaded
+        return self.available or not self._loaded
+    
     async def generate_insight(
         self, 
         prompt: str, 
@@ -75,6 +294,8 @@ class GeminiProvider(AIProvider):
         max_tokens: int = 500
     ) -> Dict[str, Any]:
         """Generate insight using Gemini Pro"""
+        if not self._loaded:
+            await self._run_blocking(self.warmup)
         if not self.available:
             return {
                 "insight": "AI service not available",
@@ -85,63 +306,60 @@ class GeminiProvider(AIProvider):
                 "generated_at": datetime.now().isoformat()
             }
         
+        result = await super().generate_insight(prompt, context, max_tokens)
+        logger.info("gemini_insight_generated", 
+                   confidence=result["confidence"],
+                   has_alert=result["alert"] is not None)
+        return result
+    
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """Raw Gemini Pro completion"""
+        if not self._loaded:
+            await self._run_blocking(self.warmup)
+        if not self.available:
+            raise ProviderUnavailable("google-generativeai is not available")
+        
         try:
-            # Generate content
-            response = self.model.generate_content(prompt)
-            
-            # Parse structured response
-            text = response.text
-            insight = self._extract_field(text, "INSIGHT")
-            recommendation = self._extract_field(text, "RECOMMENDATION")
-            alert = self._extract_field(text, "ALERT")
-            confidence = self._extract_confidence(text)
-            
-            logger.info("gemini_insight_generated", 
-                       confidence=confidence,
-                       has_alert=alert != "None")
-            
-            return {
-                "insight": insight,
-                "recommendation": recommendation,
-                "alert": alert if alert != "None" else None,
-                "confidence": confidence,
-                "provider": "gemini-pro",
-                "generated_at": datetime.now().isoformat()
-            }
+            # Generate content (async client where the SDK version has one)
+            if hasattr(self.model, "generate_content_async"):
+                response = await self._limited(lambda: self.model.generate_content_async(prompt))
+            else:
+                response = await self._limited(lambda: self._run_blocking(self.model.generate_content, prompt))
+            return response.text, "gemini-pro"
         except Exception as e:
             logger.error("gemini_generation_failed", error=str(e))
             raise
     
-    def _extract_field(self, text: str, field: str) -> str:
-        """Extract field from formatted response"""
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """Gemini Pro completion as it is generated"""
+        if not self._loaded:
+            await self._run_blocking(self.warmup)
+        if not self.available:
+            raise ProviderUnavailable("google-generativeai is not available")
+        if not hasattr(self.model, "generate_content_async"):
+            async for item in super().stream_text(prompt, max_tokens):
+                yield item
+            return
+        
+        async def chunks():
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                yield chunk.text
+        
         try:
-            marker = f"{field}:"
-            if marker in text:
-                start = text.index(marker) + len(marker)
-                # Find next field or end
-                end = len(text)
-                for next_field in ["INSIGHT:", "RECOMMENDATION:", "ALERT:", "CONFIDENCE:"]:
-                    if next_field in text[start:]:
-                        end = start + text[start:].index(next_field)
-                        break
-                return text[start:end].strip()
-            return "N/A"
-        except Exception:
-            return "N/A"
+            async for text in self._limited_stream(chunks):
+                yield text, "gemini-pro"
+        except Exception as e:
+            logger.error("gemini_generation_failed", error=str(e))
+            raise
     
-    def _extract_confidence(self, text: str) -> int:
-        """Extract confidence score"""
-        try:
-            if "CONFIDENCE:" in text:
-                conf_text = self._extract_field(text, "CONFIDENCE")
-                # Extract number
-                import re
-                match = re.search(r'\d+', conf_text)
-                if match:
-                    return min(100, max(0, int(match.group())))
-            return 75  # Default confidence
-        except Exception:
-            return 75
+    def serves(self, label: str) -> bool:
+        return label.startswith("gemini")
+    
+    def cost_for(self, label: str, prompt_tokens: int, response_tokens: int) -> float:
+        if label != "gemini-pro":
+            return 0.0  # placeholder answer, no model call was made
+        return self.get_cost_estimate(prompt_tokens, response_tokens)
     
     def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
         """Estimate cost for Gemini Pro"""
@@ -154,55 +372,70 @@ class GeminiProvider(AIProvider):
 class OpenAIProvider(AIProvider):
     """OpenAI GPT-4 provider (fallback)"""
     
+    name = "openai"
+    
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found")
         
+        self.client = None
+    
+    def warmup(self):
+        """Import the openai SDK and create the async client (idempotent)"""
+        if self.client is not None:
+            return
+        
         try:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout_seconds)
         except ImportError:
             raise ImportError("openai package not installed")
     
-    async def generate_insight(
-        self, 
-        prompt: str, 
-        context: Dict[str, Any],
-        max_tokens: int = 500
-    ) -> Dict[str, Any]:
-        """Generate insight using GPT-4"""
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """Raw GPT-4 completion"""
+        if self.client is None:
+            await self._run_blocking(self.warmup)
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a cattle ranch management expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens
-            )
-            
-            text = response.choices[0].message.content
+            response = await self._limited(lambda: self._create(prompt, max_tokens))
             
-            # Parse structured response (same as Gemini)
-            gemini_parser = GeminiProvider.__new__(GeminiProvider)
-            insight = gemini_parser._extract_field(text, "INSIGHT")
-            recommendation = gemini_parser._extract_field(text, "RECOMMENDATION")
-            alert = gemini_parser._extract_field(text, "ALERT")
-            confidence = gemini_parser._extract_confidence(text)
-            
-            return {
-                "insight": insight,
-                "recommendation": recommendation,
-                "alert": alert if alert != "None" else None,
-                "confidence": confidence,
-                "provider": "gpt-4",
-                "generated_at": datetime.now().isoformat()
-            }
+            return response.choices[0].message.content, "gpt-4"
+        except Exception as e:
+            logger.error("openai_generation_failed", error=str(e))
+            raise
+    
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """GPT-4 completion as it is generated"""
+        if self.client is None:
+            await self._run_blocking(self.warmup)
+        
+        async def chunks():
+            stream = await self._create(prompt, max_tokens, stream=True)
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        
+        try:
+            async for text in self._limited_stream(chunks):
+                yield text, "gpt-4"
         except Exception as e:
             logger.error("openai_generation_failed", error=str(e))
             raise
     
+    def _create(self, prompt: str, max_tokens: int, stream: bool = False):
+        return self.client.chat.completions.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are a cattle ranch management expert."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            stream=stream
+        )
+    
+    def serves(self, label: str) -> bool:
+        return label.startswith("gpt")
+    
     def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
         """Estimate cost for GPT-4"""
         # GPT-4 pricing: $30 per 1M input, $60 per 1M output
@@ -211,11 +444,117 @@ class OpenAIProvider(AIProvider):
         return input_cost + output_cost
 
 
+class OllamaProvider(AIProvider):
+    """Local model served by Ollama, for ranch offices without internet"""
+    
+    name = "ollama"
+    max_concurrency = min(AI_PROVIDER_CONCURRENCY, OLLAMA_MAX_CONNECTIONS)
+    
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, model: str = OLLAMA_DEFAULT_MODEL,
+                 keep_alive: str = OLLAMA_KEEP_ALIVE):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout_seconds = OLLAMA_TIMEOUT
+        # One keep-alive pool per event loop (connections cannot move between loops)
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+    
+    def _session(self) -> httpx.AsyncClient:
+        """Keep-alive connection pool of the running loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            # Pools of finished loops can no longer be awaited; drop them so their sockets are freed
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=3.0),
+                limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS,
+                                    max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+                                    keepalive_expiry=300)
+            )
+        return client
+    
+    def warmup(self):
+        """Load the model into Ollama's memory so the first insight skips the load"""
+        started = time.perf_counter()
+        try:
+            response = httpx.post(f"{self.base_url}/api/generate",
+                                  json={"model": self.model, "keep_alive": self.keep_alive},
+                                  timeout=self.timeout_seconds)
+            response.raise_for_status()
+            logger.info("ollama_model_loaded", model=self.model,
+                        seconds=round(time.perf_counter() - started, 3))
+        except httpx.HTTPError as e:
+            logger.warning("ollama_warmup_failed", model=self.model, base_url=self.base_url, error=str(e))
+    
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """Raw completion from the local model"""
+        payload = self._payload(prompt, max_tokens, stream=False)
+        try:
+            response = await self._limited(lambda: self._session().post("/api/generate", json=payload))
+            response.raise_for_status()
+            return response.json()["response"], f"ollama/{self.model}"
+        except Exception as e:
+            logger.error("ollama_generation_failed", model=self.model, error=str(e))
+            raise
+    
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """Local model completion as it is generated (Ollama streams NDJSON)"""
+        payload = self._payload(prompt, max_tokens, stream=True)
+        
+        async def chunks():
+            async with self._session().stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line).get("response", "")
+        
+        try:
+            async for text in self._limited_stream(chunks):
+                yield text, f"ollama/{self.model}"
+        except Exception as e:
+            logger.error("ollama_generation_failed", model=self.model, error=str(e))
+            raise
+    
+    def _payload(self, prompt: str, max_tokens: int, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": OLLAMA_TEMPERATURE, "num_predict": max_tokens},
+        }
+    
+    async def aclose(self):
+        """Close the pool of every loop (others' on their own loop)"""
+        current = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+    
+    def serves(self, label: str) -> bool:
+        return label.startswith("ollama/")
+    
+    def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
+        """Local inference has no per-token cost"""
+        return 0.0
+
+
 def get_ai_provider(provider_name: str = "gemini") -> AIProvider:
-    """Factory function to get AI provider"""
+    """Factory function to get AI provider ("router" routes across several)"""
+    if provider_name == "router":
+        from app.L4_synthesis.ai_router import get_routing_provider
+        return get_routing_provider()
+    
     providers = {
         "gemini": GeminiProvider,
-        "openai": OpenAIProvider
+        "openai": OpenAIProvider,
+        "ollama": OllamaProvider
     }
     
     if provider_name not in providers:
@@ -0,0 +1,350 @@
+"""
+AI Provider Router
+Sends each insight to the fastest healthy provider, with failover and hedging
+
+Every call's latency and outcome land in a rolling window per provider.
+Providers are ranked healthy-first, then by median latency (unmeasured
+ones keep their configured order). A provider whose error rate passes
+AI_ROUTER_MAX_ERROR_RATE drops to the back of the line, and after
+AI_ROUTER_COOLDOWN_SECONDS without a try it is probed again.
+
+A failed call fails over to the next provider. With AI_ROUTER_HEDGE on,
+a call still running after the primary's p95 latency starts a second one
+on the next provider; the first success wins and the other is cancelled.
+
+For local runs without API keys, "stub:<latency_s>:<error_rate>" entries
+in AI_ROUTER_PROVIDERS add providers that only sleep and fail at random.
+"""
+
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+import asyncio
+import os
+import random
+import re
+import time
+import structlog
+
+from app.L1_config.metrics import counter, register_collector
+from app.L4_synthesis.ai_provider import AIProvider, ProviderUnavailable, get_ai_provider
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+AI_ROUTER_PROVIDERS = os.getenv("AI_ROUTER_PROVIDERS", "gemini,openai,ollama")
+AI_ROUTER_WINDOW = int(os.getenv("AI_ROUTER_WINDOW", "50"))
+AI_ROUTER_MIN_SAMPLES = int(os.getenv("AI_ROUTER_MIN_SAMPLES", "5"))
+AI_ROUTER_MAX_ERROR_RATE = float(os.getenv("AI_ROUTER_MAX_ERROR_RATE", "0.5"))
+AI_ROUTER_COOLDOWN_SECONDS = float(os.getenv("AI_ROUTER_COOLDOWN_SECONDS", "30"))
+AI_ROUTER_HEDGE = os.getenv("AI_ROUTER_HEDGE", "false").lower() == "true"
+# Hedge delay until the primary has AI_ROUTER_MIN_SAMPLES successes to take a p95 from
+AI_ROUTER_HEDGE_DELAY_SECONDS = float(os.getenv("AI_ROUTER_HEDGE_DELAY_SECONDS", "2.0"))
+
+ROUTER_CALLS = counter("ai_router_calls_total", "Provider calls made by the router, by outcome",
+                       ("provider", "outcome"))
+ROUTER_HEDGES = counter("ai_router_hedges_total", "Hedged second requests started", ("provider",))
+ROUTER_FAILOVERS = counter("ai_router_failovers_total", "Calls retried on the next provider after a failure",
+                           ("provider",))
+
+
+class ProviderHealth:
+    """Rolling latency and error rate of one provider"""
+
+    def __init__(self, window: int = AI_ROUTER_WINDOW):
+        self.calls: Deque[Tuple[float, bool]] = deque(maxlen=window)  # (seconds, ok)
+        self.last_attempt = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        self.calls.append((seconds, ok))
+
+    def latencies(self) -> List[float]:
+        return sorted(seconds for seconds, ok in self.calls if ok)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        latencies = self.latencies()
+        if not latencies:
+            return None
+        return latencies[int(fraction * (len(latencies) - 1))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    def healthy(self, now: float) -> bool:
+        if len(self.calls) < AI_ROUTER_MIN_SAMPLES or self.error_rate <= AI_ROUTER_MAX_ERROR_RATE:
+            return True
+        # Half-open: probe again once it has rested
+        return now - self.last_attempt >= AI_ROUTER_COOLDOWN_SECONDS
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "healthy": self.healthy(now),
+            "samples": len(self.calls),
+            "error_rate": round(self.error_rate, 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class StubProvider(AIProvider):
+    """Canned insight after a fixed delay, failing a fraction of calls"""
+
+    def __init__(self, name: str = "stub", latency_seconds: float = 0.1, error_rate: float = 0.0):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+
+    async def generate_insight(self, prompt: str, context: Dict[str, Any], max_tokens: int = 500) -> Dict[str, Any]:
+        await self._simulate()
+        return {
+            "insight": f"Stub insight for {context.get('type', 'analysis')}",
+            "recommendation": "Stub recommendation",
+            "alert": None,
+            "confidence": 50,
+            "provider": self.name,
+        }
+
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """One canned block per [SECTION] marker the prompt asks for"""
+        await self._simulate()
+        return self._canned(prompt), self.name
+
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """The canned text word by word, after the simulated latency"""
+        await self._simulate()
+        for word in re.findall(r"\S+\s*", self._canned(prompt)):
+            await asyncio.sleep(0)
+            yield word, self.name
+
+    def _canned(self, prompt: str) -> str:
+        block = "INSIGHT: Stub insight\nRECOMMENDATION: Stub recommendation\nALERT: None\nCONFIDENCE: 50\n"
+        sections = re.findall(r"^\[([A-Z]+)\]$", prompt, re.MULTILINE)
+        if not sections:
+            return block
+        return "".join(f"[{section}]\n{block}" for section in dict.fromkeys(sections))
+
+    async def _simulate(self):
+        await asyncio.sleep(self.latency_seconds)
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name}: simulated failure")
+
+    def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
+        return 0.0
+
+
+class RoutingProvider(AIProvider):
+    """AIProvider over several providers: fastest healthy first, failover, optional hedging"""
+
+    name = "router"
+
+    def __init__(self, providers: List[AIProvider], hedge: bool = AI_ROUTER_HEDGE,
+                 hedge_delay_seconds: float = AI_ROUTER_HEDGE_DELAY_SECONDS):
+        if not providers:
+            raise ValueError("RoutingProvider needs at least one provider")
+        self.providers = {provider.name: provider for provider in providers}
+        self.health = {name: ProviderHealth() for name in self.providers}
+        self.hedge = hedge
+        self.hedge_delay_seconds = hedge_delay_seconds
+
+    @classmethod
+    def from_spec(cls, spec: str = AI_ROUTER_PROVIDERS, **kwargs) -> "RoutingProvider":
+        """"gemini,openai,stub:0.2:0.1" -> router over the providers that can be built"""
+        providers = []
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                if item.startswith("stub"):
+                    _, latency, error_rate = (item.split(":") + ["0.1", "0"])[:3]
+                    providers.append(StubProvider(f"stub-{len(providers)}", float(latency), float(error_rate)))
+                else:
+                    providers.append(get_ai_provider(item))
+            except Exception as e:
+                logger.warning("ai_router_provider_skipped", provider=item, error=str(e))
+        return cls(providers, **kwargs)
+
+    def warmup(self):
+        for name, provider in self.providers.items():
+            try:
+                provider.warmup()
+            except Exception as e:
+                logger.warning("ai_router_warmup_failed", provider=name, error=str(e))
+
+    async def aclose(self):
+        for provider in self.providers.values():
+            await provider.aclose()
+
+    def ranked(self) -> List[str]:
+        """Healthy providers by median latency, then the rest as last resorts"""
+        now = time.monotonic()
+        order = list(self.providers)
+
+        def rank(name: str):
+            provider = self.providers[name]
+            p50 = self.health[name].percentile(0.5)
+            usable = self.health[name].healthy(now) and provider.is_available()
+            return (not usable, p50 if p50 is not None else float("inf"), order.index(name))
+
+        return sorted(order, key=rank)
+
+    def hedge_delay(self, name: str) -> float:
+        health = self.health[name]
+        if len(health.latencies()) < AI_ROUTER_MIN_SAMPLES:
+            return self.hedge_delay_seconds
+        return health.percentile(0.95)
+
+    async def _call(self, name: str, call: Callable[[AIProvider], Awaitable[T]]) -> T:
+        provider = self.providers[name]
+        health = self.health[name]
+        health.last_attempt = time.monotonic()
+        started = time.perf_counter()
+        try:
+            result = await call(provider)
+            if not provider.is_available():
+                raise ProviderUnavailable(f"{name} is not available")
+        except asyncio.CancelledError:
+            ROUTER_CALLS.inc(name, "cancelled")
+            raise
+        except Exception:
+            health.record(time.perf_counter() - started, False)
+            ROUTER_CALLS.inc(name, "error")
+            raise
+        health.record(time.perf_counter() - started, True)
+        ROUTER_CALLS.inc(name, "ok")
+        return result
+
+    async def generate_insight(self, prompt: str, context: Dict[str, Any], max_tokens: int = 500) -> Dict[str, Any]:
+        """First successful insight along the ranked providers"""
+        return await self._route(lambda provider: provider.generate_insight(prompt, context, max_tokens))
+
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Tuple[str, str]:
+        """First successful raw completion along the ranked providers"""
+        return await self._route(lambda provider: provider.generate_text(prompt, max_tokens))
+
+    async def stream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream from the first ranked provider that starts answering. Fails
+        over only before the first chunk; streams are never hedged.
+        """
+        last_error: Optional[BaseException] = None
+        failed: Optional[str] = None
+        for name in self.ranked():
+            if failed is not None:
+                ROUTER_FAILOVERS.inc(failed)
+            health = self.health[name]
+            health.last_attempt = time.monotonic()
+            started = time.perf_counter()
+            streaming = False
+            try:
+                async for chunk in self.providers[name].stream_text(prompt, max_tokens):
+                    streaming = True
+                    yield chunk
+            except Exception as e:
+                health.record(time.perf_counter() - started, False)
+                ROUTER_CALLS.inc(name, "error")
+                if streaming:
+                    raise
+                last_error, failed = e, name
+                logger.warning("ai_router_provider_failed", provider=name, error=str(e))
+                continue
+            health.record(time.perf_counter() - started, True)
+            ROUTER_CALLS.inc(name, "ok")
+            return
+        raise last_error
+
+    async def _route(self, call: Callable[[AIProvider], Awaitable[T]]) -> T:
+        order = self.ranked()
+        pending: Dict[asyncio.Task, str] = {}
+        next_index = 0
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal next_index
+            name = order[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(self._call(name, call))] = name
+            return name
+
+        primary = launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and next_index < len(order):
+                    timeout = self.hedge_delay(primary)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    ROUTER_HEDGES.inc(launch())
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning("ai_router_provider_failed", provider=name, error=str(last_error))
+
+                if not pending and next_index < len(order):
+                    ROUTER_FAILOVERS.inc(name)
+                    primary = launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_cost_estimate(self, prompt_tokens: int, response_tokens: int) -> float:
+        """Estimate for the provider the next call would go to"""
+        return self.providers[self.ranked()[0]].get_cost_estimate(prompt_tokens, response_tokens)
+
+    def serves(self, label: str) -> bool:
+        return any(provider.serves(label) for provider in self.providers.values())
+
+    def cost_for(self, label: str, prompt_tokens: int, response_tokens: int) -> float:
+        """Cost at the rates of whichever routed provider wrote the result"""
+        for provider in self.providers.values():
+            if provider.serves(label):
+                return provider.cost_for(label, prompt_tokens, response_tokens)
+        return self.get_cost_estimate(prompt_tokens, response_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "order": self.ranked(),
+            "hedge": self.hedge,
+            "providers": {name: health.as_dict(now) for name, health in self.health.items()},
+        }
+
+
+# Singleton instance, so every caller shares one view of provider health
+_router: Optional[RoutingProvider] = None
+
+
+def get_routing_provider() -> RoutingProvider:
+    """Get router over AI_ROUTER_PROVIDERS"""
+    global _router
+    if _router is None:
+        _router = RoutingProvider.from_spec()
+    return _router
+
+
+def _collect_metrics():
+    if _router is None:
+        return []
+    rows = list(_router.get_stats()["providers"].items())
+    return [
+        ("ai_router_provider_healthy", "gauge", "1 if the router currently considers the provider healthy",
+         [({"provider": name}, 1 if values["healthy"] else 0) for name, values in rows]),
+        ("ai_router_provider_error_rate", "gauge", "Error rate over the router's rolling window",
+         [({"provider": name}, values["error_rate"]) for name, values in rows]),
+        ("ai_router_provider_p95_seconds", "gauge", "p95 latency over the router's rolling window",
+         [({"provider": name}, values["p95_ms"] / 1000) for name, values in rows if values["p95_ms"] is not None]),
+    ]
+
+
+register_collector(_collect_metrics)
@@ -0,0 +1,328 @@
+"""
+AI Usage Accounting
+Token estimates and cost per ranch, provider and analysis type, rolled up
+per day, with per-ranch budgets
+
+Each generation and cache hit is recorded in memory and flushed into
+ai_usage_daily (one row per day, ranch, model label and analysis type)
+every AI_USAGE_FLUSH_SECONDS and on shutdown. Tokens are estimated locally
+(no tokenizer dependency); cost comes from the provider's own rates.
+
+A ranch whose spend reaches its daily (AI_RANCH_DAILY_BUDGET_USD, or its
+entry in AI_RANCH_BUDGETS) or monthly budget is limited per
+AI_BUDGET_ACTION: cache_only serves cached insights and a budget notice,
+local sends new generations to the Ollama provider.
+
+Per-ranch budgets are advisory: the analytics endpoints take ranch_id
+from the query string without authentication, so they keep spend
+predictable for well-behaved clients but do not stop a caller who sends
+another ranch_id. AI_GLOBAL_DAILY_BUDGET_USD caps the spend of all ranches
+together, which no ranch_id can get around.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import structlog
+
+from app.L1_config.database import SessionLocal
+from app.L1_config.metrics import counter, register_collector
+from app.L1_config.models import AIUsageDaily
+
+logger = structlog.get_logger()
+
+AI_USAGE_FLUSH_SECONDS = float(os.getenv("AI_USAGE_FLUSH_SECONDS", "30"))
+# USD per ranch (0 = no limit)
+AI_RANCH_DAILY_BUDGET_USD = float(os.getenv("AI_RANCH_DAILY_BUDGET_USD", "0"))
+AI_RANCH_MONTHLY_BUDGET_USD = float(os.getenv("AI_RANCH_MONTHLY_BUDGET_USD", "0"))
+# USD across all ranches (0 = no limit)
+AI_GLOBAL_DAILY_BUDGET_USD = float(os.getenv("AI_GLOBAL_DAILY_BUDGET_USD", "0"))
+# Daily budgets for specific ranches ("ranch-id=2.5,other-id=0.5")
+AI_RANCH_BUDGETS = os.getenv("AI_RANCH_BUDGETS", "")
+# cache_only | local
+AI_BUDGET_ACTION = os.getenv("AI_BUDGET_ACTION", "cache_only").lower()
+
+BUDGET_ACTIONS = ("cache_only", "local")
+
+# Ranch recorded for calls made without one
+UNASSIGNED_RANCH = "unassigned"
+
+# Rollup columns, in the order of the pending totals
+_FIELDS = ("calls", "cache_hits", "prompt_tokens", "response_tokens", "cost_usd")
+
+AI_TOKENS = counter("ai_tokens_total", "Estimated AI tokens by direction (prompt|response)",
+                    ("provider", "analysis", "direction"))
+AI_COST = counter("ai_cost_usd_total", "Estimated AI spend in USD", ("provider", "analysis"))
+AI_BUDGET_LIMITED = counter("ai_budget_limited_total", "Generations limited by a ranch AI budget", ("action",))
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count: one per punctuation mark and short word,
+    about four characters per token for longer words and numbers
+    """
+    return sum(-(-len(piece) // 4) for piece in _TOKEN_PIECES.findall(text or ""))
+
+
+def parse_budgets(value: str) -> Dict[str, float]:
+    """"ranch-a=2.5,ranch-b=1" -> {"ranch-a": 2.5, "ranch-b": 1.0}"""
+    parsed = {}
+    for item in value.split(","):
+        if "=" in item:
+            ranch_id, amount = item.rsplit("=", 1)
+            parsed[ranch_id.strip()] = float(amount)
+    return parsed
+
+
+class UsageLedger:
+    """AI usage per (day, ranch, provider, analysis): unflushed deltas in memory, rollups in the database"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 flush_seconds: float = AI_USAGE_FLUSH_SECONDS,
+                 daily_budget: float = AI_RANCH_DAILY_BUDGET_USD,
+                 monthly_budget: float = AI_RANCH_MONTHLY_BUDGET_USD,
+                 ranch_budgets: Optional[Dict[str, float]] = None,
+                 action: str = AI_BUDGET_ACTION,
+                 global_daily_budget: float = AI_GLOBAL_DAILY_BUDGET_USD):
+        if action not in BUDGET_ACTIONS:
+            raise ValueError(f"AI_BUDGET_ACTION must be one of {BUDGET_ACTIONS}, got {action!r}")
+        self.session_factory = session_factory
+        self.flush_seconds = flush_seconds
+        self.daily_budget = daily_budget
+        self.monthly_budget = monthly_budget
+        self.ranch_budgets = ranch_budgets or {}
+        self.global_daily_budget = global_daily_budget
+        self.action = action
+        self.pending: Dict[Tuple[date, str, str, str], List[float]] = {}
+        self.flush_errors = 0
+        self._flushing: Dict[Tuple[date, str, str, str], List[float]] = {}
+        # ranch (None = all ranches) -> (loaded at, day, day USD, month USD) as of the last database read
+        self._spend: Dict[Optional[str], Tuple[float, date, float, float]] = {}
+        self._generation = 0  # bumped by each flush, so reads started before it are not cached
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, ranch_id: Optional[str], provider: str, analysis: str, prompt_tokens: int = 0,
+               response_tokens: int = 0, cost_usd: float = 0.0, cache_hit: bool = False):
+        """Add one generation (or cache hit) to today's rollup"""
+        key = (date.today(), ranch_id or UNASSIGNED_RANCH, provider, analysis)
+        with self._lock:
+            totals = self.pending.setdefault(key, [0, 0, 0, 0, 0.0])
+            totals[1 if cache_hit else 0] += 1
+            totals[2] += prompt_tokens
+            totals[3] += response_tokens
+            totals[4] += cost_usd
+        if not cache_hit:
+            AI_TOKENS.inc(provider, analysis, "prompt", amount=prompt_tokens)
+            AI_TOKENS.inc(provider, analysis, "response", amount=response_tokens)
+            AI_COST.inc(provider, analysis, amount=cost_usd)
+        self._ensure_flusher()
+
+    def budget_for(self, ranch_id: Optional[str]) -> Tuple[float, float]:
+        """(daily, monthly) budget in USD for a ranch (0 = no limit)"""
+        return self.ranch_budgets.get(ranch_id or UNASSIGNED_RANCH, self.daily_budget), self.monthly_budget
+
+    def spent(self, ranch_id: Optional[str]) -> Tuple[float, float]:
+        """(today, this month) spend in USD for a ranch, flushed and pending"""
+        return self._spent(ranch_id or UNASSIGNED_RANCH)
+
+    def spent_all_ranches(self) -> float:
+        """Today's spend in USD across all ranches, flushed and pending"""
+        return self._spent(None)[0]
+
+    def _spent(self, ranch_id: Optional[str]) -> Tuple[float, float]:
+        today = date.today()
+        day_usd, month_usd = self._flushed_spend(ranch_id, today)
+        with self._lock:
+            for totals_by_key in (self.pending, self._flushing):
+                for (day, ranch, _, _), totals in totals_by_key.items():
+                    if ranch_id in (None, ranch) and (day.year, day.month) == (today.year, today.month):
+                        month_usd += totals[4]
+                        if day == today:
+                            day_usd += totals[4]
+        return day_usd, month_usd
+
+    def over_budget(self, ranch_id: Optional[str]) -> Optional[str]:
+        """"global", "daily" or "monthly" once that budget is reached, else None"""
+        if self.global_daily_budget and self.spent_all_ranches() >= self.global_daily_budget:
+            return "global"
+        daily, monthly = self.budget_for(ranch_id)
+        if not daily and not monthly:
+            return None
+        day_usd, month_usd = self.spent(ranch_id)
+        if daily and day_usd >= daily:
+            return "daily"
+        if monthly and month_usd >= monthly:
+            return "monthly"
+        return None
+
+    def budget_status(self, ranch_id: Optional[str]) -> Dict[str, Any]:
+        daily, monthly = self.budget_for(ranch_id)
+        day_usd, month_usd = self.spent(ranch_id)
+        return {
+            "ranch_id": ranch_id or UNASSIGNED_RANCH,
+            "daily_budget_usd": daily,
+            "monthly_budget_usd": monthly,
+            "spent_today_usd": round(day_usd, 6),
+            "spent_month_usd": round(month_usd, 6),
+            "global_daily_budget_usd": self.global_daily_budget,
+            "exceeded": self.over_budget(ranch_id),
+            "action": self.action,
+        }
+
+    def _flushed_spend(self, ranch_id: Optional[str], today: date) -> Tuple[float, float]:
+        """Spend already in the database, re-read at most once per flush interval"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._spend.get(ranch_id)
+            generation = self._generation
+        if cached and cached[1] == today and now - cached[0] < max(self.flush_seconds, 1.0):
+            return cached[2], cached[3]
+
+        try:
+            db = self.session_factory()
+            try:
+                query = db.query(AIUsageDaily.day, func.sum(AIUsageDaily.cost_usd)).filter(
+                    AIUsageDaily.day >= today.replace(day=1)
+                )
+                if ranch_id is not None:
+                    query = query.filter(AIUsageDaily.ranch_id == ranch_id)
+                rows = query.group_by(AIUsageDaily.day).all()
+            finally:
+                db.close()
+        except Exception as e:
+            # Budgets fail open: an unreadable ledger must not stop analytics
+            logger.error("ai_usage_read_failed", ranch_id=ranch_id, error=str(e))
+            return 0.0, 0.0
+
+        day_usd = sum(cost or 0.0 for day, cost in rows if day == today)
+        month_usd = sum(cost or 0.0 for _, cost in rows)
+        with self._lock:
+            if generation == self._generation:
+                self._spend[ranch_id] = (now, today, day_usd, month_usd)
+        return day_usd, month_usd
+
+    def flush(self) -> int:
+        """Add pending deltas to the daily rollups; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self.pending = self.pending, {}
+                self._flushing = batch
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error("ai_usage_flush_failed", rows=len(batch), error=str(e))
+                # Keep the deltas for the next flush
+                with self._lock:
+                    for key, totals in batch.items():
+                        merged = self.pending.setdefault(key, [0, 0, 0, 0, 0.0])
+                        for index, value in enumerate(totals):
+                            merged[index] += value
+                    self._flushing = {}
+                return 0
+            with self._lock:
+                self._flushing = {}
+                for _, ranch_id, _, _ in batch:
+                    self._spend.pop(ranch_id, None)
+                self._spend.pop(None, None)
+                self._generation += 1
+            return len(batch)
+
+    def _write(self, batch: Dict[Tuple[date, str, str, str], List[float]]):
+        # One upsert per row: workers flushing the same key add to it instead of overwriting
+        db = self.session_factory()
+        try:
+            insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            table = AIUsageDaily.__table__
+            for (day, ranch_id, provider, analysis), totals in batch.items():
+                statement = insert(table).values(day=day, ranch_id=ranch_id, provider=provider, analysis=analysis,
+                                                 **dict(zip(_FIELDS, totals)))
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=["day", "ranch_id", "provider", "analysis"],
+                    set_={**{field: table.c[field] + statement.excluded[field] for field in _FIELDS},
+                          "updated_at": func.now()},
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+    def rollups(self, ranch_id: Optional[str] = None, days: int = 30) -> List[Dict[str, Any]]:
+        """Daily rollups for the last `days` days, newest first (flushes pending usage first)"""
+        self.flush()
+        db = self.session_factory()
+        try:
+            query = db.query(AIUsageDaily).filter(AIUsageDaily.day >= date.today() - timedelta(days=days - 1))
+            if ranch_id:
+                query = query.filter(AIUsageDaily.ranch_id == ranch_id)
+            rows = query.order_by(AIUsageDaily.day.desc(), AIUsageDaily.ranch_id,
+                                  AIUsageDaily.provider, AIUsageDaily.analysis).all()
+            return [
+                {
+                    "day": row.day.isoformat(),
+                    "ranch_id": row.ranch_id,
+                    "provider": row.provider,
+                    "analysis": row.analysis,
+                    "calls": row.calls,
+                    "cache_hits": row.cache_hits,
+                    "prompt_tokens": row.prompt_tokens,
+                    "response_tokens": row.response_tokens,
+                    "cost_usd": round(row.cost_usd, 6),
+                }
+                for row in rows
+            ]
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pending_rows": len(self.pending), "flush_errors": self.flush_errors}
+
+    def _ensure_flusher(self):
+        """Start the flusher on first record"""
+        if self._flusher is None and self.flush_seconds > 0:
+            self._flusher = threading.Thread(target=self._run, name="ai-usage-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def close(self):
+        """Stop the flusher and write what is pending"""
+        self._stop.set()
+        self.flush()
+
+
+# Global ledger instance
+_ledger = UsageLedger(ranch_budgets=parse_budgets(AI_RANCH_BUDGETS))
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Get global usage ledger"""
+    return _ledger
+
+
+def _collect_metrics():
+    stats = _ledger.get_stats()
+    return [
+        ("ai_usage_pending_rows", "gauge", "AI usage rollup rows waiting to be flushed",
+         [({}, stats["pending_rows"])]),
+        ("ai_usage_flush_errors_total", "counter", "Failed AI usage rollup flushes", [({}, stats["flush_errors"])]),
+    ]
+
+
+register_collector(_collect_metrics)
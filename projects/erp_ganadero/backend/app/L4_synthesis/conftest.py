@@ -0,0 +1,65 @@
+"""Stub provider and service builder shared by the AI analytics tests"""
+
+from typing import Optional
+
+from app.L4_synthesis.ai_analytics import AIAnalyticsService
+from app.L4_synthesis.ai_cache import AICache
+from app.L4_synthesis.ai_cache_keys import CacheKeying
+from app.L4_synthesis.ai_provider import AIProvider
+from app.L4_synthesis.ai_usage import UsageLedger
+
+SINGLE_REPLY = "INSIGHT: single\nRECOMMENDATION: act\nALERT: None\nCONFIDENCE: 70"
+
+
+class ScriptedProvider(AIProvider):
+    """
+    Records every prompt. A single-type prompt gets reply ({n} = calls so
+    far); an overview prompt gets one block per [SECTION] not in skip.
+    Streams reply line by line, raising at line fail_after or stopping at
+    line end_after. Charges cost_per_1k USD per 1000 tokens either way.
+    """
+
+    name = "scripted"
+
+    def __init__(self, label: str = "scripted-model", reply: str = SINGLE_REPLY, skip=(),
+                 fail_after: Optional[int] = None, end_after: Optional[int] = None, cost_per_1k: float = 0.0):
+        self.label = label
+        self.reply = reply
+        self.skip = skip
+        self.fail_after = fail_after
+        self.end_after = end_after
+        self.cost_per_1k = cost_per_1k
+        self.prompts = []
+
+    async def generate_text(self, prompt, max_tokens=500):
+        self.prompts.append(prompt)
+        sections = [line[1:-1] for line in prompt.splitlines() if line.startswith("[") and line.endswith("]")]
+        if not sections:
+            return self.reply.format(n=len(self.prompts)), self.label
+        return "".join(
+            f"**[{section}]**\nINSIGHT: {section.lower()} insight\nRECOMMENDATION: act\nALERT: None\nCONFIDENCE: 80\n"
+            for section in sections if section.lower() not in self.skip
+        ), self.label
+
+    async def stream_text(self, prompt, max_tokens=500):
+        self.prompts.append(prompt)
+        for index, line in enumerate(self.reply.format(n=len(self.prompts)).splitlines(keepends=True)):
+            if index == self.fail_after:
+                raise RuntimeError("stream dropped")
+            if index == self.end_after:
+                return
+            yield line, self.label
+
+    def get_cost_estimate(self, prompt_tokens, response_tokens):
+        return (prompt_tokens + response_tokens) / 1000 * self.cost_per_1k
+
+
+def build_service(provider: AIProvider, usage: Optional[UsageLedger] = None,
+                  keying: Optional[CacheKeying] = None) -> AIAnalyticsService:
+    """Analytics service on the given provider with a fresh cache, keying and ledger"""
+    service = AIAnalyticsService()
+    service._provider = provider
+    service.cache = AICache(sweep_seconds=0)
+    service.keying = keying or CacheKeying()
+    service.usage = usage or UsageLedger(flush_seconds=0)
+    return service
@@ -0,0 +1,149 @@
+import asyncio
+
+from app.L1_config.ai_prompts import build_overview_prompt, split_overview_sections
+from app.L4_synthesis.ai_analytics import PROMPT_BUILDERS
+from app.L4_synthesis.conftest import ScriptedProvider, build_service
+
+METRICS = {
+    "health": {"calf_mortality": 4.2, "recent_deaths": 3, "vaccination_rate": 85, "herd_size": 150},
+    "reproduction": {"pregnancy_rate": 78, "calving_interval": 385, "open_cows": 12, "herd_size": 150},
+    "financial": {"total_costs": 45000, "revenue": 62000, "margin": 27.4, "cost_per_kg": 2.85,
+                  "cost_trend": "increasing"},
+    "growth": {"avg_daily_gain": 0.8, "weaning_weight": 195, "feed_efficiency": "moderate", "herd_size": 150},
+}
+
+
+STREAM_REPLY = "INSIGHT: Mortality is high\nRECOMMENDATION: Vaccinate\nALERT: None\nCONFIDENCE: 90\n"
+
+
+def _streaming(**kwargs):
+    return ScriptedProvider(label="streaming-model", reply=STREAM_REPLY, **kwargs)
+
+
+def test_split_overview_sections():
+    text = "[HEALTH]\nINSIGHT: a\n\n## [GROWTH]\nINSIGHT: b\n[UNKNOWN]\nINSIGHT: c"
+
+    assert split_overview_sections(text) == {"health": "INSIGHT: a", "growth": "INSIGHT: b"}
+
+
+def test_overview_prompt_repeats_each_single_prompt_section():
+    overview = build_overview_prompt(METRICS)
+
+    for analysis, values in METRICS.items():
+        single = PROMPT_BUILDERS[analysis](values)
+        metrics = single.split(":\n", 1)[1].split("\n\n", 1)[0]
+        answer = single.split("exact format:\n", 1)[1].split("\n\n", 1)[0]
+        assert metrics in overview
+        assert f"[{analysis.upper()}]\n{answer}" in overview
+
+
+def test_analyze_all_uses_one_call_and_fills_each_cache_entry():
+    provider = ScriptedProvider()
+    service = build_service(provider)
+
+    async def main():
+        overview = await service.analyze_all(METRICS)
+        single = await service.analyze_financial(METRICS["financial"])
+        return overview, single
+
+    overview, single = asyncio.run(main())
+
+    assert len(provider.prompts) == 1
+    assert list(overview) == ["health", "reproduction", "financial", "growth"]
+    assert overview["growth"]["insight"] == "growth insight"
+    assert overview["growth"]["confidence"] == 80
+    assert overview["growth"]["provider"] == "scripted-model"
+    assert single["insight"] == "financial insight"
+    assert single["cache"]["match"] == "exact"
+
+
+def test_analyze_all_only_asks_for_uncached_types_and_backfills_skipped_sections():
+    provider = ScriptedProvider(skip=("growth",))
+    service = build_service(provider)
+
+    async def main():
+        await service.analyze_health(METRICS["health"])
+        return await service.analyze_all(METRICS)
+
+    overview = asyncio.run(main())
+
+    combined = provider.prompts[1]
+    assert "[HEALTH]" not in combined and "[REPRODUCTION]" in combined
+    assert overview["health"]["cache"]["match"] == "exact"
+    # The model left growth out, so it got its own prompt
+    assert len(provider.prompts) == 3
+    assert overview["growth"]["insight"] == "single"
+
+
+def _collect(service, analysis="health"):
+    async def main():
+        return [event async for event in service.stream_insight(analysis, METRICS[analysis])]
+
+    return asyncio.run(main())
+
+
+def test_stream_emits_tokens_sections_and_caches_the_result():
+    service = build_service(_streaming())
+
+    events = _collect(service)
+
+    names = [name for name, _ in events]
+    assert names.count("token") == 4
+    assert [data["field"] for name, data in events if name == "section"] == ["insight", "recommendation", "alert"]
+    assert names[-1] == "result"
+    result = events[-1][1]
+    assert result["insight"] == "Mortality is high"
+    assert result["confidence"] == 90
+    assert result["provider"] == "streaming-model"
+
+    # Second stream is a cache hit: one result event
+    again = _collect(service)
+    assert [name for name, _ in again] == ["result"]
+    assert again[0][1]["cache"]["match"] == "exact"
+
+
+def test_truncated_stream_is_billed_but_not_cached():
+    service = build_service(_streaming(end_after=1))
+
+    events = _collect(service)
+
+    assert events[-1][1]["insight"] == "Mortality is high"
+    assert service.cache.get_stats()["cache_size"] == 0
+    assert [totals[0] for totals in service.usage.pending.values()] == [1]
+
+
+def test_failed_stream_bills_the_tokens_already_received():
+    service = build_service(_streaming(fail_after=2))
+
+    _collect(service)
+
+    (totals,) = service.usage.pending.values()
+    assert totals[0] == 1 and totals[3] > 0
+
+
+def test_empty_stream_is_neither_cached_nor_billed():
+    service = build_service(_streaming(end_after=0))
+
+    events = _collect(service)
+
+    assert events == [("result", service._fallback_response("health"))]
+    assert service.cache.get_stats()["cache_size"] == 0
+    assert service.usage.pending == {}
+
+
+def test_stream_failure_ends_with_the_fallback_and_caches_nothing():
+    service = build_service(_streaming(fail_after=2))
+
+    events = _collect(service)
+
+    assert events[-1] == ("result", service._fallback_response("health"))
+    assert service.cache.get_stats()["cache_size"] == 0
+
+
+def test_placeholder_answers_are_not_cached():
+    service = build_service(ScriptedProvider(label="gemini-pro (unavailable)"))
+
+    result = asyncio.run(service.analyze_health(METRICS["health"]))
+
+    assert result["provider"] == "gemini-pro (unavailable)"
+    assert service.cache.get_stats()["cache_size"] == 0
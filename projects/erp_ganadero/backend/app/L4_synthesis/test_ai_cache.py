@@ -0,0 +1,108 @@
+import sqlite3
+import time
+
+from app.L4_synthesis.ai_cache import AICache, ENTRY_OVERHEAD_BYTES
+from app.L4_synthesis.ai_cache_store import SQLiteCacheStore
+
+
+def _context(i):
+    return {"type": "health", "metrics": {"total": i, "pregnancy_rate": 78.0}}
+
+
+def test_key_is_independent_of_context_key_order():
+    cache = AICache(sweep_seconds=0)
+    cache.set("prompt", {"a": 1, "b": {"x": 1, "y": 2}}, {"insight": "ok"})
+
+    assert cache.get("prompt", {"b": {"y": 2, "x": 1}, "a": 1}) == {"insight": "ok"}
+    assert cache.get("other prompt", {"a": 1, "b": {"x": 1, "y": 2}}) is None
+
+
+def test_evicts_least_recently_used_past_entry_limit():
+    cache = AICache(max_entries=3, sweep_seconds=0)
+    for i in range(3):
+        cache.set("health", _context(i), {"insight": i})
+    cache.get("health", _context(0))  # 1 is now least recently used
+    cache.set("health", _context(3), {"insight": 3})
+
+    assert cache.get("health", _context(1)) is None
+    assert cache.get("health", _context(0)) == {"insight": 0}
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["cache_size"] == 3
+
+
+def test_evicts_past_byte_limit_and_tracks_memory():
+    big = {"insight": "x" * 1000}
+    cache = AICache(max_bytes=3 * (1100 + ENTRY_OVERHEAD_BYTES), sweep_seconds=0)
+    for i in range(5):
+        cache.set("health", _context(i), big)
+
+    stats = cache.get_stats()
+    assert stats["cache_size"] < 5
+    assert stats["evictions"] == 5 - stats["cache_size"]
+    assert 0 < stats["memory_bytes"] <= cache.max_bytes
+
+    cache.clear()
+    assert cache.get_stats()["memory_bytes"] == 0
+
+
+def test_sweeper_drops_expired_entries_without_lookups():
+    cache = AICache(ttl_hours=0.05 / 3600, sweep_seconds=0.02)
+    cache.set("health", _context(0), {"insight": 0})
+    try:
+        deadline = time.monotonic() + 2
+        while cache.get_stats()["cache_size"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        cache.close()
+
+    stats = cache.get_stats()
+    assert stats["cache_size"] == 0
+    assert stats["expirations"] == 1
+    assert stats["memory_bytes"] == 0
+
+
+def test_sqlite_tier_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "ai_cache.db")
+    first = AICache(sweep_seconds=0, store=SQLiteCacheStore(path))
+    first.set("health", _context(1), {"insight": "shared"})
+    first.close()  # finish the queued store write
+
+    # Another worker (or a restart) starts with an empty memory tier
+    second = AICache(sweep_seconds=0, store=SQLiteCacheStore(path))
+    assert second.get("health", _context(1)) == {"insight": "shared"}
+    assert second.get("health", _context(1)) == {"insight": "shared"}
+    assert second.get("health", _context(2)) is None
+
+    tiers = second.get_stats()["tiers"]
+    assert tiers["memory"]["hits"] == 1
+    assert tiers["sqlite"]["hits"] == 1
+    assert tiers["sqlite"]["lookups"] == 2
+    assert tiers["sqlite"]["hit_rate_percent"] == 50.0
+
+
+def test_store_writes_do_not_wait_for_a_locked_database(tmp_path):
+    path = str(tmp_path / "ai_cache.db")
+    cache = AICache(sweep_seconds=0, store=SQLiteCacheStore(path))
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    started = time.perf_counter()
+    cache.set("health", _context(1), {"insight": "queued"})
+    assert time.perf_counter() - started < 0.5
+    assert cache.get("health", _context(1)) == {"insight": "queued"}
+
+    other_worker.execute("COMMIT")
+    cache.close()
+    assert SQLiteCacheStore(path).get(cache._generate_key("health", _context(1)))[0] == {"insight": "queued"}
+    assert cache.get_stats()["tiers"]["sqlite"]["errors"] == 0
+
+
+def test_sqlite_tier_enforces_ttl_and_compacts(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "ai_cache.db"))
+    store.set("expired", {"insight": 0}, ttl_seconds=-1)
+    store.set("live", {"insight": 1}, ttl_seconds=60)
+
+    assert store.get("expired") is None
+    assert store.get("live")[0] == {"insight": 1}
+    assert store.compact() == 1
+    assert store.count() == 1
@@ -0,0 +1,79 @@
+import asyncio
+
+from app.L4_synthesis.ai_cache_keys import CacheKeying, build_rules
+from app.L4_synthesis.conftest import ScriptedProvider, build_service
+
+COUNTING_REPLY = "INSIGHT: insight {n}\nRECOMMENDATION: act\nALERT: None\nCONFIDENCE: 80"
+
+
+def _financial(margin, revenue=62000):
+    return {"total_costs": 45000, "revenue": revenue, "margin": margin,
+            "cost_per_kg": 2.85, "cost_trend": "increasing"}
+
+
+def test_quantize_snaps_fields_into_bands():
+    keying = CacheKeying()
+
+    assert keying.quantize("health", {"herd_size": 150, "vaccination_rate": 86}) == \
+        keying.quantize("health", {"herd_size": 151, "vaccination_rate": 84})
+    assert keying.quantize("financial", _financial(27.4)) != keying.quantize("financial", _financial(31))
+    assert keying.quantize("financial", _financial(27.4))["cost_trend"] == "increasing"
+
+
+def test_similarity_falls_with_band_distance_and_requires_equal_categories():
+    keying = CacheKeying()
+
+    assert keying.similarity("financial", _financial(27.4), _financial(27.4)) == 1.0
+    assert 0.9 < keying.similarity("financial", _financial(27.4), _financial(27.5)) < 1.0
+    assert keying.similarity("financial", _financial(27.4), _financial(30)) == 0.0
+    assert keying.similarity("financial", _financial(27.4), {**_financial(27.4), "cost_trend": "stable"}) == 0.0
+
+
+def test_rule_overrides():
+    rules = build_rules("financial.margin=step:5,health.herd_size=exact")
+
+    assert repr(rules["financial"]["margin"]) == "step:5"
+    assert repr(rules["health"]["herd_size"]) == "exact"
+    assert repr(rules["financial"]["revenue"]) == "relative:0.05"
+
+
+def test_close_metrics_reuse_one_generation():
+    service = build_service(ScriptedProvider(reply=COUNTING_REPLY), keying=CacheKeying())
+
+    async def main():
+        first = await service.analyze_financial(_financial(27.4))
+        same_band = await service.analyze_financial(_financial(27.2, revenue=62100))
+        across_edge = await service.analyze_financial(_financial(27.5))  # rounds to 28, near-hit on 27.4
+        far = await service.analyze_financial(_financial(35))
+        return first, same_band, across_edge, far
+
+    first, same_band, across_edge, far = asyncio.run(main())
+
+    assert len(service.provider.prompts) == 2
+    assert "27.4" in service.provider.prompts[0]  # the provider sees the exact metrics
+    assert same_band["cache"] == {"match": "exact", "similarity": 1.0}
+    assert across_edge["cache"]["match"] == "near"
+    assert across_edge["cache"]["similarity"] >= 0.8
+    assert across_edge["insight"] == first["insight"]
+    assert "cache" not in far
+
+    stats = service.get_cache_stats()["keying"]
+    assert stats["lookups"] == 4
+    assert stats["exact_hits"] == 1 and stats["near_hits"] == 1
+    assert stats["unquantized_hit_rate_percent"] == 0
+    assert stats["hit_rate_uplift_points"] == 50.0
+
+
+def test_disabled_quantization_keys_on_exact_metrics():
+    service = build_service(ScriptedProvider(reply=COUNTING_REPLY), keying=CacheKeying(enabled=False))
+
+    async def main():
+        await service.analyze_financial(_financial(27.4))
+        await service.analyze_financial(_financial(27.5))
+        return await service.analyze_financial(_financial(27.4))
+
+    repeat = asyncio.run(main())
+
+    assert len(service.provider.prompts) == 2
+    assert repeat["cache"]["match"] == "exact"
+    assert service.get_cache_stats()["keying"]["hit_rate_uplift_points"] == 0
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.L4_synthesis.ai_provider import (
+    AIProvider, GeminiProvider, OllamaProvider, PROVIDER_TIMEOUTS, ProviderTimeout, get_ai_provider
+)
+
+
+class _SlowProvider(AIProvider):
+    name = "test-slow"
+
+    def __init__(self, max_concurrency=2, timeout_seconds=1.0, queue_timeout_seconds=1.0):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.running = 0
+        self.peak = 0
+
+    async def generate_insight(self, prompt, context, max_tokens=500):
+        async def call():
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(float(prompt))
+            finally:
+                self.running -= 1
+            return {"insight": prompt}
+
+        return await self._limited(call)
+
+    def get_cost_estimate(self, prompt_tokens, response_tokens):
+        return 0.0
+
+
+def test_concurrency_is_capped_per_provider():
+    provider = _SlowProvider(max_concurrency=2)
+
+    async def main():
+        return await asyncio.gather(*[provider.generate_insight("0.02", {}) for _ in range(6)])
+
+    results = asyncio.run(main())
+
+    assert len(results) == 6
+    assert provider.peak == 2
+
+
+def test_queue_and_call_timeouts():
+    provider = _SlowProvider(max_concurrency=1, timeout_seconds=0.05, queue_timeout_seconds=0.02)
+    queue_before = PROVIDER_TIMEOUTS.get("test-slow", "queue")
+    call_before = PROVIDER_TIMEOUTS.get("test-slow", "call")
+
+    async def main():
+        return await asyncio.gather(provider.generate_insight("1", {}), provider.generate_insight("0", {}),
+                                    return_exceptions=True)
+
+    slow, queued = asyncio.run(main())
+
+    assert isinstance(slow, ProviderTimeout)
+    assert isinstance(queued, ProviderTimeout)
+    assert PROVIDER_TIMEOUTS.get("test-slow", "call") == call_before + 1
+    assert PROVIDER_TIMEOUTS.get("test-slow", "queue") == queue_before + 1
+
+
+def test_blocking_sdk_calls_leave_the_event_loop_free():
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(AIProvider._run_blocking(time.sleep, 0.1), ticker())
+
+    asyncio.run(main())
+
+    assert len(ticks) == 5
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.05
+
+
+def test_slots_follow_the_running_loop():
+    provider = _SlowProvider(max_concurrency=1)
+    for _ in range(2):
+        assert asyncio.run(provider.generate_insight("0", {})) == {"insight": "0"}
+
+
+MODEL_OUTPUT = """INSIGHT: Calf mortality is above the regional target.
+RECOMMENDATION: Review colostrum management in the first 24 hours.
+ALERT: None
+CONFIDENCE: 82%"""
+
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open like Ollama does
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append({"path": self.path, "body": body, "client_port": self.client_address[1]})
+        if body.get("stream"):
+            lines = [json.dumps({"response": line + "\n", "done": False}) for line in MODEL_OUTPUT.splitlines()]
+            payload = "\n".join(lines + [json.dumps({"response": "", "done": True})]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        payload = json.dumps({"model": body["model"], "response": MODEL_OUTPUT if body.get("prompt") else "",
+                              "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_url():
+    _OllamaStub.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_generates_and_parses_structured_insight(ollama_url):
+    provider = OllamaProvider(base_url=ollama_url, model="llama3", keep_alive="10m")
+
+    async def main():
+        try:
+            return [await provider.generate_insight("prompt", {"type": "health"}, max_tokens=300)
+                    for _ in range(3)]
+        finally:
+            await provider.aclose()
+
+    results = asyncio.run(main())
+
+    assert results[0]["insight"] == "Calf mortality is above the regional target."
+    assert results[0]["recommendation"] == "Review colostrum management in the first 24 hours."
+    assert results[0]["alert"] is None
+    assert results[0]["confidence"] == 82
+    assert results[0]["provider"] == "ollama/llama3"
+
+    request = _OllamaStub.requests[0]
+    assert request["path"] == "/api/generate"
+    assert request["body"]["stream"] is False
+    assert request["body"]["keep_alive"] == "10m"
+    assert request["body"]["options"]["num_predict"] == 300
+    # All three calls reuse one pooled connection
+    assert len({r["client_port"] for r in _OllamaStub.requests}) == 1
+
+
+def test_warmup_loads_the_model(ollama_url):
+    OllamaProvider(base_url=ollama_url, model="mistral").warmup()
+
+    assert _OllamaStub.requests[0]["body"] == {"model": "mistral", "keep_alive": "30m"}
+
+
+def test_unreachable_server_raises_and_warmup_does_not():
+    provider = OllamaProvider(base_url="http://127.0.0.1:9")
+    provider.warmup()
+
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(provider.generate_insight("prompt", {"type": "health"}))
+
+
+def test_factory_knows_ollama():
+    assert isinstance(get_ai_provider("ollama"), OllamaProvider)
+
+
+def test_streams_ndjson_chunks(ollama_url):
+    provider = OllamaProvider(base_url=ollama_url, model="llama3")
+
+    async def main():
+        try:
+            return [chunk async for chunk in provider.stream_text("prompt")]
+        finally:
+            await provider.aclose()
+
+    chunks = asyncio.run(main())
+
+    assert len(chunks) == 4
+    assert {label for _, label in chunks} == {"ollama/llama3"}
+    assert "".join(text for text, _ in chunks) == MODEL_OUTPUT + "\n"
+    assert _OllamaStub.requests[0]["body"]["stream"] is True
+
+
+def test_gemini_calls_during_warmup_wait_for_the_sdk(monkeypatch):
+    import sys
+    import types
+
+    class _Model:
+        def __init__(self, name):
+            pass
+
+        async def generate_content_async(self, prompt):
+            return types.SimpleNamespace(text=MODEL_OUTPUT)
+
+    fake = types.ModuleType("google.generativeai")
+    fake.configure = lambda api_key: time.sleep(0.2)  # slow SDK load
+    fake.GenerativeModel = _Model
+    monkeypatch.setitem(sys.modules, "google", types.ModuleType("google"))
+    monkeypatch.setitem(sys.modules, "google.generativeai", fake)
+
+    provider = GeminiProvider()
+    loader = threading.Thread(target=provider.warmup)
+    loader.start()
+    time.sleep(0.05)
+
+    assert provider.is_available()
+    result = asyncio.run(provider.generate_insight("prompt", {"type": "health"}))
+    loader.join()
+
+    assert result["provider"] == "gemini-pro"
+    assert result["confidence"] == 82
+
+
+def test_ollama_keeps_one_pool_per_loop_and_closes_them_all(ollama_url):
+    provider = OllamaProvider(base_url=ollama_url, model="llama3")
+
+    # A pool left behind by a finished loop is dropped when the next loop opens one
+    asyncio.run(provider.generate_insight("prompt", {"type": "health"}))
+    asyncio.run(provider.generate_insight("prompt", {"type": "health"}))
+    assert len(provider._clients) == 1
+
+    # A pool on a loop still running in another thread is closed on that loop
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(provider.generate_insight("prompt", {"type": "health"}), other).result(5)
+    other_client = provider._clients[other]
+
+    async def main():
+        await provider.generate_insight("prompt", {"type": "health"})
+        await provider.aclose()
+
+    asyncio.run(main())
+    other.call_soon_threadsafe(other.stop)
+    thread.join(5)
+    other.close()
+
+    assert provider._clients == {}
+    assert other_client.is_closed
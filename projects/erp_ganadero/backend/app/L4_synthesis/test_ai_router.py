@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.L4_synthesis.ai_router import RoutingProvider, StubProvider
+
+
+def _run(router, calls=1):
+    async def main():
+        return [await router.generate_insight("prompt", {"type": "health"}) for _ in range(calls)]
+
+    return asyncio.run(main())
+
+
+def test_routes_to_the_fastest_measured_provider():
+    slow, fast = StubProvider("slow", 0.03), StubProvider("fast", 0.001)
+    router = RoutingProvider([slow, fast])
+    # Measure both once, then only the faster one is used
+    router.health["fast"].record(0.001, True)
+    router.health["slow"].record(0.03, True)
+
+    results = _run(router, calls=3)
+
+    assert [r["provider"] for r in results] == ["fast"] * 3
+    assert router.ranked() == ["fast", "slow"]
+
+
+def test_fails_over_and_demotes_an_erroring_provider():
+    router = RoutingProvider([StubProvider("broken", 0.001, error_rate=1.0), StubProvider("backup", 0.001)])
+
+    results = _run(router, calls=3)
+
+    assert {r["provider"] for r in results} == {"backup"}
+    # One failure, then the measured backup outranks it
+    assert router.get_stats()["providers"]["broken"]["samples"] == 1
+    assert router.ranked() == ["backup", "broken"]
+
+    # Past the error-rate limit it stays behind even a slow provider
+    router.health["backup"].record(10.0, True)
+    for _ in range(4):
+        router.health["broken"].record(0.001, False)
+    router.health["broken"].record(0.001, True)
+    assert router.get_stats()["providers"]["broken"]["healthy"] is False
+    assert router.ranked() == ["backup", "broken"]
+
+
+def test_hedges_a_slow_primary():
+    slow, fast = StubProvider("slow", 0.5), StubProvider("fast", 0.01)
+    router = RoutingProvider([slow, fast], hedge=True, hedge_delay_seconds=0.02)
+
+    async def main():
+        started = asyncio.get_running_loop().time()
+        result = await router.generate_insight("prompt", {"type": "health"})
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(main())
+
+    assert result["provider"] == "fast"
+    assert elapsed < 0.3
+    assert router.get_stats()["providers"]["slow"]["samples"] == 0  # cancelled, not a failure
+
+
+def test_raises_when_every_provider_fails():
+    router = RoutingProvider([StubProvider("a", 0, 1.0), StubProvider("b", 0, 1.0)])
+
+    with pytest.raises(RuntimeError, match="simulated failure"):
+        _run(router)
+
+
+def test_builds_from_spec_skipping_unconfigured_providers(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    router = RoutingProvider.from_spec("openai,stub:0.01:0,stub")
+
+    assert list(router.providers) == ["stub-0", "stub-1"]
+    assert router.providers["stub-0"].latency_seconds == 0.01
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.L1_config.models import AIUsageDaily
+from app.L4_synthesis.ai_provider import GeminiProvider, OllamaProvider
+from app.L4_synthesis.ai_router import RoutingProvider, StubProvider
+from app.L4_synthesis.ai_usage import UsageLedger, estimate_tokens, parse_budgets
+from app.L4_synthesis.conftest import ScriptedProvider, build_service
+
+HEALTH = {"calf_mortality": 4.2, "recent_deaths": 3, "vaccination_rate": 85, "herd_size": 150}
+GROWTH = {"avg_daily_gain": 0.8, "weaning_weight": 195, "feed_efficiency": "moderate", "herd_size": 150}
+PRICED_REPLY = "INSIGHT: Herd is stable\nRECOMMENDATION: Keep going\nALERT: None\nCONFIDENCE: 75"
+
+
+def _priced(label="priced-model"):
+    """$1 per 1000 tokens either way"""
+    return ScriptedProvider(label=label, reply=PRICED_REPLY, cost_per_1k=1.0)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AIUsageDaily.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Herd size: 150") == 4
+    # Long words count about one token per four characters
+    assert estimate_tokens("vaccination") == 3
+    assert estimate_tokens("word " * 100) == 100
+
+
+def test_parse_budgets():
+    assert parse_budgets("ranch-a=2.5, ranch-b=1,bad") == {"ranch-a": 2.5, "ranch-b": 1.0}
+
+
+def test_records_roll_up_per_day_and_key(session_factory):
+    ledger = UsageLedger(session_factory, flush_seconds=0)
+    ledger.record("ranch-1", "gpt-4", "health", 100, 50, 0.006)
+    ledger.record("ranch-1", "gpt-4", "health", 100, 50, 0.006)
+    ledger.record("ranch-1", "gpt-4", "health", cache_hit=True)
+    ledger.record("ranch-2", "ollama/llama3", "growth", 80, 40, 0.0)
+
+    assert ledger.flush() == 2
+    # A second flush adds to the existing rows
+    ledger.record("ranch-1", "gpt-4", "health", 10, 5, 0.0006)
+    ledger.flush()
+
+    rows = {row["ranch_id"]: row for row in ledger.rollups()}
+    assert rows["ranch-1"]["calls"] == 3
+    assert rows["ranch-1"]["cache_hits"] == 1
+    assert rows["ranch-1"]["prompt_tokens"] == 210
+    assert rows["ranch-1"]["response_tokens"] == 105
+    assert rows["ranch-1"]["cost_usd"] == pytest.approx(0.0126)
+    assert rows["ranch-2"]["provider"] == "ollama/llama3"
+    assert [row["ranch_id"] for row in ledger.rollups("ranch-2")] == ["ranch-2"]
+
+
+def test_concurrent_flushes_add_to_the_same_row(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}", connect_args={"timeout": 30})
+    AIUsageDaily.__table__.create(engine)
+    ledgers = [UsageLedger(sessionmaker(bind=engine), flush_seconds=0) for _ in range(8)]
+    for ledger in ledgers:
+        ledger.record("ranch-1", "gpt-4", "health", 100, 50, 0.25)
+    barrier = threading.Barrier(len(ledgers))
+
+    def flush(ledger):
+        barrier.wait()
+        ledger.flush()
+
+    threads = [threading.Thread(target=flush, args=(ledger,)) for ledger in ledgers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    (row,) = ledgers[0].rollups()
+    assert row["calls"] == 8 and row["prompt_tokens"] == 800
+    assert row["cost_usd"] == pytest.approx(2.0)
+    assert sum(ledger.flush_errors for ledger in ledgers) == 0
+
+
+def test_global_budget_applies_whatever_the_ranch_id(session_factory):
+    ledger = UsageLedger(session_factory, flush_seconds=0, global_daily_budget=1.0)
+    ledger.record("ranch-1", "gpt-4", "health", 100, 50, 0.6)
+    ledger.flush()
+    ledger.record("made-up-ranch", "gpt-4", "growth", 100, 50, 0.6)
+
+    assert ledger.spent_all_ranches() == pytest.approx(1.2)
+    assert ledger.over_budget("another-made-up-ranch") == "global"
+    assert ledger.budget_status("ranch-1")["exceeded"] == "global"
+
+
+def test_failed_flush_keeps_pending_usage(session_factory):
+    def broken():
+        raise RuntimeError("database down")
+
+    ledger = UsageLedger(broken, flush_seconds=0)
+    ledger.record("ranch-1", "gpt-4", "health", 100, 50, 0.5)
+
+    assert ledger.flush() == 0
+    assert ledger.get_stats() == {"pending_rows": 1, "flush_errors": 1}
+    # Spend still counts toward the budget from memory
+    assert ledger.spent("ranch-1") == (0.5, 0.5)
+
+    ledger.session_factory = session_factory
+    assert ledger.flush() == 1
+    assert ledger.spent("ranch-1") == (0.5, 0.5)
+
+
+def test_generations_are_costed_per_ranch(session_factory):
+    provider = _priced()
+    service = build_service(provider, UsageLedger(session_factory, flush_seconds=0))
+
+    async def main():
+        await service.analyze_health(HEALTH, ranch_id="ranch-1")
+        await service.analyze_health(HEALTH, ranch_id="ranch-2")  # cache hit for ranch-2
+        await service.analyze_all({"health": HEALTH, "growth": GROWTH}, ranch_id="ranch-1")
+
+    asyncio.run(main())
+
+    rows = {(row["ranch_id"], row["analysis"]): row for row in service.get_usage()["days"]}
+    single = rows[("ranch-1", "health")]
+    assert single["calls"] == 1 and single["provider"] == "priced-model"
+    assert single["prompt_tokens"] == estimate_tokens(provider.prompts[0])
+    assert single["cost_usd"] == pytest.approx((single["prompt_tokens"] + single["response_tokens"]) / 1000)
+    assert rows[("ranch-2", "health")]["cache_hits"] == 1
+    assert rows[("ranch-2", "health")]["cost_usd"] == 0
+    # The health section of the overview was cached, so only growth was generated
+    assert rows[("ranch-1", "growth")]["calls"] == 1
+    assert rows[("ranch-1", "health")]["cache_hits"] == 1
+
+
+def test_cache_only_budget_stops_new_generations(session_factory):
+    provider = _priced()
+    ledger = UsageLedger(session_factory, flush_seconds=0, daily_budget=100, ranch_budgets={"ranch-1": 0.01})
+    service = build_service(provider, ledger)
+
+    async def main():
+        first = await service.analyze_health(HEALTH, ranch_id="ranch-1")
+        cached = await service.analyze_health(HEALTH, ranch_id="ranch-1")
+        blocked = await service.analyze_growth(GROWTH, ranch_id="ranch-1")
+        streamed = [event async for event in service.stream_insight("growth", GROWTH, ranch_id="ranch-1")]
+        other = await service.analyze_growth(GROWTH, ranch_id="ranch-2")
+        return first, cached, blocked, streamed, other
+
+    first, cached, blocked, streamed, other = asyncio.run(main())
+
+    assert first["provider"] == "priced-model"
+    assert cached["cache"]["match"] == "exact"
+    assert blocked["budget_exceeded"] is True
+    assert streamed == [("result", blocked)]
+    assert other["provider"] == "priced-model"
+    assert len(provider.prompts) == 2
+    assert service.get_usage("ranch-1")["budget"]["exceeded"] == "daily"
+
+
+def test_local_budget_action_uses_the_local_provider(session_factory):
+    provider, local = _priced(), _priced("ollama/llama3")
+    ledger = UsageLedger(session_factory, flush_seconds=0, monthly_budget=0.01, action="local")
+    service = build_service(provider, ledger)
+    service._local_provider = local
+
+    async def main():
+        await service.analyze_health(HEALTH, ranch_id="ranch-1")
+        return await service.analyze_growth(GROWTH, ranch_id="ranch-1")
+
+    result = asyncio.run(main())
+
+    assert result["provider"] == "ollama/llama3"
+    assert len(provider.prompts) == 1 and len(local.prompts) == 1
+    assert ledger.over_budget("ranch-1") == "monthly"
+
+
+def test_router_costs_calls_at_the_serving_provider_rates():
+    router = RoutingProvider([GeminiProvider(), OllamaProvider(), StubProvider("stub", 0)])
+
+    assert router.cost_for("gemini-pro", 1_000_000, 0) == pytest.approx(0.50)
+    assert router.cost_for("gemini-pro (unavailable)", 1_000_000, 0) == 0.0
+    assert router.cost_for("ollama/llama3", 1_000_000, 1_000_000) == 0.0
+    assert router.serves("stub") and not router.serves("gpt-4")
@@ -4,13 +4,31 @@ ERP Ganadero - FastAPI Main Application (L4 Synthesis)
 Main FastAPI application with all routes.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+import time
+
+_import_started = time.perf_counter()
+
+# Before the app modules are imported, so their loggers bind to the queued pipeline
+from .L1_config.logging_config import configure_logging, get_log_stats
+
+configure_logging()
+
+from fastapi import FastAPI, HTTPException, Depends, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 
 from .L1_config.system_config import APP_NAME, APP_VERSION, API_PREFIX, CORS_ORIGINS
-from .L1_config.database import get_db, init_db
+from .L1_config.database import (
+    get_db, get_read_db, get_replica_lag_seconds, init_db, engine,
+    DATABASE_READ_URL, SQLITE_REPLICA_SYNC_SECONDS, sync_sqlite_replica
+)
+from .L1_config.async_supabase import close_async_supabase
+from .L1_config.metrics import CONTENT_TYPE, MetricsMiddleware, register_collector, render_metrics
+from .L1_config.query_stats import QueryStatsMiddleware
+from .L1_config.sharding import get_ranch_db, get_ranch_read_db, get_shard_router, is_sharding_enabled
 from .L1_config.cattle_types import (
     Animal, AnimalCreate, AnimalUpdate,
     Event, EventCreate,
@@ -20,10 +38,14 @@ from .L1_config.cattle_types import (
 from .L1_config.auth_types import UserRegister, UserLogin, Token, UserResponse, RanchCreate, RanchResponse
 from .L2_foundation.cattle_crud import get_cattle_crud, CattleCRUD
 from .L2_foundation.event_crud import get_event_crud, EventCRUD
-from .L2_foundation.auth_service import create_access_token, get_current_user
+from .L2_foundation.auth_service import create_access_token, get_current_user, require_admin
 from .L2_foundation.user_crud import create_user, authenticate_user, get_user_ranches, create_ranch
 from .L1_config.models import User
+from .L2_foundation.single_flight import get_single_flight_stats, make_key, single_flight
+from .L2_foundation.profiler import ProfilerMiddleware, get_profiler
 from .L3_analysis.kpi_calculator import get_kpi_calculator, KPICalculator
+import asyncio
+import json
 import structlog
 
 logger = structlog.get_logger()
@@ -44,14 +66,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in stack sampling of selected requests (see /admin/profiler)
+app.add_middleware(ProfilerMiddleware)
+
+# Per-request query counts, DB time and N+1 detection
+app.add_middleware(QueryStatsMiddleware)
+
+# Per-route latency, status and in-flight metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+
+
+# Cold-start timings (seconds), reported by /health/startup
+STARTUP_TIMINGS = {}
+
+# Tasks started at startup, stopped by shutdown_event
+_background_tasks: Dict[str, asyncio.Task] = {}
+AI_WARMUP_SHUTDOWN_TIMEOUT_SECONDS = 10
+
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on application startup"""
+    """Initialize database off the event loop and warm the AI stack in the background"""
     logger.info("app_starting", app=APP_NAME, version=APP_VERSION)
-    init_db()
-    logger.info("database_initialized")
+    started = time.perf_counter()
+    
+    await run_in_threadpool(init_db)
+    STARTUP_TIMINGS["init_db_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("database_initialized", seconds=STARTUP_TIMINGS["init_db_seconds"])
+    
+    from .L2_foundation.search_db import ensure_search_indexes
+    await run_in_threadpool(ensure_search_indexes, engine)
+    if is_sharding_enabled():
+        get_shard_router().on_shard_created(ensure_search_indexes)
+        logger.info("shard_mode_enabled", shards=len(get_shard_router().list_shards()))
+    
+    if DATABASE_READ_URL and SQLITE_REPLICA_SYNC_SECONDS > 0:
+        _background_tasks["sqlite_replica_sync"] = asyncio.create_task(_sync_sqlite_replica_loop())
+        logger.info("sqlite_replica_sync_enabled", interval_seconds=SQLITE_REPLICA_SYNC_SECONDS)
+    
+    # Provider SDKs load in the background; requests arriving first load them lazily
+    _background_tasks["ai_warmup"] = asyncio.create_task(_warmup_ai())
+    
+    STARTUP_TIMINGS["startup_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("app_started", **STARTUP_TIMINGS)
+
+
+async def _warmup_ai():
+    """Construct the AI provider and import its SDK without blocking startup"""
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(get_ai_service().warmup)
+    except Exception as e:
+        logger.warning("ai_warmup_failed", error=str(e))
+    STARTUP_TIMINGS["ai_warmup_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("ai_warmup_complete", seconds=STARTUP_TIMINGS["ai_warmup_seconds"])
+
+
+async def _sync_sqlite_replica_loop():
+    """Keep the local SQLite replica copy fresh (development stand-in)"""
+    while True:
+        try:
+            await run_in_threadpool(sync_sqlite_replica)
+        except Exception as e:
+            logger.error("sqlite_replica_sync_failed", error=str(e))
+        await asyncio.sleep(SQLITE_REPLICA_SYNC_SECONDS)
 
 
 # ============================================================================
@@ -61,11 +140,56 @@ async def startup_event():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    health = {
         "status": "healthy",
         "app": APP_NAME,
         "version": APP_VERSION
     }
+    if DATABASE_READ_URL:
+        health["replica_lag_seconds"] = await run_in_threadpool(get_replica_lag_seconds)
+    return health
+
+
+@app.get("/health/startup")
+async def startup_timings():
+    """Import and startup timings for cold-start tracking"""
+    return STARTUP_TIMINGS
+
+
+@app.get("/health/coalescing")
+async def coalescing_stats():
+    """Single-flight counters: calls, executions and coalesced waiters per group"""
+    return get_single_flight_stats()
+
+
+@app.get("/health/logging")
+async def logging_stats():
+    """Log records written, dropped (queue full, sampled, rate-limited) and queued"""
+    return get_log_stats()
+
+
+def _collect_app_metrics():
+    families = [("app_startup_seconds", "gauge", "Cold-start timings by phase", [
+        ({"phase": name[:-len("_seconds")]}, value) for name, value in STARTUP_TIMINGS.items()
+    ])]
+    if is_sharding_enabled():
+        stats = get_shard_router().get_stats()
+        families += [
+            ("shard_engines_open", "gauge", "Open per-ranch shard engines", [({}, stats["open_engines"])]),
+            ("shard_engines_created_total", "counter", "Shard engines created", [({}, stats["engines_created"])]),
+            ("shard_engines_evicted_total", "counter", "Shard engines evicted from the LRU", [({}, stats["engines_evicted"])]),
+        ]
+    return families
+
+
+register_collector(_collect_app_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    body = await run_in_threadpool(render_metrics)
+    return Response(body, media_type=CONTENT_TYPE)
 
 
 # ============================================================================
@@ -166,7 +290,7 @@ async def get_me(current_user: User = Depends(get_current_user)):
 @app.get(f"{API_PREFIX}/ranches", response_model=List[RanchResponse])
 async def list_ranches(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all ranches accessible to current user"""
     ranches = get_user_ranches(db, current_user.id)
@@ -185,6 +309,90 @@ async def create_new_ranch(
     return ranch
 
 
+# ============================================================================
+# Admin Endpoints
+# ============================================================================
+
+@app.get(f"{API_PREFIX}/admin/fleet-report", dependencies=[Depends(require_admin)])
+async def get_fleet_report():
+    """Cross-shard herd, event and cost totals (shard mode only)"""
+    if not is_sharding_enabled():
+        raise HTTPException(status_code=400, detail="Shard mode is not enabled")
+    
+    router = get_shard_router()
+    return {
+        "shards": router.fleet_report(),
+        "engines": router.get_stats()
+    }
+
+
+@app.get(f"{API_PREFIX}/admin/profiler", dependencies=[Depends(require_admin)])
+async def get_profiler_summary():
+    """Profiled requests, samples per route and the current profiling window"""
+    return get_profiler().summary()
+
+
+@app.get(f"{API_PREFIX}/admin/profiler/stacks", dependencies=[Depends(require_admin)])
+async def get_profiler_stacks(route: Optional[str] = None):
+    """Collapsed stacks (flamegraph.pl / speedscope input), optionally for one route template"""
+    return Response(get_profiler().collapsed(route), media_type="text/plain")
+
+
+@app.post(f"{API_PREFIX}/admin/profiler/window", dependencies=[Depends(require_admin)])
+async def start_profiler_window(seconds: float = 60, percent: float = 100):
+    """Profile percent of all requests for the next seconds"""
+    if not 0 < seconds <= 3600 or not 0 < percent <= 100:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 3600], percent in (0, 100]")
+    get_profiler().start_window(seconds, percent)
+    return get_profiler().summary()
+
+
+@app.delete(f"{API_PREFIX}/admin/profiler/window", dependencies=[Depends(require_admin)])
+async def stop_profiler_window():
+    """End the profiling window early"""
+    get_profiler().stop_window()
+    return get_profiler().summary()
+
+
+@app.delete(f"{API_PREFIX}/admin/profiler", dependencies=[Depends(require_admin)])
+async def reset_profiler():
+    """Discard collected stacks"""
+    get_profiler().reset()
+    return get_profiler().summary()
+
+
+# ============================================================================
+# Search Endpoints
+# ============================================================================
+
+@app.get(f"{API_PREFIX}/search")
+async def search_ranch(
+    ranch_id: str,
+    q: str,
+    types: Optional[str] = None,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_ranch_read_db)
+):
+    """
+    Search animals (arete number, notes), clients and workers by partial text
+    
+    `types` is a comma-separated subset of: animal, client, worker
+    """
+    from .L2_foundation.search_db import search
+    
+    try:
+        return search(
+            db,
+            ranch_id,
+            q,
+            types=types.split(",") if types else None,
+            limit=min(limit, 100)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ============================================================================
 # Batch Import Endpoints
 # ============================================================================
@@ -194,7 +402,7 @@ async def batch_import_cattle(
     records: List[dict],
     ranch_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Batch import cattle records"""
     from .L2_foundation.batch_import import get_batch_importer
@@ -215,7 +423,7 @@ async def batch_import_costs(
     records: List[dict],
     ranch_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Batch import cost records"""
     from .L2_foundation.batch_import import get_batch_importer
@@ -236,7 +444,7 @@ async def batch_import_inventory(
     records: List[dict],
     ranch_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Batch import inventory records"""
     from .L2_foundation.batch_import import get_batch_importer
@@ -461,38 +669,44 @@ async def get_cattle_weight_history(
 ):
     """Get weight history for a specific animal (for charting)"""
     try:
-        # Get all events for this animal
-        all_events = await crud.get_by_cattle(cattle_id)
-        
-        # Filter to weighing and birth events (which have weight data)
-        weight_events = []
-        for event in all_events:
-            if event.type == "weighing" and event.data.get("weight_kg"):
-                weight_events.append({
-                    "date": str(event.event_date),
-                    "weight_kg": event.data["weight_kg"],
-                    "type": "weighing"
-                })
-            elif event.type == "birth" and event.data.get("calf_weight_kg"):
-                weight_events.append({
-                    "date": str(event.event_date),
-                    "weight_kg": event.data["calf_weight_kg"],
-                    "type": "birth"
-                })
-        
-        # Sort by date ascending (oldest first for chart)
-        weight_events.sort(key=lambda e: e["date"])
-        
-        return {
-            "cattle_id": cattle_id,
-            "measurements": weight_events,
-            "count": len(weight_events)
-        }
+        return await _build_weight_history(crud, cattle_id)
     except Exception as e:
         logger.error("get_weight_history_failed", cattle_id=cattle_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@single_flight("weight_history", key=lambda crud, cattle_id: make_key(cattle_id))
+async def _build_weight_history(crud: EventCRUD, cattle_id: str) -> dict:
+    """Weight chart points for an animal (shared by concurrent requests)"""
+    # Get all events for this animal
+    all_events = await crud.get_by_cattle(cattle_id)
+    
+    # Filter to weighing and birth events (which have weight data)
+    weight_events = []
+    for event in all_events:
+        if event.type == "weighing" and event.data.get("weight_kg"):
+            weight_events.append({
+                "date": str(event.event_date),
+                "weight_kg": event.data["weight_kg"],
+                "type": "weighing"
+            })
+        elif event.type == "birth" and event.data.get("calf_weight_kg"):
+            weight_events.append({
+                "date": str(event.event_date),
+                "weight_kg": event.data["calf_weight_kg"],
+                "type": "birth"
+            })
+    
+    # Sort by date ascending (oldest first for chart)
+    weight_events.sort(key=lambda e: e["date"])
+    
+    return {
+        "cattle_id": cattle_id,
+        "measurements": weight_events,
+        "count": len(weight_events)
+    }
+
+
 # ============================================================================
 # Metrics Endpoints
 # ============================================================================
@@ -517,39 +731,52 @@ async def get_summary(
 ):
     """Get herd summary for dashboard"""
     try:
-        total = await crud.count_by_ranch(ranch_id, Status.ACTIVE)
-        productive = await crud.get_productive_count(ranch_id)
-        unproductive = total - productive
-        
-        # Mock data for other fields
-        return HerdSummary(
-            total_animals=total,
-            productive_count=productive,
-            unproductive_count=unproductive,
-            ready_to_wean_count=12,  # TODO: Calculate from events
-            recent_births=5,  # TODO: Count recent birth events
-            recent_deaths=1,  # TODO: Count recent death events
-            week_cost_usd=1450.50  # TODO: Calculate from costs
-        )
+        return await _build_summary(crud, ranch_id)
     except Exception as e:
         logger.error("get_summary_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@single_flight("herd_summary", key=lambda crud, ranch_id: make_key(ranch_id))
+async def _build_summary(crud: CattleCRUD, ranch_id: str) -> HerdSummary:
+    """Dashboard summary for a ranch (shared by concurrent requests)"""
+    total = await crud.count_by_ranch(ranch_id, Status.ACTIVE)
+    productive = await crud.get_productive_count(ranch_id)
+    unproductive = total - productive
+    
+    # Mock data for other fields
+    return HerdSummary(
+        total_animals=total,
+        productive_count=productive,
+        unproductive_count=unproductive,
+        ready_to_wean_count=12,  # TODO: Calculate from events
+        recent_births=5,  # TODO: Count recent birth events
+        recent_deaths=1,  # TODO: Count recent death events
+        week_cost_usd=1450.50  # TODO: Calculate from costs
+    )
+
+
 # ============================================================================
 # Startup
 # ============================================================================
 
-@app.on_event("startup")
-async def startup_event():
-    """Startup tasks"""
-    logger.info("app_starting", app=APP_NAME, version=APP_VERSION)
-
-
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown tasks"""
     logger.info("app_shutting_down")
+    replica_sync = _background_tasks.pop("sqlite_replica_sync", None)
+    if replica_sync is not None:
+        replica_sync.cancel()
+        await asyncio.gather(replica_sync, return_exceptions=True)
+    # Let a running warmup finish so the provider it builds is the one aclose() closes
+    warmup = _background_tasks.pop("ai_warmup", None)
+    if warmup is not None:
+        done, _ = await asyncio.wait({warmup}, timeout=AI_WARMUP_SHUTDOWN_TIMEOUT_SECONDS)
+        if not done:
+            warmup.cancel()
+            await asyncio.gather(warmup, return_exceptions=True)
+    await close_async_supabase()
+    await get_ai_service().aclose()
 
 
 
@@ -558,25 +785,71 @@ async def shutdown_event():
 # AI Analytics Endpoints
 # ============================================================================
 
-from app.L4_synthesis.ai_analytics import AIAnalyticsService
+from app.L4_synthesis.ai_analytics import get_ai_service
 
-# Initialize AI service
-ai_service = AIAnalyticsService(provider_name="gemini")
+
+def _analytics_metrics(ranch_id: str) -> Dict[str, Dict[str, Any]]:
+    """Metrics per analysis type for a ranch"""
+    # TODO: Get real metrics from database
+    return {
+        "health": {
+            "calf_mortality": 4.2,
+            "recent_deaths": 3,
+            "vaccination_rate": 85,
+            "herd_size": 150
+        },
+        "reproduction": {
+            "pregnancy_rate": 78,
+            "calving_interval": 385,
+            "open_cows": 12,
+            "herd_size": 150
+        },
+        "financial": {
+            "total_costs": 45000,
+            "revenue": 62000,
+            "margin": 27.4,
+            "cost_per_kg": 2.85,
+            "cost_trend": "increasing"
+        },
+        "growth": {
+            "avg_daily_gain": 0.8,
+            "weaning_weight": 195,
+            "feed_efficiency": "moderate",
+            "herd_size": 150
+        },
+    }
+
+
+@app.get(f"{API_PREFIX}/analytics/overview")
+async def get_overview_insights(ranch_id: str = "ranch-1"):
+    """Get AI-powered insights for every analysis type in one provider call"""
+    try:
+        return await get_ai_service().analyze_all(_analytics_metrics(ranch_id), ranch_id=ranch_id)
+    except Exception as e:
+        logger.error("overview_insights_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get(f"{API_PREFIX}/analytics/{{analysis}}/stream")
+async def stream_insights(analysis: str, ranch_id: str = "ranch-1"):
+    """Stream AI insights as server-sent events: token, section, then result"""
+    metrics = _analytics_metrics(ranch_id)
+    if analysis not in metrics:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis: {analysis}")
+    
+    async def events():
+        async for event, data in get_ai_service().stream_insight(analysis, metrics[analysis], ranch_id=ranch_id):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get(f"{API_PREFIX}/analytics/health")
 async def get_health_insights(ranch_id: str = "ranch-1"):
     """Get AI-powered health insights"""
     try:
-        # TODO: Get real metrics from database
-        metrics = {
-            "calf_mortality": 4.2,
-            "recent_deaths": 3,
-            "vaccination_rate": 85,
-            "herd_size": 150
-        }
-        
-        insights = await ai_service.analyze_health(metrics)
+        insights = await get_ai_service().analyze_health(_analytics_metrics(ranch_id)["health"], ranch_id=ranch_id)
         return insights
     except Exception as e:
         logger.error("health_insights_failed", error=str(e))
@@ -587,15 +860,7 @@ async def get_health_insights(ranch_id: str = "ranch-1"):
 async def get_reproduction_insights(ranch_id: str = "ranch-1"):
     """Get AI-powered reproductive performance insights"""
     try:
-        # TODO: Get real metrics from database
-        metrics = {
-            "pregnancy_rate": 78,
-            "calving_interval": 385,
-            "open_cows": 12,
-            "herd_size": 150
-        }
-        
-        insights = await ai_service.analyze_reproduction(metrics)
+        insights = await get_ai_service().analyze_reproduction(_analytics_metrics(ranch_id)["reproduction"], ranch_id=ranch_id)
         return insights
     except Exception as e:
         logger.error("reproduction_insights_failed", error=str(e))
@@ -606,16 +871,7 @@ async def get_reproduction_insights(ranch_id: str = "ranch-1"):
 async def get_financial_insights(ranch_id: str = "ranch-1"):
     """Get AI-powered financial insights"""
     try:
-        # TODO: Get real metrics from database
-        metrics = {
-            "total_costs": 45000,
-            "revenue": 62000,
-            "margin": 27.4,
-            "cost_per_kg": 2.85,
-            "cost_trend": "increasing"
-        }
-        
-        insights = await ai_service.analyze_financial(metrics)
+        insights = await get_ai_service().analyze_financial(_analytics_metrics(ranch_id)["financial"], ranch_id=ranch_id)
         return insights
     except Exception as e:
         logger.error("financial_insights_failed", error=str(e))
@@ -626,15 +882,7 @@ async def get_financial_insights(ranch_id: str = "ranch-1"):
 async def get_growth_insights(ranch_id: str = "ranch-1"):
     """Get AI-powered growth & production insights"""
     try:
-        # TODO: Get real metrics from database
-        metrics = {
-            "avg_daily_gain": 0.8,
-            "weaning_weight": 195,
-            "feed_efficiency": "moderate",
-            "herd_size": 150
-        }
-        
-        insights = await ai_service.analyze_growth(metrics)
+        insights = await get_ai_service().analyze_growth(_analytics_metrics(ranch_id)["growth"], ranch_id=ranch_id)
         return insights
     except Exception as e:
         logger.error("growth_insights_failed", error=str(e))
@@ -644,7 +892,16 @@ async def get_growth_insights(ranch_id: str = "ranch-1"):
 @app.get(f"{API_PREFIX}/analytics/cache-stats")
 async def get_cache_stats():
     """Get AI cache statistics"""
-    return ai_service.get_cache_stats()
+    return get_ai_service().get_cache_stats()
+
+
+@app.get(f"{API_PREFIX}/analytics/usage", dependencies=[Depends(require_admin)])
+def get_ai_usage(ranch_id: Optional[str] = None, days: int = 30):
+    """
+    AI calls, estimated tokens and cost per day, provider and analysis type
+    (and the ranch's budget). Operator-only: the default view covers every ranch.
+    """
+    return get_ai_service().get_usage(ranch_id, days)
 
 
 if __name__ == "__main__":
@@ -679,7 +936,7 @@ async def create_cost(
     description: Optional[str] = None,
     cattle_id: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Create new cost entry"""
     from .L2_foundation.cost_crud_db import create_cost as db_create_cost
@@ -715,7 +972,7 @@ async def list_costs(
     end_date: Optional[str] = None,
     category: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_read_db)
 ):
     """List costs with filters"""
     from .L2_foundation.cost_crud_db import list_costs as db_list_costs
@@ -746,8 +1003,9 @@ async def list_costs(
 @app.delete(f"{API_PREFIX}/costs/{{cost_id}}")
 async def delete_cost(
     cost_id: str,
+    ranch_id: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Delete cost"""
     from .L2_foundation.cost_crud_db import delete_cost as db_delete_cost
@@ -782,7 +1040,7 @@ async def list_inventory(
     category: Optional[str] = None,
     low_stock_only: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_read_db)
 ):
     """List inventory items for ranch"""
     from .L2_foundation.inventory_crud_db import list_inventory as db_list_inventory
@@ -823,7 +1081,7 @@ async def create_inventory_item(
     supplier: Optional[str] = None,
     notes: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Create inventory item"""
     from .L2_foundation.inventory_crud_db import create_inventory_item as db_create_item
@@ -860,8 +1118,9 @@ async def create_inventory_item(
 @app.delete(f"{API_PREFIX}/inventory/{{item_id}}")
 async def delete_inventory_item(
     item_id: str,
+    ranch_id: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Delete inventory item"""
     from .L2_foundation.inventory_crud_db import delete_inventory_item as db_delete_item
@@ -873,20 +1132,115 @@ async def delete_inventory_item(
     return {"status": "deleted"}
 
 
-@app.put(f"{API_PREFIX}/inventory/{{item_id}}", response_model=InventoryItem)
-async def update_inventory_item(item_id: str, update: dict):
-    """Update inventory item"""
-    if item_id not in _inventory_store:
+@app.put(f"{API_PREFIX}/inventory/{{item_id}}")
+async def update_inventory_item(
+    item_id: str,
+    update: dict,
+    ranch_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_ranch_db)
+):
+    """Update inventory item (quantity changes feed alerts and days-of-supply)"""
+    from .L2_foundation.inventory_crud_db import update_inventory_item as db_update_item
+    
+    item = db_update_item(
+        db,
+        item_id,
+        quantity=update.get("quantity"),
+        unit_cost=update.get("unit_cost"),
+        min_stock=update.get("min_stock"),
+        notes=update.get("notes")
+    )
+    if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    item = _inventory_store[item_id]
-    for key, value in update.items():
-        if hasattr(item, key) and key not in ["id", "ranch_id", "created_at"]:
-            setattr(item, key, value)
+    return {
+        "id": item.id,
+        "ranch_id": item.ranch_id,
+        "category": item.category,
+        "name": item.name,
+        "quantity": item.quantity,
+        "unit": item.unit,
+        "unit_cost": item.unit_cost,
+        "min_stock": item.min_stock,
+        "supplier": item.supplier,
+        "notes": item.notes
+    }
+
+
+@app.get(f"{API_PREFIX}/inventory/low-stock")
+async def list_low_stock_inventory(
+    ranch_id: str,
+    limit: int = 100,
+    offset: int = 0,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_ranch_read_db)
+):
+    """List items at or below their minimum stock (served by the partial index)"""
+    from .L2_foundation.inventory_crud_db import list_low_stock
+    
+    items = list_low_stock(db, ranch_id, limit=limit, offset=offset)
+    
+    return [
+        {
+            "id": item.id,
+            "ranch_id": item.ranch_id,
+            "category": item.category,
+            "name": item.name,
+            "quantity": item.quantity,
+            "unit": item.unit,
+            "min_stock": item.min_stock,
+            "supplier": item.supplier
+        }
+        for item in items
+    ]
+
+
+@app.get(f"{API_PREFIX}/inventory/alerts")
+async def list_inventory_alerts(
+    ranch_id: str,
+    since: Optional[str] = None,
+    limit: int = 100,
+    after_seq: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_ranch_read_db)
+):
+    """Poll stock threshold alerts; pass the seq of the last alert seen as `after_seq`"""
+    from .L2_foundation.inventory_crud_db import list_inventory_alerts as db_list_alerts
+    
+    alerts = db_list_alerts(
+        db,
+        ranch_id,
+        since=datetime.fromisoformat(since) if since else None,
+        limit=limit,
+        after_seq=after_seq
+    )
+    
+    return [
+        {
+            "id": alert.id,
+            "seq": alert.seq,
+            "item_id": alert.item_id,
+            "kind": alert.kind,
+            "quantity": alert.quantity,
+            "min_stock": alert.min_stock,
+            "created_at": alert.created_at.isoformat()
+        }
+        for alert in alerts
+    ]
+
+
+@app.get(f"{API_PREFIX}/inventory/days-of-supply")
+async def get_inventory_days_of_supply(
+    ranch_id: str,
+    window_days: int = 30,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_ranch_read_db)
+):
+    """Project days of supply per item from recent consumption"""
+    from .L2_foundation.inventory_crud_db import get_days_of_supply
     
-    # Recalculate total value
-    item.total_value = item.quantity * item.unit_cost
-    return item
+    return get_days_of_supply(db, ranch_id, window_days=window_days)
 
 
 @app.delete(f"{API_PREFIX}/inventory/{{item_id}}")
@@ -907,7 +1261,7 @@ async def list_clients(
     ranch_id: str,
     client_type: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_read_db)
 ):
     """List clients for ranch"""
     from .L2_foundation.client_crud_db import list_clients as db_list_clients
@@ -947,7 +1301,7 @@ async def create_client(
     payment_terms: Optional[str] = None,
     notes: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Create client"""
     from .L2_foundation.client_crud_db import create_client as db_create_client
@@ -1012,7 +1366,7 @@ async def list_workers(
     ranch_id: str,
     active_only: bool = True,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_read_db)
 ):
     """List workers for ranch"""
     from .L2_foundation.worker_crud_db import list_workers as db_list_workers
@@ -1051,7 +1405,7 @@ async def create_worker(
     hire_date: Optional[str] = None,
     notes: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_ranch_db)
 ):
     """Create worker"""
     from .L2_foundation.worker_crud_db import create_worker as db_create_worker
@@ -1105,3 +1459,6 @@ async def delete_worker(worker_id: str):
         raise HTTPException(status_code=404, detail="Worker not found")
     del _workers_store[worker_id]
     return {"status": "deleted"}
+
+
+STARTUP_TIMINGS["import_seconds"] = round(time.perf_counter() - _import_started, 3)
@@ -0,0 +1,444 @@
+"""
+Benchmark Regression Suite
+
+Times the CRUD and analytics hot paths on fixed synthetic datasets
+(see bench_data.py), on SQLite and on the mock Supabase store, and
+records ops/sec, latency percentiles and peak RSS for each.
+
+Usage (from backend/):
+    python benchmarks/bench.py run --sizes 1k,100k --out results.json
+    python benchmarks/bench.py run --sizes 1k,100k --save-baseline
+    python benchmarks/bench.py compare results.json --threshold 20
+
+compare exits non-zero when any benchmark in the baseline got slower than
+the threshold (ops/sec down or p95 up).
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Cattle/event CRUD resolve their client from the environment on construction
+os.environ.setdefault("USE_MOCK_DB", "true")
+
+import structlog  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.L1_config.cattle_types import EventCreate, EventType  # noqa: E402
+from app.L1_config.mock_supabase import AsyncMockSupabaseClient, MockSupabaseClient  # noqa: E402
+from app.L2_foundation.batch_import import BatchImporter  # noqa: E402
+from app.L2_foundation.cattle_crud import CattleCRUD  # noqa: E402
+from app.L2_foundation.cattle_crud_db import list_animals  # noqa: E402
+from app.L2_foundation.event_crud import EventCRUD  # noqa: E402
+from app.L2_foundation.event_crud_db import create_event, list_events  # noqa: E402
+from app.L3_analysis.kpi_calculator import KPICalculator  # noqa: E402
+from app.L1_config.metrics import MetricsMiddleware  # noqa: E402
+from app.L4_synthesis.ai_cache import AICache  # noqa: E402
+
+from bench_data import SIZES, mock_dataset, ranch_count, sqlite_dataset  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Per-call logging would dominate the timings
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS counter (Linux); False if unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _percentile(sorted_ns: List[int], percent: float) -> float:
+    index = min(len(sorted_ns) - 1, max(0, round(percent / 100 * len(sorted_ns)) - 1))
+    return sorted_ns[index] / 1e6
+
+
+def _summarize(samples_ns: List[int], per_call: int, peak_rss_mb: float) -> Dict[str, Any]:
+    samples_ns.sort()
+    total_s = sum(samples_ns) / 1e9
+    return {
+        "ops": len(samples_ns) * per_call,
+        "ops_per_sec": round(len(samples_ns) * per_call / total_s, 2) if total_s else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(samples_ns, 50), 4),
+            "p95": round(_percentile(samples_ns, 95), 4),
+            "p99": round(_percentile(samples_ns, 99), 4),
+            "max": round(samples_ns[-1] / 1e6, 4),
+        },
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def measure(fn: Callable, min_time: float, min_iterations: int = 5, warmup: int = 2,
+            per_call: int = 1) -> Dict[str, Any]:
+    """Call fn() repeatedly for at least min_time seconds (async fns on one loop)"""
+
+    async def _run_async():
+        for _ in range(warmup):
+            await fn()
+        samples = []
+        deadline = time.perf_counter() + min_time
+        while len(samples) < min_iterations or time.perf_counter() < deadline:
+            start = time.perf_counter_ns()
+            await fn()
+            samples.append(time.perf_counter_ns() - start)
+        return samples
+
+    def _run_sync():
+        for _ in range(warmup):
+            fn()
+        samples = []
+        deadline = time.perf_counter() + min_time
+        while len(samples) < min_iterations or time.perf_counter() < deadline:
+            start = time.perf_counter_ns()
+            fn()
+            samples.append(time.perf_counter_ns() - start)
+        return samples
+
+    gc.collect()
+    _reset_peak_rss()
+    samples = asyncio.run(_run_async()) if asyncio.iscoroutinefunction(fn) else _run_sync()
+    return _summarize(samples, per_call, _peak_rss_mb())
+
+
+# ============================================================================
+# Benchmarks
+# ============================================================================
+
+class Context:
+    """Dataset handles shared by the benchmarks of one size"""
+
+    def __init__(self, size: str, workdir: str, backends: List[str]):
+        self.size = size
+        self.n_animals = SIZES[size]
+        self.ranch_id = "ranch-0"
+        self.rng = random.Random(size)
+        self.session = None
+        self.mock = None
+
+        if "sqlite" in backends:
+            path = sqlite_dataset(size, workdir)
+            self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+            self.session = sessionmaker(bind=self.engine)()
+        if "mock" in backends:
+            self.mock = AsyncMockSupabaseClient(MockSupabaseClient.from_snapshot(mock_dataset(size)))
+
+    def random_cattle_id(self) -> str:
+        # Animals of ranch-0 are every ranch_count()-th id
+        index = self.rng.randrange(0, self.n_animals, ranch_count(self.n_animals))
+        return f"cattle-{index:07d}"
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.engine.dispose()
+
+
+def _event(ctx: Context) -> EventCreate:
+    return EventCreate(
+        cattle_id=ctx.random_cattle_id(),
+        type=EventType.WEIGHING,
+        event_date=date.today(),
+        data={"weight_kg": round(ctx.rng.uniform(30, 900), 1)},
+    )
+
+
+def bench_list_animals_sqlite(ctx: Context):
+    return lambda: list_animals(ctx.session, ctx.ranch_id, limit=50)
+
+
+def bench_list_animals_mock(ctx: Context):
+    crud = CattleCRUD(ctx.mock)
+
+    async def run():
+        await crud.list_by_ranch(ctx.ranch_id, limit=50)
+    return run
+
+
+def bench_list_events_sqlite(ctx: Context):
+    return lambda: list_events(ctx.session, ranch_id=ctx.ranch_id, limit=100)
+
+
+def bench_list_events_mock(ctx: Context):
+    crud = EventCRUD(ctx.mock)
+
+    async def run():
+        await crud.get_recent_by_ranch(ctx.ranch_id, limit=100)
+    return run
+
+
+def bench_create_event_sqlite(ctx: Context):
+    return lambda: create_event(ctx.session, _event(ctx))
+
+
+def bench_create_event_mock(ctx: Context):
+    crud = EventCRUD(ctx.mock)
+
+    async def run():
+        await crud.create(_event(ctx))
+    return run
+
+
+BATCH_SIZE = 100
+
+
+def bench_batch_import_sqlite(ctx: Context):
+    counter = iter(range(10**9))
+
+    async def run():
+        batch = next(counter)
+        records = [
+            {
+                "arete_number": f"B{batch:06d}-{i:03d}",
+                "species": "vaca",
+                "gender": "F",
+                "birth_date": "2022-03-01",
+                "weight_kg": 420.0,
+            }
+            for i in range(BATCH_SIZE)
+        ]
+        results = await BatchImporter(ctx.session).import_cattle(records, ctx.ranch_id)
+        if results["failed"]:
+            raise RuntimeError(results["errors"][0]["error"])
+    return run
+
+
+def bench_kpi_herd_metrics_mock(ctx: Context):
+    calculator = KPICalculator()
+    calculator.cattle_crud = CattleCRUD(ctx.mock)
+    calculator.event_crud = EventCRUD(ctx.mock)
+
+    async def run():
+        await calculator.calculate_herd_metrics(ctx.ranch_id)
+    return run
+
+
+def bench_mock_table_execute_mock(ctx: Context):
+    table = ctx.mock.client
+
+    def run():
+        table.table("cattle").select("*").eq("ranch_id", ctx.ranch_id)\
+            .eq("status", "active").order("birth_date", desc=True).limit(50).execute()
+        table.table("cattle").select("id", count="exact").eq("ranch_id", ctx.ranch_id).execute()
+        table.table("events").select("*").eq("cattle_id", ctx.random_cattle_id()).execute()
+    return run
+
+
+def bench_ai_cache_memory(ctx: Context):
+    # Entries scale with the dataset (one per 10 animals, capped)
+    cache = AICache(ttl_hours=24)
+    entries = min(ctx.n_animals // 10, 100_000)
+    contexts = [{"ranch_id": f"ranch-{i}", "metrics": {"total": i, "pregnancy_rate": 78.0}} for i in range(entries)]
+    for context in contexts:
+        cache.set("health", context, {"insight": "ok"})
+
+    def run():
+        context = contexts[ctx.rng.randrange(entries)]
+        cache.get("health", context)
+        cache.get("health", {**context, "miss": True})
+    return run
+
+
+def bench_metrics_middleware_memory(ctx: Context):
+    # Middleware around a no-op app that matches a route like the router
+    # would: the timing is the per-request cost the middleware adds
+    from fastapi import FastAPI
+    api = FastAPI()
+    for i in range(50):
+        api.add_api_route(f"/api/v1/route{i}/{{item_id}}", lambda item_id: None)
+    endpoints = [route.endpoint for route in api.routes]
+
+    async def endpoint_app(scope, receive, send):
+        scope["endpoint"] = endpoints[-1]
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = MetricsMiddleware(endpoint_app)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def run():
+        await middleware({"type": "http", "method": "GET", "app": api}, receive, send)
+    return run
+
+
+# (name, backend) -> (factory, calls per timed sample)
+BENCHMARKS: Dict[tuple, tuple] = {
+    ("list_animals", "sqlite"): (bench_list_animals_sqlite, 1),
+    ("list_animals", "mock"): (bench_list_animals_mock, 1),
+    ("list_events", "sqlite"): (bench_list_events_sqlite, 1),
+    ("list_events", "mock"): (bench_list_events_mock, 1),
+    ("create_event", "sqlite"): (bench_create_event_sqlite, 1),
+    ("create_event", "mock"): (bench_create_event_mock, 1),
+    ("batch_import", "sqlite"): (bench_batch_import_sqlite, BATCH_SIZE),
+    ("kpi_herd_metrics", "mock"): (bench_kpi_herd_metrics_mock, 1),
+    ("mock_table_execute", "mock"): (bench_mock_table_execute_mock, 3),
+    ("ai_cache", "memory"): (bench_ai_cache_memory, 2),
+    ("metrics_middleware", "memory"): (bench_metrics_middleware_memory, 1),
+}
+
+
+def result_key(name: str, backend: str, size: str) -> str:
+    return f"{name}[{backend},{size}]"
+
+
+def run_benchmarks(sizes: List[str], backends: List[str], only: Optional[List[str]],
+                   min_time: float) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="erp-bench-") as workdir:
+        for size in sizes:
+            print(f"📦 Preparing {size} dataset...", flush=True)
+            started = time.perf_counter()
+            ctx = Context(size, workdir, backends)
+            print(f"   ready in {time.perf_counter() - started:.1f}s", flush=True)
+
+            try:
+                for (name, backend), (factory, per_call) in BENCHMARKS.items():
+                    if backend not in backends or (only and name not in only):
+                        continue
+                    stats = measure(factory(ctx), min_time, per_call=per_call)
+                    stats.update(name=name, backend=backend, size=size)
+                    results[result_key(name, backend, size)] = stats
+                    print(f"   {name:20} {backend:7} {stats['ops_per_sec']:>12,.1f} ops/s  "
+                          f"p95 {stats['latency_ms']['p95']:>9.3f} ms  rss {stats['peak_rss_mb']:>7.1f} MB",
+                          flush=True)
+            finally:
+                ctx.close()
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time_s": min_time,
+        },
+        "results": results,
+    }
+
+
+# ============================================================================
+# Compare
+# ============================================================================
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Benchmarks present in both runs, flagged when slower than threshold %"""
+    rows = []
+    for key, base in baseline["results"].items():
+        cur = current["results"].get(key)
+        if cur is None:
+            continue
+        ops_change = (cur["ops_per_sec"] - base["ops_per_sec"]) / base["ops_per_sec"] * 100 if base["ops_per_sec"] else 0.0
+        base_p95, cur_p95 = base["latency_ms"]["p95"], cur["latency_ms"]["p95"]
+        p95_change = (cur_p95 - base_p95) / base_p95 * 100 if base_p95 else 0.0
+        rows.append({
+            "key": key,
+            "ops_per_sec": (base["ops_per_sec"], cur["ops_per_sec"], round(ops_change, 1)),
+            "p95_ms": (base_p95, cur_p95, round(p95_change, 1)),
+            "regression": ops_change < -threshold or p95_change > threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float):
+    header = f"{'benchmark':40} {'ops/s before':>14} {'after':>14} {'Δ':>8} {'p95 Δ':>8}"
+    print(header + "\n" + "-" * len(header))
+    for row in rows:
+        before, after, change = row["ops_per_sec"]
+        print(f"{row['key']:40} {before:>14,.1f} {after:>14,.1f} {change:>+7.1f}% {row['p95_ms'][2]:>+7.1f}%"
+              + ("  ❌" if row["regression"] else ""))
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{regressions} regression(s) over {threshold}%")
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--sizes", default="1k,100k", help=f"Comma-separated, from {', '.join(SIZES)}")
+    run.add_argument("--backends", default="sqlite,mock,memory")
+    run.add_argument("--only", help="Comma-separated benchmark names")
+    run.add_argument("--time", type=float, default=1.0, help="Minimum seconds per benchmark")
+    run.add_argument("--out", help="Write results JSON here")
+    run.add_argument("--save-baseline", action="store_true", help=f"Also write {os.path.relpath(BASELINE_PATH)}")
+    run.add_argument("--compare", action="store_true", help="Compare against the baseline when done")
+    run.add_argument("--threshold", type=float, default=20.0, help="Regression threshold in percent")
+
+    cmp = sub.add_parser("compare", help="Compare results against the baseline")
+    cmp.add_argument("results")
+    cmp.add_argument("--baseline", default=BASELINE_PATH)
+    cmp.add_argument("--threshold", type=float, default=20.0, help="Regression threshold in percent")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        rows = compare(_load(args.baseline), _load(args.results), args.threshold)
+        print_comparison(rows, args.threshold)
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    sizes = args.sizes.split(",")
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    report = run_benchmarks(sizes, args.backends.split(","), args.only.split(",") if args.only else None, args.time)
+    for path in filter(None, [args.out, BASELINE_PATH if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"💾 Results written to {path}")
+
+    if args.compare:
+        rows = compare(_load(BASELINE_PATH), report, args.threshold)
+        print_comparison(rows, args.threshold)
+        return 1 if any(row["regression"] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Fixed Benchmark Datasets
+
+Deterministic herds of 1k / 100k / 1M animals (two events each), split
+into ranches of ~1000 animals so per-ranch queries stay comparable across
+sizes. Built once per size and cached under benchmarks/.data:
+
+- sqlite-<size>.db      SQLAlchemy schema, loaded with bulk core inserts
+- mock-<size>.snapshot  mock Supabase store snapshot (see mock_snapshot.py)
+
+Runs work on a copy of the SQLite file and on the mapped snapshot, so the
+cached data never changes between runs.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List
+import json
+import os
+import random
+import shutil
+
+from sqlalchemy import create_engine
+
+from app.L1_config.models import (
+    Base, Ranch, Animal, Event, AnimalSpecies, AnimalStatus, Gender, EventType
+)
+from app.L1_config.mock_snapshot import save_snapshot
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+RANCH_SIZE = 1_000
+EVENTS_PER_ANIMAL = 2
+SEED = 20240101
+DATASET_VERSION = 1  # bump when the generated data changes
+
+_SPECIES = [("vaca", "F"), ("toro", "M"), ("becerro", "M"), ("becerro", "F"), ("vaquilla", "F")]
+_STATUSES = ["active"] * 18 + ["sold", "dead"]
+_EVENT_TYPES = ["weighing", "weighing", "vaccination", "pregnancy_check", "treatment"]
+_EPOCH = date(2015, 1, 1)
+_CREATED_AT = datetime(2024, 1, 1).isoformat()
+
+
+class ColumnTable:
+    """Columns as plain lists; enough of the IndexedTable API for save_snapshot"""
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        self._columns = columns
+        self._rows = len(next(iter(columns.values())))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def column_values(self, column: str, default: Any = None) -> List[Any]:
+        return self._columns[column]
+
+    def iter_rows(self, start: int = 0, stop: int = None) -> Iterator[Dict[str, Any]]:
+        names = list(self._columns)
+        for values in zip(*(self._columns[name][start:stop] for name in names)):
+            yield dict(zip(names, values))
+
+
+def ranch_count(n_animals: int) -> int:
+    return max(1, n_animals // RANCH_SIZE)
+
+
+def generate(n_animals: int, seed: int = SEED) -> Dict[str, ColumnTable]:
+    """Deterministic ranches, cattle and events as columns"""
+    rng = random.Random(seed)
+    n_ranches = ranch_count(n_animals)
+    n_events = n_animals * EVENTS_PER_ANIMAL
+
+    ranches = ColumnTable({
+        "id": [f"ranch-{r}" for r in range(n_ranches)],
+        "owner_id": [f"user-{r}" for r in range(n_ranches)],
+        "name": [f"Rancho {r}" for r in range(n_ranches)],
+        "created_at": [_CREATED_AT] * n_ranches,
+    })
+
+    cattle_ids = [f"cattle-{i:07d}" for i in range(n_animals)]
+    species_gender = [rng.choice(_SPECIES) for _ in range(n_animals)]
+    birth_days = [rng.randint(0, 3400) for _ in range(n_animals)]
+    cattle = ColumnTable({
+        "id": cattle_ids,
+        "ranch_id": [f"ranch-{i % n_ranches}" for i in range(n_animals)],
+        "arete_number": [f"A{i:07d}" for i in range(n_animals)],
+        "species": [s for s, _ in species_gender],
+        "gender": [g for _, g in species_gender],
+        "birth_date": [(_EPOCH + timedelta(days=d)).isoformat() for d in birth_days],
+        "weight_kg": [round(rng.uniform(30, 900), 1) for _ in range(n_animals)],
+        "status": [rng.choice(_STATUSES) for _ in range(n_animals)],
+        # Calves point at an older animal of the same ranch
+        "mother_id": [
+            cattle_ids[i - n_ranches] if s == "becerro" and i >= n_ranches else None
+            for i, (s, _) in enumerate(species_gender)
+        ],
+        "created_at": [_CREATED_AT] * n_animals,
+        "updated_at": [_CREATED_AT] * n_animals,
+    })
+
+    event_animals = [i // EVENTS_PER_ANIMAL for i in range(n_events)]
+    event_types = [rng.choice(_EVENT_TYPES) for _ in range(n_events)]
+    events = ColumnTable({
+        "id": [f"event-{i:08d}" for i in range(n_events)],
+        "cattle_id": [cattle_ids[a] for a in event_animals],
+        "ranch_id": [f"ranch-{a % n_ranches}" for a in event_animals],
+        "type": event_types,
+        "event_date": [
+            (_EPOCH + timedelta(days=birth_days[a] + rng.randint(0, 400))).isoformat()
+            for a in event_animals
+        ],
+        "data": [
+            {"weight_kg": round(rng.uniform(30, 900), 1)} if t == "weighing" else {}
+            for t in event_types
+        ],
+        "created_at": [_CREATED_AT] * n_events,
+        "updated_at": [_CREATED_AT] * n_events,
+    })
+
+    return {"ranches": ranches, "cattle": cattle, "events": events}
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+def _write_sqlite(tables: Dict[str, ColumnTable], path: str, chunk: int = 50_000):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    def _convert(name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        if name == "ranches":
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        elif name == "cattle":
+            row["species"] = AnimalSpecies(row["species"])
+            row["gender"] = Gender(row["gender"])
+            row["status"] = AnimalStatus(row["status"])
+            row["birth_date"] = date.fromisoformat(row["birth_date"])
+        elif name == "events":
+            row["type"] = EventType(row["type"])
+            row["event_date"] = date.fromisoformat(row["event_date"])
+            row["data"] = json.dumps(row["data"])
+        for key in ("created_at", "updated_at"):
+            if isinstance(row.get(key), str):
+                row[key] = datetime.fromisoformat(row[key])
+        return row
+
+    models = {"ranches": Ranch, "cattle": Animal, "events": Event}
+    with engine.begin() as conn:
+        for name, table in tables.items():
+            for start in range(0, len(table), chunk):
+                rows = [_convert(name, row) for row in table.iter_rows(start, start + chunk)]
+                conn.execute(models[name].__table__.insert(), rows)
+    engine.dispose()
+
+
+def _cached(kind: str, size: str, suffix: str) -> str:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, f"{kind}-{size}-v{DATASET_VERSION}.{suffix}")
+
+
+def sqlite_dataset(size: str, workdir: str) -> str:
+    """Path to a fresh working copy of the SQLite dataset for size"""
+    path = _cached("sqlite", size, "db")
+    if not os.path.exists(path):
+        _write_sqlite(generate(SIZES[size]), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    copy = os.path.join(workdir, os.path.basename(path))
+    shutil.copyfile(path, copy)
+    return copy
+
+
+def mock_dataset(size: str) -> str:
+    """Path to the mock store snapshot for size"""
+    path = _cached("mock", size, "snapshot")
+    if not os.path.exists(path):
+        save_snapshot(generate(SIZES[size]), path)
+    return path
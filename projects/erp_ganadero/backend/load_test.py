@@ -1,195 +1,567 @@
 """
-Backend Performance Load Test
-Tests API performance with 1000+ cattle records
+Backend Load Generator
+
+Drives weighted mixes of realistic scenarios against the API and records
+latency in HDR-style histograms:
+
+- field_worker:  open the herd list, pick an animal, log a weighing, view its chart
+- dashboard:     poll summary, KPIs, low-stock inventory and health insights
+- batch_import:  upload a spreadsheet of new animals
+
+Load is either closed-loop (--concurrency N workers back to back) or
+open-loop (--rps R scenario starts per second; latency counts from the
+scheduled start, so a stalled server can't hide queueing delay).
+
+Usage:
+    python load_test.py run --url http://127.0.0.1:8000 --concurrency 20 --duration 60
+    python load_test.py run --in-process --rps 50 --mix field_worker=6,dashboard=3,batch_import=1
+    python load_test.py diff before.json after.json --threshold 10
 """
 
+import argparse
 import asyncio
+import json
+import math
+import os
+import random
+import sys
 import time
-import statistics
-from typing import List, Dict
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
 import httpx
 
-API_BASE = "http://127.0.0.1:8000/api/v1"
-
-async def create_test_cattle(count: int = 1000) -> List[str]:
-    """Create test cattle records"""
-    cattle_ids = []
-    
-    async with httpx.AsyncClient() as client:
-        for i in range(count):
-            data = {
-                "ranch_id": "test-ranch-1",
-                "tag_number": f"TEST-{i:04d}",
-                "type": "cow" if i % 3 == 0 else "calf",
-                "sex": "female" if i % 2 == 0 else "male",
-                "birth_date": f"2023-{(i % 12) + 1:02d}-15",
-                "status": "active"
-            }
-            
-            try:
-                response = await client.post(f"{API_BASE}/cattle", json=data)
-                if response.status_code == 201:
-                    cattle_ids.append(response.json()["id"])
-            except Exception as e:
-                print(f"Error creating cattle {i}: {e}")
-    
-    return cattle_ids
-
-
-async def test_list_performance(iterations: int = 100) -> Dict:
-    """Test list cattle endpoint performance"""
-    response_times = []
-    
-    async with httpx.AsyncClient() as client:
-        for _ in range(iterations):
-            start = time.time()
-            try:
-                response = await client.get(
-                    f"{API_BASE}/cattle",
-                    params={"ranch_id": "test-ranch-1", "limit": 100}
-                )
-                elapsed = (time.time() - start) * 1000  # Convert to ms
-                if response.status_code == 200:
-                    response_times.append(elapsed)
-            except Exception as e:
-                print(f"Error in request: {e}")
-    
-    return {
-        "endpoint": "GET /cattle",
-        "iterations": len(response_times),
-        "avg_ms": statistics.mean(response_times) if response_times else 0,
-        "min_ms": min(response_times) if response_times else 0,
-        "max_ms": max(response_times) if response_times else 0,
-        "p95_ms": statistics.quantiles(response_times, n=20)[18] if len(response_times) > 20 else 0,
-        "p99_ms": statistics.quantiles(response_times, n=100)[98] if len(response_times) > 100 else 0
-    }
+API_PREFIX = "/api/v1"
+
+
+# ============================================================================
+# Latency Histogram
+# ============================================================================
+
+class Histogram:
+    """
+    Log-linear latency histogram (HDR-style), values in microseconds.
+
+    Each power-of-two range is split into SUB_BUCKETS linear buckets, so
+    any recorded value is reproduced within ~0.1% while memory stays a few
+    thousand counters regardless of sample count.
+    """
+
+    SUB_BUCKET_BITS = 10
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return (shift + 1) * cls.SUB_BUCKETS + (value >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def _value(cls, index: int) -> int:
+        """Highest value that maps to a bucket index"""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = index // cls.SUB_BUCKETS - 1
+        sub = index % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value_us: int):
+        value_us = max(0, int(value_us))
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "Histogram"):
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> int:
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(self.total * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value(index), self.max_us)
+        return self.max_us
+
+    def summary_ms(self) -> Dict[str, float]:
+        ms = lambda us: round(us / 1000, 3)
+        return {
+            "min": ms(self.min_us or 0),
+            "mean": ms(self.sum_us / self.total) if self.total else 0.0,
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p95": ms(self.percentile(95)),
+            "p99": ms(self.percentile(99)),
+            "p999": ms(self.percentile(99.9)),
+            "max": ms(self.max_us),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total, "sum_us": self.sum_us, "min_us": self.min_us, "max_us": self.max_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        hist = cls()
+        hist.counts.update({int(index): count for index, count in data["counts"].items()})
+        hist.total, hist.sum_us = data["total"], data["sum_us"]
+        hist.min_us, hist.max_us = data["min_us"], data["max_us"]
+        return hist
+
+
+# ============================================================================
+# Recording
+# ============================================================================
 
+class Recorder:
+    """Per-endpoint and per-scenario latency, status codes and errors"""
 
-async def test_get_by_id_performance(cattle_ids: List[str], iterations: int = 100) -> Dict:
-    """Test get cattle by ID performance"""
-    response_times = []
-    
-    async with httpx.AsyncClient() as client:
-        for i in range(iterations):
-            cattle_id = cattle_ids[i % len(cattle_ids)]
-            start = time.time()
-            try:
-                response = await client.get(f"{API_BASE}/cattle/{cattle_id}")
-                elapsed = (time.time() - start) * 1000
-                if response.status_code == 200:
-                    response_times.append(elapsed)
-            except Exception as e:
-                print(f"Error in request: {e}")
-    
+    def __init__(self):
+        self.enabled = False
+        self.endpoints: Dict[str, Histogram] = defaultdict(Histogram)
+        self.scenarios: Dict[str, Histogram] = defaultdict(Histogram)
+        self.status_codes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenario_errors: Dict[str, int] = defaultdict(int)
+
+    def request(self, name: str, latency_us: int, status: Optional[int], ok: bool):
+        if not self.enabled:
+            return
+        self.endpoints[name].record(latency_us)
+        self.status_codes[name][str(status) if status is not None else "exception"] += 1
+        if not ok:
+            self.errors[name] += 1
+
+    def scenario(self, name: str, latency_us: int, ok: bool):
+        if not self.enabled:
+            return
+        self.scenarios[name].record(latency_us)
+        if not ok:
+            self.scenario_errors[name] += 1
+
+
+class Session:
+    """One virtual user: shared client, auth token and the ranch's animals"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, state: Dict[str, Any], rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.state = state
+        self.rng = rng
+        self.ok = True
+
+    async def call(self, name: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Issue a request and record it under name (a route template)"""
+        headers = kwargs.pop("headers", {})
+        if self.state.get("token"):
+            headers["Authorization"] = f"Bearer {self.state['token']}"
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, f"{API_PREFIX}{path}", headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.request(name, int((time.perf_counter() - started) * 1e6), None, False)
+            self.ok = False
+            return None
+
+        ok = response.status_code < 400
+        self.recorder.request(name, int((time.perf_counter() - started) * 1e6), response.status_code, ok)
+        self.ok = self.ok and ok
+        return response
+
+
+# ============================================================================
+# Scenarios
+# ============================================================================
+
+def _animal_payload(rng: random.Random, ranch_id: str) -> Dict[str, Any]:
+    species, gender = rng.choice([("vaca", "F"), ("toro", "M"), ("becerro", "M"), ("vaquilla", "F")])
+    born = date.today() - timedelta(days=rng.randint(60, 3000))
     return {
-        "endpoint": "GET /cattle/{id}",
-        "iterations": len(response_times),
-        "avg_ms": statistics.mean(response_times) if response_times else 0,
-        "min_ms": min(response_times) if response_times else 0,
-        "max_ms": max(response_times) if response_times else 0,
-        "p95_ms": statistics.quantiles(response_times, n=20)[18] if len(response_times) > 20 else 0,
-        "p99_ms": statistics.quantiles(response_times, n=100)[98] if len(response_times) > 100 else 0
+        "ranch_id": ranch_id,
+        "arete_number": f"LT-{uuid.uuid4().hex[:10].upper()}",
+        "species": species,
+        "gender": gender,
+        "birth_date": born.isoformat(),
+        "weight_kg": round(rng.uniform(80, 850), 1),
+        "status": "active",
     }
 
 
-async def test_events_performance(cattle_ids: List[str], iterations: int = 100) -> Dict:
-    """Test events endpoint performance"""
-    response_times = []
-    
-    async with httpx.AsyncClient() as client:
-        for i in range(iterations):
-            start = time.time()
-            try:
-                response = await client.get(
-                    f"{API_BASE}/events",
-                    params={"ranch_id": "test-ranch-1", "limit": 50}
-                )
-                elapsed = (time.time() - start) * 1000
-                if response.status_code == 200:
-                    response_times.append(elapsed)
-            except Exception as e:
-                print(f"Error in request: {e}")
-    
+async def field_worker(s: Session):
+    """Log a weighing for an animal from the herd list"""
+    ranch_id = s.state["ranch_id"]
+    response = await s.call("GET /cattle", "GET", "/cattle", params={"ranch_id": ranch_id, "limit": 50})
+
+    animals = s.state["cattle_ids"]
+    if response is not None and response.status_code == 200 and response.json():
+        animals = [a["id"] for a in response.json()]
+    if not animals:
+        return
+    cattle_id = s.rng.choice(animals)
+
+    await s.call("GET /cattle/{id}", "GET", f"/cattle/{cattle_id}")
+    await s.call("POST /events", "POST", "/events", json={
+        "cattle_id": cattle_id,
+        "type": "weighing",
+        "event_date": date.today().isoformat(),
+        "data": {"weight_kg": round(s.rng.uniform(80, 850), 1)},
+    })
+    await s.call("GET /cattle/{id}/weight-history", "GET", f"/cattle/{cattle_id}/weight-history")
+
+
+async def dashboard(s: Session):
+    """Dashboard poll"""
+    ranch_id = s.state["ranch_id"]
+    await s.call("GET /metrics/summary", "GET", "/metrics/summary", params={"ranch_id": ranch_id})
+    await s.call("GET /metrics/kpis", "GET", "/metrics/kpis", params={"ranch_id": ranch_id})
+    await s.call("GET /inventory/low-stock", "GET", "/inventory/low-stock", params={"ranch_id": s.state["db_ranch_id"]})
+    await s.call("GET /analytics/health", "GET", "/analytics/health", params={"ranch_id": ranch_id})
+
+
+async def batch_import(s: Session):
+    """Spreadsheet import of new animals"""
+    ranch_id = s.state["db_ranch_id"]
+    records = [_animal_payload(s.rng, ranch_id) for _ in range(s.state["batch_size"])]
+    for record in records:
+        record.pop("ranch_id")
+    await s.call("POST /batch/cattle", "POST", "/batch/cattle", params={"ranch_id": ranch_id}, json=records)
+
+
+SCENARIOS: Dict[str, Callable[[Session], Awaitable[None]]] = {
+    "field_worker": field_worker,
+    "dashboard": dashboard,
+    "batch_import": batch_import,
+}
+
+DEFAULT_MIX = "field_worker=6,dashboard=3,batch_import=1"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+async def _setup(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    """Register a throwaway user and seed animals for the scenarios"""
+    state: Dict[str, Any] = {"batch_size": args.batch_size, "cattle_ids": []}
+
+    response = await client.post(f"{API_PREFIX}/auth/register", json={
+        "email": f"loadtest+{uuid.uuid4().hex[:12]}@example.com",
+        "password": "loadtest-password",
+        "full_name": "Load Test",
+    })
+    if response.status_code == 200:
+        body = response.json()
+        state["token"] = body["access_token"]
+        state["db_ranch_id"] = body["user"]["default_ranch_id"]
+    else:
+        print(f"⚠️  Registration failed ({response.status_code}); authenticated endpoints will fail")
+        state["db_ranch_id"] = args.ranch_id
+
+    # Cattle/events live in Supabase (or the mock); they use their own ranch id
+    state["ranch_id"] = args.ranch_id
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(20)
+
+    async def _create():
+        async with semaphore:
+            r = await client.post(f"{API_PREFIX}/cattle", json=_animal_payload(rng, args.ranch_id))
+            if r.status_code == 200:
+                state["cattle_ids"].append(r.json()["id"])
+
+    await asyncio.gather(*[_create() for _ in range(args.seed_cattle)])
+    return state
+
+
+async def _run_scenario(name: str, session: Session, recorder: Recorder, intended_start: float):
+    session.ok = True
+    try:
+        await SCENARIOS[name](session)
+    except Exception:
+        session.ok = False
+    recorder.scenario(name, int((time.perf_counter() - intended_start) * 1e6), session.ok)
+
+
+async def _closed_loop(args, client, state, recorder, weights, deadline):
+    names, cumulative = list(weights), list(weights.values())
+
+    async def worker(worker_id: int):
+        rng = random.Random(args.seed + worker_id)
+        session = Session(client, recorder, state, rng)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=cumulative)[0]
+            await _run_scenario(name, session, recorder, time.perf_counter())
+
+    await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+
+
+async def _open_loop(args, client, state, recorder, weights, deadline):
+    names, cumulative = list(weights), list(weights.values())
+    rng = random.Random(args.seed)
+    in_flight: set = set()
+    interval = 1.0 / args.rps
+    next_start = time.perf_counter()
+    dropped = 0
+
+    while next_start < deadline:
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if len(in_flight) >= args.max_in_flight:
+            dropped += 1
+        else:
+            name = rng.choices(names, weights=cumulative)[0]
+            session = Session(client, recorder, state, random.Random(rng.random()))
+            # Latency is measured from the scheduled start (no coordinated omission)
+            task = asyncio.ensure_future(_run_scenario(name, session, recorder, next_start))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        next_start += rng.expovariate(1.0 / interval) if args.poisson else interval
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return dropped
+
+
+def _client_for(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight) + 10)
+    timeout = httpx.Timeout(args.timeout)
+    if args.in_process:
+        from app.main import app
+        return app, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                      timeout=timeout)
+    return None, httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+
+
+async def run_load(args) -> Dict[str, Any]:
+    """Run one load test and return the JSON report"""
+    weights = parse_mix(args.mix)
+    app, client = _client_for(args)
+    recorder = Recorder()
+
+    if app is not None:
+        await app.router.startup()
+    try:
+        async with client:
+            state = await _setup(client, args)
+
+            started_at = datetime.utcnow().isoformat()
+            start = time.perf_counter()
+            warmup_end = start + args.warmup
+            deadline = warmup_end + args.duration
+
+            async def _enable_after_warmup():
+                await asyncio.sleep(args.warmup)
+                recorder.enabled = True
+
+            enabler = asyncio.ensure_future(_enable_after_warmup())
+            if args.rps:
+                dropped = await _open_loop(args, client, state, recorder, weights, deadline)
+            else:
+                dropped = 0
+                await _closed_loop(args, client, state, recorder, weights, deadline)
+            await enabler
+            elapsed = max(time.perf_counter() - warmup_end, 1e-9)
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+
+    return _report(args, weights, recorder, started_at, elapsed, dropped)
+
+
+def _report(args, weights, recorder: Recorder, started_at: str, elapsed: float, dropped: int) -> Dict[str, Any]:
+    total_requests = sum(h.total for h in recorder.endpoints.values())
+    total_errors = sum(recorder.errors.values())
     return {
-        "endpoint": "GET /events",
-        "iterations": len(response_times),
-        "avg_ms": statistics.mean(response_times) if response_times else 0,
-        "min_ms": min(response_times) if response_times else 0,
-        "max_ms": max(response_times) if response_times else 0,
-        "p95_ms": statistics.quantiles(response_times, n=20)[18] if len(response_times) > 20 else 0,
-        "p99_ms": statistics.quantiles(response_times, n=100)[98] if len(response_times) > 100 else 0
+        "meta": {
+            "label": args.label,
+            "target": "in-process" if args.in_process else args.url,
+            "mode": f"rps={args.rps}" if args.rps else f"concurrency={args.concurrency}",
+            "mix": weights,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "started_at": started_at,
+            "seed": args.seed,
+        },
+        "totals": {
+            "requests": total_requests,
+            "errors": total_errors,
+            "rps": round(total_requests / elapsed, 2),
+            "scenarios": sum(h.total for h in recorder.scenarios.values()),
+            "dropped_starts": dropped,
+        },
+        "endpoints": {
+            name: {
+                "count": hist.total,
+                "errors": recorder.errors.get(name, 0),
+                "rps": round(hist.total / elapsed, 2),
+                "status_codes": dict(recorder.status_codes[name]),
+                "latency_ms": hist.summary_ms(),
+                "histogram": hist.to_dict(),
+            }
+            for name, hist in sorted(recorder.endpoints.items())
+        },
+        "scenarios": {
+            name: {
+                "count": hist.total,
+                "errors": recorder.scenario_errors.get(name, 0),
+                "latency_ms": hist.summary_ms(),
+                "histogram": hist.to_dict(),
+            }
+            for name, hist in sorted(recorder.scenarios.items())
+        },
     }
 
 
-async def run_load_tests():
-    """Run all load tests"""
-    print("🚀 Starting Backend Performance Load Tests")
-    print("=" * 60)
-    
-    # Test 1: Create 1000 cattle records
-    print("\n📊 Test 1: Creating 1000 test cattle records...")
-    start = time.time()
-    cattle_ids = await create_test_cattle(1000)
-    elapsed = time.time() - start
-    print(f"✅ Created {len(cattle_ids)} records in {elapsed:.2f}s")
-    print(f"   Average: {(elapsed/len(cattle_ids))*1000:.2f}ms per record")
-    
-    # Test 2: List cattle performance
-    print("\n📊 Test 2: Testing GET /cattle performance (100 iterations)...")
-    list_results = await test_list_performance(100)
-    print(f"✅ Results:")
-    print(f"   Average: {list_results['avg_ms']:.2f}ms")
-    print(f"   P95: {list_results['p95_ms']:.2f}ms")
-    print(f"   P99: {list_results['p99_ms']:.2f}ms")
-    print(f"   Min: {list_results['min_ms']:.2f}ms")
-    print(f"   Max: {list_results['max_ms']:.2f}ms")
-    
-    # Test 3: Get by ID performance
-    print("\n📊 Test 3: Testing GET /cattle/{id} performance (100 iterations)...")
-    get_results = await test_get_by_id_performance(cattle_ids, 100)
-    print(f"✅ Results:")
-    print(f"   Average: {get_results['avg_ms']:.2f}ms")
-    print(f"   P95: {get_results['p95_ms']:.2f}ms")
-    print(f"   P99: {get_results['p99_ms']:.2f}ms")
-    
-    # Test 4: Events performance
-    print("\n📊 Test 4: Testing GET /events performance (100 iterations)...")
-    events_results = await test_events_performance(cattle_ids, 100)
-    print(f"✅ Results:")
-    print(f"   Average: {events_results['avg_ms']:.2f}ms")
-    print(f"   P95: {events_results['p95_ms']:.2f}ms")
-    print(f"   P99: {events_results['p99_ms']:.2f}ms")
-    
-    # Summary
-    print("\n" + "=" * 60)
-    print("📈 PERFORMANCE SUMMARY")
-    print("=" * 60)
-    
-    results = {
-        "list_cattle": list_results,
-        "get_by_id": get_results,
-        "list_events": events_results,
-        "total_records": len(cattle_ids)
-    }
-    
-    # Performance assessment
-    print("\n🎯 Performance Assessment:")
-    if list_results['avg_ms'] < 200:
-        print("   ✅ List endpoint: EXCELLENT (<200ms)")
-    elif list_results['avg_ms'] < 500:
-        print("   ⚠️  List endpoint: ACCEPTABLE (200-500ms)")
-    else:
-        print("   ❌ List endpoint: NEEDS OPTIMIZATION (>500ms)")
-    
-    if get_results['avg_ms'] < 100:
-        print("   ✅ Get by ID: EXCELLENT (<100ms)")
-    elif get_results['avg_ms'] < 200:
-        print("   ⚠️  Get by ID: ACCEPTABLE (100-200ms)")
-    else:
-        print("   ❌ Get by ID: NEEDS OPTIMIZATION (>200ms)")
-    
-    return results
+def print_report(report: Dict[str, Any]):
+    meta, totals = report["meta"], report["totals"]
+    print(f"\n📈 {meta['target']}  {meta['mode']}  mix={meta['mix']}")
+    print(f"   {totals['requests']} requests, {totals['errors']} errors, {totals['rps']} req/s"
+          + (f", {totals['dropped_starts']} dropped starts" if totals["dropped_starts"] else ""))
+    header = f"{'endpoint':36} {'count':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    print("\n" + header + "\n" + "-" * len(header))
+    for section in ("endpoints", "scenarios"):
+        for name, stats in report[section].items():
+            lat = stats["latency_ms"]
+            label = name if section == "endpoints" else f"[{name}]"
+            print(f"{label:36} {stats['count']:>7} {stats['errors']:>5} "
+                  f"{lat['p50']:>9.2f} {lat['p95']:>9.2f} {lat['p99']:>9.2f} {lat['max']:>9.2f}")
+
+
+# ============================================================================
+# Diff
+# ============================================================================
+
+def diff_reports(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-endpoint latency/throughput changes; regressions exceed threshold %"""
+    rows = []
+    for section in ("endpoints", "scenarios"):
+        for name in sorted(set(before[section]) | set(after[section])):
+            a, b = before[section].get(name), after[section].get(name)
+            if a is None or b is None:
+                rows.append({"name": name, "section": section, "note": "added" if a is None else "removed"})
+                continue
+            row = {"name": name, "section": section, "changes": {}, "regression": False}
+            for metric in ("p50", "p95", "p99"):
+                old, new = a["latency_ms"][metric], b["latency_ms"][metric]
+                change = ((new - old) / old * 100) if old else 0.0
+                row["changes"][metric] = {"before": old, "after": new, "change_pct": round(change, 1)}
+                row["regression"] |= change > threshold
+            old_err = a["errors"] / a["count"] if a["count"] else 0
+            new_err = b["errors"] / b["count"] if b["count"] else 0
+            row["changes"]["error_rate"] = {"before": round(old_err, 4), "after": round(new_err, 4)}
+            row["regression"] |= new_err > old_err + 0.001
+            rows.append(row)
+    return rows
+
+
+def print_diff(rows: List[Dict[str, Any]], threshold: float):
+    header = f"{'name':36} {'p50':>16} {'p95':>16} {'p99':>16}  "
+    print(header + "\n" + "-" * len(header))
+    for row in rows:
+        label = row["name"] if row["section"] == "endpoints" else f"[{row['name']}]"
+        if "note" in row:
+            print(f"{label:36} ({row['note']})")
+            continue
+        cells = [f"{row['changes'][m]['after']:>8.2f} {row['changes'][m]['change_pct']:>+6.1f}%" for m in ("p50", "p95", "p99")]
+        print(f"{label:36} " + " ".join(f"{c:>16}" for c in cells) + ("  ❌" if row["regression"] else ""))
+    regressions = sum(1 for row in rows if row.get("regression"))
+    print(f"\n{regressions} regression(s) over {threshold}%")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run a load test")
+    target = run.add_mutually_exclusive_group()
+    target.add_argument("--url", default=os.getenv("LOADTEST_URL", "http://127.0.0.1:8000"))
+    target.add_argument("--in-process", action="store_true", help="Drive app.main:app through the ASGI transport")
+    rate = run.add_mutually_exclusive_group()
+    rate.add_argument("--concurrency", type=int, default=10, help="Closed-loop virtual users")
+    rate.add_argument("--rps", type=float, help="Open-loop scenario starts per second")
+    run.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times in --rps mode")
+    run.add_argument("--max-in-flight", type=int, default=200, help="Cap on concurrent scenarios in --rps mode")
+    run.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before recording")
+    run.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. field_worker=6,dashboard=3")
+    run.add_argument("--ranch-id", default="ranch-1", help="Ranch for cattle/event scenarios")
+    run.add_argument("--seed-cattle", type=int, default=50, help="Animals created before the run")
+    run.add_argument("--batch-size", type=int, default=100, help="Records per batch import")
+    run.add_argument("--timeout", type=float, default=30)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--label", default="")
+    run.add_argument("--out", help="Write the JSON report here")
+
+    diff = sub.add_parser("diff", help="Compare two JSON reports")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        rows = diff_reports(before, after, args.threshold)
+        print_diff(rows, args.threshold)
+        return 1 if any(row.get("regression") for row in rows) else 0
+
+    if args.rps is None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.rps is not None:
+        args.concurrency = 0
+
+    print("🚀 Starting load test")
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.out}")
+    return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(run_load_tests())
+    sys.exit(main())
@@ -0,0 +1,916 @@
+"""
+Synthetic Ranch Data Generator
+
+Builds deterministic, realistic ranch data for scale testing:
+
+- Multi-generation herds: founder cows and bulls, yearly calving seasons,
+  calves linked to their mothers (mother_id), replacement heifers that
+  calve in turn, weaning sales, culling and deaths
+- Events on plausible schedules: births, periodic weighings along a growth
+  curve, twice-yearly vaccination campaigns, yearly pregnancy checks,
+  treatments, sales and deaths
+- Costs per ranch and month, inventory, clients, workers and ranch owners
+
+Everything is generated with vectorized NumPy, so 1M animals / ~20M events
+take minutes, and written directly to:
+
+    --sqlite PATH     SQLAlchemy schema (same tables as the app)
+    --postgres URL    same schema; uses COPY when the driver is psycopg2
+    --snapshot PATH   mock Supabase store snapshot (MOCK_DB_SNAPSHOT)
+    --csv DIR         one CSV per table; cattle/costs/inventory carry the
+                      columns the /batch import endpoints accept
+
+The same --seed, sizes and --end date always produce the same data.
+Database targets are expected to be empty.
+
+Usage:
+    python synthetic_data.py --animals 1000000 --sqlite ranch.db
+    python synthetic_data.py --animals 50000 --snapshot mock.snapshot
+    python synthetic_data.py --animals 20000 --ranches 10 --csv exports/
+"""
+
+import argparse
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Days since 1970-01-01 are used for every date internally
+EPOCH = date(1970, 1, 1).toordinal()
+NO_EXIT = np.iinfo(np.int32).max
+
+DEFAULT_PASSWORD = "ganadero123"
+
+# Herd dynamics
+CALVING_RATE = 0.80
+CALF_MORTALITY = 0.04
+HEIFER_RETENTION = 0.55
+BULL_RETENTION = 0.03
+ADULT_DEATH_RATE = 0.015  # per year
+BULLS_PER_FOUNDER = 0.04
+
+# Event schedules (days)
+VACCINATION_INTERVAL = 182
+PREGNANCY_CHECK_INTERVAL = 365
+TREATMENTS_PER_YEAR = 0.3
+
+# Status / kinds
+ACTIVE, SOLD, DEAD = 0, 1, 2
+FEMALE, MALE = 0, 1
+
+SPECIES = ["vaca", "toro", "becerro", "vaquilla"]
+STATUSES = ["active", "sold", "dead"]
+EVENT_TYPES = ["birth", "death", "sale", "vaccination", "weighing", "pregnancy_check", "treatment"]
+BIRTH, DEATH, SALE, VACCINATION, WEIGHING, PREGNANCY_CHECK, TREATMENT = range(7)
+COST_CATEGORIES = ["feed", "veterinary", "labor", "infrastructure", "other"]
+
+VACCINES = ["Clostridial 8 vías", "Rabia paralítica", "IBR/DVB", "Leptospirosis", "Brucelosis RB51"]
+DIAGNOSES = [("Neumonía", "Oxitetraciclina"), ("Diarrea", "Sulfas"), ("Cojera", "Penicilina"),
+             ("Garrapatas", "Ivermectina"), ("Mastitis", "Cefalexina")]
+DEATH_CAUSES = ["Enfermedad respiratoria", "Accidente", "Depredador", "Parto distócico", "Desconocida"]
+COST_DESCRIPTIONS = {
+    "feed": ["Alfalfa", "Alimento balanceado", "Sal mineral", "Ensilaje de maíz"],
+    "veterinary": ["Vacunas", "Visita veterinaria", "Desparasitante", "Medicamentos"],
+    "labor": ["Nómina mensual"],
+    "infrastructure": ["Reparación de cercos", "Bebederos", "Corrales", "Bomba de agua"],
+    "other": ["Combustible", "Herramientas", "Fletes", "Trámites SINIIGA"],
+}
+INVENTORY_CATALOG = [
+    # category, name, unit, unit_cost, stock per 500 head
+    ("alimento", "Alimento balanceado", "kg", 8.5, 12000),
+    ("alimento", "Sal mineral", "kg", 14.0, 800),
+    ("alimento", "Pacas de alfalfa", "paca", 180.0, 400),
+    ("medicamento", "Ivermectina 1%", "ml", 1.2, 5000),
+    ("medicamento", "Oxitetraciclina", "ml", 0.9, 3000),
+    ("medicamento", "Vitaminas ADE", "ml", 0.6, 2000),
+    ("vacuna", "Clostridial 8 vías", "dosis", 9.0, 600),
+    ("vacuna", "Rabia paralítica", "dosis", 12.0, 600),
+    ("equipo", "Aretes SINIIGA", "pieza", 25.0, 300),
+    ("equipo", "Jeringas desechables", "pieza", 3.5, 1000),
+    ("equipo", "Alambre de púas", "rollo", 950.0, 20),
+]
+SUPPLIERS = ["Agroveterinaria del Norte", "Forrajes San Isidro", "Distribuidora Ganadera", "Veterinaria La Huerta"]
+FIRST_NAMES = ["José", "Juan", "María", "Luis", "Ana", "Miguel", "Rosa", "Pedro", "Carmen", "Jesús",
+               "Guadalupe", "Francisco", "Laura", "Antonio", "Sofía", "Ramón"]
+LAST_NAMES = ["García", "Hernández", "Martínez", "López", "González", "Pérez", "Rodríguez", "Sánchez",
+              "Ramírez", "Flores", "Torres", "Rivera", "Gómez", "Díaz", "Vázquez", "Castro"]
+RANCH_NAMES = ["San José", "El Mezquite", "La Esperanza", "Los Álamos", "Santa Rosa", "El Porvenir",
+               "La Palma", "San Miguel", "El Encino", "Las Flores"]
+STATES = ["Chihuahua", "Sonora", "Durango", "Jalisco", "Veracruz", "Tamaulipas", "Coahuila", "Zacatecas"]
+CLIENT_TYPES = ["feedlot", "butcher", "individual", "exporter"]
+PAYMENT_TERMS = ["contado", "15 días", "30 días"]
+POSITIONS = ["vaquero", "caporal", "encargado", "ordeñador", "veterinario"]
+
+# Table code per table, used in the deterministic ids
+TABLE_CODES = {"users": 1, "ranches": 2, "cattle": 3, "events": 4, "costs": 5,
+               "inventory": 6, "clients": 7, "workers": 8}
+
+
+def _day(d: date) -> int:
+    return d.toordinal() - EPOCH
+
+
+def _season_start(year: int) -> int:
+    """Calving seasons start in February (plus a per-ranch offset)"""
+    return _day(date(year, 2, 1))
+
+
+def _year(day: int) -> int:
+    return date.fromordinal(EPOCH + int(day)).year
+
+
+def _iso_days(first: int, last: int) -> List[str]:
+    """ISO dates for the day numbers first..last"""
+    return [date.fromordinal(EPOCH + d).isoformat() for d in range(first, last + 1)]
+
+
+# ============================================================================
+# Columns
+# ============================================================================
+#
+# Columns render slices of rows per output style: "sql" (enum names, JSON
+# text, as SQLAlchemy stores them), "csv" and "mock" (API values; mock keeps
+# JSON as dicts). encode() returns dictionary-encoded values for snapshots.
+
+class Column:
+    def __init__(self, n: int):
+        self.n = n
+
+    def render(self, start: int, stop: int, style: str) -> list:
+        raise NotImplementedError
+
+    def encode(self) -> Optional[Tuple[list, np.ndarray]]:
+        return None
+
+
+_BCRYPT_ALPHABET = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+    b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+)
+
+
+def seeded_bcrypt_salt(seed: int, rounds: int = 10) -> bytes:
+    """bcrypt salt derived from the seed, so password hashes are reproducible too"""
+    raw = hashlib.blake2b(f"synthetic-users-{seed}".encode(), digest_size=16).digest()
+    encoded = base64.b64encode(raw).translate(_BCRYPT_ALPHABET)[:22]
+    return b"$2b$%02d$" % rounds + encoded
+
+
+class IdColumn(Column):
+    """Deterministic UUID-formatted ids: <table>-<seed>-4000-8000-<index>"""
+
+    def __init__(self, table: str, n: int, seed: int):
+        super().__init__(n)
+        self.prefix = f"{TABLE_CODES[table]:08x}-{seed & 0xFFFF:04x}-4000-8000-"
+        self._values: Optional[np.ndarray] = None
+
+    def values(self) -> np.ndarray:
+        """All ids (plus a trailing None for missing references)"""
+        if self._values is None:
+            prefix = self.prefix
+            self._values = np.array([f"{prefix}{i:012x}" for i in range(self.n)] + [None], dtype=object)
+        return self._values
+
+    def render(self, start, stop, style):
+        prefix = self.prefix
+        return [f"{prefix}{i:012x}" for i in range(start, stop)]
+
+    def encode(self):
+        return self.values().tolist()[:-1], np.arange(self.n, dtype=np.uint32)
+
+
+class RefColumn(Column):
+    """Foreign key by row index into another table's ids (-1 = NULL)"""
+
+    def __init__(self, target: IdColumn, index: np.ndarray):
+        super().__init__(len(index))
+        self.target = target
+        self.index = np.where(index >= 0, index, target.n)
+
+    def render(self, start, stop, style):
+        return self.target.values()[self.index[start:stop]].tolist()
+
+    def encode(self):
+        return self.target.values().tolist(), self.index.astype(np.uint32)
+
+
+class CategoryColumn(Column):
+    """Small set of values addressed by code; sql_values for enum columns"""
+
+    def __init__(self, categories: list, codes: np.ndarray, sql_values: Optional[list] = None):
+        super().__init__(len(codes))
+        self.categories = categories
+        self.codes = codes
+        self._lookup = {
+            "mock": np.array(categories, dtype=object),
+            "csv": np.array(categories, dtype=object),
+            "sql": np.array(sql_values or categories, dtype=object),
+        }
+
+    def render(self, start, stop, style):
+        return self._lookup[style][self.codes[start:stop]].tolist()
+
+    def encode(self):
+        return list(self.categories), self.codes.astype(np.uint32)
+
+
+def enum_column(values: list, codes: np.ndarray) -> CategoryColumn:
+    """API values for csv/mock, enum member names for SQL"""
+    return CategoryColumn(values, codes, [v.upper() for v in values])
+
+
+def day_column(days: np.ndarray, timestamp: bool = False) -> CategoryColumn:
+    """Dates (or midnight timestamps) from day numbers"""
+    first = int(days.min()) if len(days) else 0
+    last = int(days.max()) if len(days) else 0
+    iso = _iso_days(first, last)
+    if not timestamp:
+        return CategoryColumn(iso, (days - first).astype(np.int64))
+    return CategoryColumn([f"{d}T00:00:00" for d in iso], (days - first).astype(np.int64),
+                          [f"{d} 00:00:00.000000" for d in iso])
+
+
+class FloatColumn(Column):
+    def __init__(self, values: np.ndarray, decimals: int = 1):
+        super().__init__(len(values))
+        self.values = np.round(values.astype(np.float64), decimals)
+
+    def render(self, start, stop, style):
+        return self.values[start:stop].tolist()
+
+    def encode(self):
+        distinct, codes = np.unique(self.values, return_inverse=True)
+        return distinct.tolist(), codes.reshape(-1).astype(np.uint32)
+
+
+class ConstColumn(Column):
+    def __init__(self, value, n: int):
+        super().__init__(n)
+        self.value = value
+
+    def render(self, start, stop, style):
+        return [self.value] * (stop - start)
+
+    def encode(self):
+        return [self.value], np.zeros(self.n, dtype=np.uint32)
+
+
+class FuncColumn(Column):
+    """Rendered by fn(start, stop, style); no fast encoding"""
+
+    def __init__(self, n: int, fn: Callable[[int, int, str], list]):
+        super().__init__(n)
+        self.fn = fn
+
+    def render(self, start, stop, style):
+        return self.fn(start, stop, style)
+
+
+class Table:
+    """Generated table; also the duck-typed table save_snapshot expects"""
+
+    def __init__(self, name: str, columns: Dict[str, Column], import_columns: Optional[List[str]] = None):
+        self.name = name
+        self.cols = columns
+        self.n = next(iter(columns.values())).n
+        # Columns accepted by the /batch import endpoint (CSV export)
+        self.import_columns = import_columns
+
+    def __len__(self) -> int:
+        return self.n
+
+    def columns(self) -> List[str]:
+        return list(self.cols)
+
+    def rows(self, start: int, stop: int, style: str, columns: Optional[List[str]] = None) -> List[tuple]:
+        rendered = [self.cols[c].render(start, stop, style) for c in (columns or self.cols)]
+        return list(zip(*rendered))
+
+    # save_snapshot interface
+    def encoded_column(self, column: str):
+        return self.cols[column].encode()
+
+    def column_values(self, column: str, default=None) -> list:
+        return self.cols[column].render(0, self.n, "mock")
+
+
+# ============================================================================
+# Herd Simulation
+# ============================================================================
+
+class Herd:
+    """Per-animal arrays (row index = animal, ordered by birth day)"""
+
+    def __init__(self, birth, sex, ranch, mother, exit_day, exit_kind, cycle, mature):
+        self.birth = birth
+        self.sex = sex
+        self.ranch = ranch
+        self.mother = mother
+        self.exit_day = exit_day
+        self.exit_kind = exit_kind
+        self.cycle = cycle    # day offset of the cow's calving within the season
+        self.mature = mature  # mature weight (kg)
+
+    def __len__(self):
+        return len(self.birth)
+
+
+def _adult_exit(rng, birth: np.ndarray, sex: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Culling age (sold) or death, whichever comes first"""
+    n = len(birth)
+    cull_years = np.where(sex == FEMALE, rng.uniform(7, 11, n), rng.uniform(4, 8, n))
+    cull = birth + (cull_years * 365).astype(np.int64)
+    death = birth + 200 + rng.exponential(365 / ADULT_DEATH_RATE, n).astype(np.int64)
+    return np.minimum(cull, death), np.where(death < cull, DEAD, SOLD)
+
+
+def _calf_fates(rng, birth: np.ndarray, sex: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Early deaths, weaning sales and retained replacements"""
+    n = len(birth)
+    exit_day, exit_kind = _adult_exit(rng, birth, sex)
+
+    retained = rng.random(n) < np.where(sex == FEMALE, HEIFER_RETENTION, BULL_RETENTION)
+    weaning = birth + rng.integers(200, 260, n)
+    exit_day = np.where(retained, exit_day, weaning)
+    exit_kind = np.where(retained, exit_kind, SOLD)
+
+    died_young = rng.random(n) < CALF_MORTALITY
+    exit_day = np.where(died_young, birth + rng.integers(1, 200, n), exit_day)
+    exit_kind = np.where(died_young, DEAD, exit_kind)
+    return exit_day, exit_kind
+
+
+def _mature_weight(rng, sex: np.ndarray) -> np.ndarray:
+    return np.where(sex == FEMALE, 520.0, 820.0) * rng.normal(1.0, 0.08, len(sex))
+
+
+def weight_at(mature: np.ndarray, age_days: np.ndarray) -> np.ndarray:
+    """Growth curve: ~35 kg at birth, ~200 kg at weaning, mature weight by ~4 years"""
+    return mature - (mature - 35.0) * np.exp(-np.maximum(age_days, 0) / 480.0)
+
+
+def _simulate(rng, founders_per_ranch: np.ndarray, start: int, end: int, ranch_season: np.ndarray) -> Herd:
+    ranch = np.repeat(np.arange(len(founders_per_ranch)), founders_per_ranch)
+    n = len(ranch)
+    sex = np.where(rng.random(n) < BULLS_PER_FOUNDER, MALE, FEMALE)
+    birth = start - rng.integers(2 * 365, 8 * 365, n)
+    exit_day, exit_kind = _adult_exit(rng, birth, sex)
+    # Founders were on the ranch when records start
+    exit_day = np.maximum(exit_day, start + rng.integers(30, 3 * 365, n))
+
+    parts = [dict(birth=birth, sex=sex, ranch=ranch, mother=np.full(n, -1), exit_day=exit_day,
+                  exit_kind=exit_kind, cycle=rng.integers(0, 90, n), mature=_mature_weight(rng, sex))]
+
+    for year in range(_year(start), _year(end) + 1):
+        herd = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+        calving = (_season_start(year) + ranch_season[herd["ranch"]] + herd["cycle"]
+                   + rng.integers(0, 10, len(herd["ranch"])))
+        age = calving - herd["birth"]
+        eligible = (
+            (herd["sex"] == FEMALE) & (age >= 2 * 365) & (age < 12 * 365)
+            & (herd["exit_day"] > calving) & (calving < end)
+        )
+        mothers = np.flatnonzero(eligible & (rng.random(len(eligible)) < CALVING_RATE))
+        if not len(mothers):
+            continue
+
+        c_birth = calving[mothers]
+        c_sex = np.where(rng.random(len(mothers)) < 0.5, MALE, FEMALE)
+        c_exit, c_kind = _calf_fates(rng, c_birth, c_sex)
+        parts.append(dict(birth=c_birth, sex=c_sex, ranch=herd["ranch"][mothers], mother=mothers,
+                          exit_day=c_exit, exit_kind=c_kind, cycle=rng.integers(0, 90, len(mothers)),
+                          mature=_mature_weight(rng, c_sex)))
+
+    herd = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    still_on_ranch = herd["exit_day"] >= end
+    herd["exit_day"] = np.where(still_on_ranch, NO_EXIT, herd["exit_day"])
+    herd["exit_kind"] = np.where(still_on_ranch, ACTIVE, herd["exit_kind"])
+
+    # Row order = birth order, so mothers always precede their calves
+    order = np.argsort(herd["birth"], kind="stable")
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    mother = herd["mother"][order]
+    herd = {key: values[order] for key, values in herd.items()}
+    herd["mother"] = np.where(mother >= 0, position[np.maximum(mother, 0)], -1)
+    return Herd(**herd)
+
+
+def simulate_herds(seed: int, n_animals: int, ranch_weights: np.ndarray, ranch_season: np.ndarray,
+                   start: int, end: int) -> Herd:
+    """
+    Simulate herds with exactly n_animals.
+
+    Founder counts are scaled until the simulation yields at least
+    n_animals; the surplus is removed from animals without calves, so
+    lineage stays intact and every season keeps its calves.
+    """
+    founders = max(len(ranch_weights) * 5, n_animals // 10)
+    for attempt in range(1, 8):
+        per_ranch = np.maximum(5, np.round(founders * ranch_weights / ranch_weights.sum())).astype(np.int64)
+        rng = np.random.default_rng([seed, attempt])
+        herd = _simulate(rng, per_ranch, start, end, ranch_season)
+        if len(herd) >= n_animals:
+            break
+        founders = int(founders * n_animals / len(herd) * 1.03) + 1
+
+    surplus = len(herd) - n_animals
+    keep = np.ones(len(herd), dtype=bool)
+    if surplus > 0:
+        childless = np.ones(len(herd), dtype=bool)
+        childless[herd.mother[herd.mother >= 0]] = False
+        candidates = np.flatnonzero(childless)
+        if len(candidates) >= surplus:
+            keep[rng.choice(candidates, surplus, replace=False)] = False
+        else:
+            keep[n_animals:] = False  # latest births
+
+    position = np.cumsum(keep) - 1
+    mother = herd.mother[keep]
+    return Herd(herd.birth[keep], herd.sex[keep], herd.ranch[keep],
+                np.where(mother >= 0, position[np.maximum(mother, 0)], -1),
+                herd.exit_day[keep], herd.exit_kind[keep], herd.cycle[keep], herd.mature[keep])
+
+
+# ============================================================================
+# Events
+# ============================================================================
+
+def _periodic(first: np.ndarray, last: np.ndarray, interval: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(animal, day) for first, first+interval, ... up to last, per animal"""
+    counts = np.where(last >= first, (last - first) // interval + 1, 0)
+    animal = np.repeat(np.arange(len(first)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return animal, first[animal] + step * interval
+
+
+def _aligned(earliest: np.ndarray, base: np.ndarray, interval: int) -> np.ndarray:
+    """First day >= earliest on the schedule base + k * interval"""
+    return base + np.maximum(0, -((base - earliest) // interval)) * interval
+
+
+class Events:
+    def __init__(self, animal, day, kind, value, choice):
+        self.animal = animal
+        self.day = day
+        self.kind = kind
+        self.value = value    # weight (kg) or sale price (MXN)
+        self.choice = choice  # vaccine / diagnosis / cause / result / client index
+
+    def __len__(self):
+        return len(self.animal)
+
+
+def generate_events(rng, herd: Herd, start: int, end: int, weigh_interval: int,
+                    ranch_season: np.ndarray, clients_offset: np.ndarray, clients_count: np.ndarray) -> Events:
+    n = len(herd)
+    life_start = np.maximum(herd.birth, start)
+    life_end = np.minimum(herd.exit_day, end) - 1  # last day with routine events
+    ranch = herd.ranch
+    parts = []
+
+    def add(animal, day, kind, value=None, choice=None):
+        size = len(animal)
+        parts.append((animal, day, np.full(size, kind, dtype=np.int8),
+                      np.zeros(size, dtype=np.float32) if value is None else value.astype(np.float32),
+                      np.zeros(size, dtype=np.int32) if choice is None else choice.astype(np.int32)))
+
+    # Births (animals born while records were kept)
+    born = np.flatnonzero(herd.birth >= start)
+    add(born, herd.birth[born], BIRTH, rng.normal(35, 4, len(born)))
+
+    # Weighings every weigh_interval days, starting at a random phase
+    animal, day = _periodic(life_start + rng.integers(0, weigh_interval, n), life_end, weigh_interval)
+    weight = weight_at(herd.mature[animal], day - herd.birth[animal]) * rng.normal(1.0, 0.03, len(animal))
+    add(animal, day, WEIGHING, weight)
+
+    # Ranch-wide vaccination campaigns, from two months of age
+    season = _season_start(_year(start)) + ranch_season[ranch]
+    # Spring and autumn campaigns
+    campaign_base = season + 60
+    first = _aligned(np.maximum(herd.birth + 60, start), campaign_base, VACCINATION_INTERVAL)
+    animal, day = _periodic(first, life_end, VACCINATION_INTERVAL)
+    add(animal, day, VACCINATION, choice=rng.integers(0, len(VACCINES), len(animal)))
+
+    # Yearly pregnancy checks for females from ~15 months
+    females = herd.sex == FEMALE
+    # Checked in late summer, ~6 months before calving
+    first = _aligned(np.maximum(herd.birth + 450, start), season + 200, PREGNANCY_CHECK_INTERVAL)
+    animal, day = _periodic(np.where(females, first, NO_EXIT), life_end, PREGNANCY_CHECK_INTERVAL)
+    add(animal, day, PREGNANCY_CHECK, choice=(rng.random(len(animal)) < CALVING_RATE).astype(np.int32))
+
+    # Treatments at random points of each animal's life
+    life_years = np.maximum(life_end - life_start, 0) / 365
+    counts = rng.poisson(TREATMENTS_PER_YEAR * life_years)
+    animal = np.repeat(np.arange(n), counts)
+    span = np.maximum(life_end - life_start, 1)[animal]
+    day = life_start[animal] + (rng.random(len(animal)) * span).astype(np.int64)
+    add(animal, day, TREATMENT, choice=rng.integers(0, len(DIAGNOSES), len(animal)))
+
+    # Exits
+    dead = np.flatnonzero(herd.exit_kind == DEAD)
+    add(dead, herd.exit_day[dead], DEATH, choice=rng.integers(0, len(DEATH_CAUSES), len(dead)))
+    sold = np.flatnonzero(herd.exit_kind == SOLD)
+    sale_weight = weight_at(herd.mature[sold], herd.exit_day[sold] - herd.birth[sold])
+    price = sale_weight * rng.uniform(42, 58, len(sold))
+    client = clients_offset[ranch[sold]] + rng.integers(0, clients_count[ranch[sold]])
+    add(sold, herd.exit_day[sold], SALE, price, client)
+
+    animal, day, kind, value, choice = (np.concatenate(column) for column in zip(*parts))
+    order = np.argsort(day, kind="stable")
+    return Events(animal[order], day[order], kind[order], value[order], choice[order])
+
+
+# ============================================================================
+# Dataset
+# ============================================================================
+
+class Dataset:
+    """All generated tables, in foreign-key order"""
+
+    def __init__(self, seed: int, n_animals: int, n_ranches: int, years: int, end: date,
+                 weigh_interval: int = 60):
+        self.seed = seed
+        self.end = _day(end)
+        self.start = self.end - years * 365
+        ranch_rng = np.random.default_rng([seed, 0])
+        ranch_weights = ranch_rng.lognormal(0.0, 0.6, n_ranches)
+        ranch_season = ranch_rng.integers(0, 60, n_ranches)
+        rng = np.random.default_rng([seed, 100])
+
+        self.herd = simulate_herds(seed, n_animals, ranch_weights, ranch_season, self.start, self.end)
+        herd = self.herd
+        head_count = np.bincount(herd.ranch[herd.exit_kind == ACTIVE], minlength=n_ranches)
+        head_count = np.maximum(head_count, 10)
+
+        self.ids = {name: None for name in TABLE_CODES}
+        self.tables: Dict[str, Table] = {}
+
+        self._users_and_ranches(rng, n_ranches)
+        clients_count = rng.integers(3, 13, n_ranches)
+        clients_offset = np.cumsum(clients_count) - clients_count
+        self._cattle(rng)
+        self.events = generate_events(rng, herd, self.start, self.end, weigh_interval,
+                                      ranch_season, clients_offset, clients_count)
+        self._events()
+        self._costs(rng, n_ranches, head_count)
+        self._inventory(rng, n_ranches, head_count)
+        self._clients(rng, n_ranches, clients_count)
+        self._workers(rng, n_ranches, head_count)
+
+    def _id(self, table: str, n: int) -> IdColumn:
+        self.ids[table] = IdColumn(table, n, self.seed)
+        return self.ids[table]
+
+    def _created(self, days: np.ndarray) -> CategoryColumn:
+        return day_column(days, timestamp=True)
+
+    def _users_and_ranches(self, rng, n_ranches: int):
+        try:
+            import bcrypt
+            password_hash = bcrypt.hashpw(DEFAULT_PASSWORD.encode(), seeded_bcrypt_salt(self.seed)).decode()
+        except ImportError:
+            password_hash = "!"  # login disabled
+
+        idx = np.arange(n_ranches)
+        first = rng.integers(0, len(FIRST_NAMES), n_ranches)
+        last = rng.integers(0, len(LAST_NAMES), n_ranches)
+        created = np.full(n_ranches, self.start)
+        self.tables["users"] = Table("users", {
+            "id": self._id("users", n_ranches),
+            "email": FuncColumn(n_ranches, lambda a, b, s: [f"owner{i}@rancho.example" for i in range(a, b)]),
+            "password_hash": ConstColumn(password_hash, n_ranches),
+            "full_name": FuncColumn(n_ranches, lambda a, b, s: [
+                f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]}" for i in range(a, b)]),
+            "is_active": ConstColumn(True, n_ranches),
+            "created_at": self._created(created),
+        })
+        self.tables["ranches"] = Table("ranches", {
+            "id": self._id("ranches", n_ranches),
+            "owner_id": RefColumn(self.ids["users"], idx),
+            "name": FuncColumn(n_ranches, lambda a, b, s: [
+                f"Rancho {RANCH_NAMES[i % len(RANCH_NAMES)]} {i}" for i in range(a, b)]),
+            "location": CategoryColumn(STATES, rng.integers(0, len(STATES), n_ranches)),
+            "created_at": self._created(created),
+        })
+        self.tables["user_ranches"] = Table("user_ranches", {
+            "user_id": RefColumn(self.ids["users"], idx),
+            "ranch_id": RefColumn(self.ids["ranches"], idx),
+            "role": enum_column(["owner"], np.zeros(n_ranches, dtype=np.int64)),
+            "created_at": self._created(created),
+        })
+
+    def _cattle(self, rng):
+        herd = self.herd
+        n = len(herd)
+        ref_day = np.minimum(herd.exit_day, self.end)
+        age = ref_day - herd.birth
+
+        first_calving = np.full(n, NO_EXIT, dtype=np.int64)
+        has_mother = herd.mother >= 0
+        np.minimum.at(first_calving, herd.mother[has_mother], herd.birth[has_mother])
+        species = np.where(
+            age < 365, 2,                                 # becerro
+            np.where(herd.sex == MALE, 1,                 # toro
+                     np.where(first_calving <= ref_day, 0, 3)),  # vaca / vaquilla
+        )
+        weight = weight_at(herd.mature, age) * rng.normal(1.0, 0.03, n)
+        created = np.maximum(herd.birth, self.start)
+
+        self.tables["cattle"] = Table("cattle", {
+            "id": self._id("cattle", n),
+            "ranch_id": RefColumn(self.ids["ranches"], herd.ranch),
+            "arete_number": FuncColumn(n, lambda a, b, s: [str(1_000_000_000 + i) for i in range(a, b)]),
+            "species": enum_column(SPECIES, species),
+            "gender": CategoryColumn(["F", "M"], herd.sex.astype(np.int64)),
+            "birth_date": day_column(herd.birth),
+            "weight_kg": FloatColumn(weight),
+            "status": enum_column(STATUSES, herd.exit_kind.astype(np.int64)),
+            "mother_id": RefColumn(self.ids["cattle"], herd.mother),
+            "created_at": self._created(created),
+            "updated_at": self._created(np.maximum(created, ref_day - 1)),
+        }, import_columns=["ranch_id", "arete_number", "species", "gender", "birth_date", "weight_kg", "status"])
+
+    def _events(self):
+        events, herd = self.events, self.herd
+        n = len(events)
+        cattle_ids = self.ids["cattle"]
+
+        clients = lambda: self.ids["clients"].values()
+
+        def fixed(options: List[dict]):
+            # Payloads from a small set, picked by events.choice
+            texts = np.array([json.dumps(o, ensure_ascii=False) for o in options], dtype=object)
+
+            def render(idx, as_text):
+                if as_text:
+                    return texts[events.choice[idx]]
+                return [dict(options[c]) for c in events.choice[idx].tolist()]
+            return render
+
+        def weighing(idx, as_text):
+            weights = np.round(events.value[idx].astype(np.float64), 1).tolist()
+            return [f'{{"weight_kg": {w}}}' for w in weights] if as_text else [{"weight_kg": w} for w in weights]
+
+        def birth(idx, as_text):
+            weights = np.round(events.value[idx].astype(np.float64), 1).tolist()
+            mother = herd.mother[events.animal[idx]]
+            mothers = cattle_ids.values()[np.where(mother >= 0, mother, cattle_ids.n)].tolist()
+            if as_text:
+                return [f'{{"weight_kg": {w}, "mother_id": {json.dumps(m)}}}' for w, m in zip(weights, mothers)]
+            return [{"weight_kg": w, "mother_id": m} for w, m in zip(weights, mothers)]
+
+        def sale(idx, as_text):
+            prices = np.round(events.value[idx].astype(np.float64), 2).tolist()
+            buyers = clients()[events.choice[idx]].tolist()
+            if as_text:
+                return [f'{{"price_mxn": {p}, "client_id": "{c}"}}' for p, c in zip(prices, buyers)]
+            return [{"price_mxn": p, "client_id": c} for p, c in zip(prices, buyers)]
+
+        renderers = {
+            WEIGHING: weighing,
+            BIRTH: birth,
+            SALE: sale,
+            VACCINATION: fixed([{"vaccine": v} for v in VACCINES]),
+            PREGNANCY_CHECK: fixed([{"result": "open"}, {"result": "pregnant"}]),
+            TREATMENT: fixed([{"diagnosis": d, "medication": m} for d, m in DIAGNOSES]),
+            DEATH: fixed([{"cause": c} for c in DEATH_CAUSES]),
+        }
+
+        def data(start: int, stop: int, style: str) -> list:
+            """JSON payloads (dicts for the mock store), rendered per event type"""
+            kinds = events.kind[start:stop]
+            rows = np.empty(stop - start, dtype=object)
+            for kind, render in renderers.items():
+                where = np.flatnonzero(kinds == kind)
+                if len(where):
+                    rendered = np.empty(len(where), dtype=object)
+                    rendered[:] = render(where + start, style != "mock")
+                    rows[where] = rendered
+            return rows.tolist()
+
+        self.tables["events"] = Table("events", {
+            "id": self._id("events", n),
+            "ranch_id": RefColumn(self.ids["ranches"], herd.ranch[events.animal]),
+            "cattle_id": RefColumn(cattle_ids, events.animal),
+            "type": enum_column(EVENT_TYPES, events.kind.astype(np.int64)),
+            "event_date": day_column(events.day),
+            "data": FuncColumn(n, data),
+            "created_at": self._created(events.day),
+        })
+
+    def _costs(self, rng, n_ranches: int, head_count: np.ndarray):
+        months = (self.end - self.start) // 30
+        ranch = np.repeat(np.arange(n_ranches), months * 5)
+        month = np.tile(np.repeat(np.arange(months), 5), n_ranches)
+        category = np.tile(np.arange(5), n_ranches * months)
+        herd = head_count[ranch]
+
+        amount = np.select(
+            [category == 0, category == 1, category == 2, category == 3],
+            [herd * rng.uniform(180, 260, len(ranch)),
+             herd * rng.uniform(20, 60, len(ranch)),
+             (1 + herd // 250) * rng.uniform(9000, 14000, len(ranch)),
+             rng.uniform(5000, 80000, len(ranch))],
+            rng.uniform(500, 5000, len(ranch)),
+        )
+        # Infrastructure and miscellaneous costs don't occur every month
+        keep = np.select([category == 3, category == 4], [rng.random(len(ranch)) < 0.15,
+                                                          rng.random(len(ranch)) < 0.5], True)
+        ranch, month, category, amount = ranch[keep], month[keep], category[keep], amount[keep]
+        n = len(ranch)
+        cost_day = self.start + month * 30 + rng.integers(0, 28, n)
+        description = rng.integers(0, 4, n)
+
+        self.tables["costs"] = Table("costs", {
+            "id": self._id("costs", n),
+            "ranch_id": RefColumn(self.ids["ranches"], ranch),
+            "category": enum_column(COST_CATEGORIES, category),
+            "amount_mxn": FloatColumn(amount, 2),
+            "description": FuncColumn(n, lambda a, b, s: [
+                COST_DESCRIPTIONS[COST_CATEGORIES[c]][d % len(COST_DESCRIPTIONS[COST_CATEGORIES[c]])]
+                for c, d in zip(category[a:b].tolist(), description[a:b].tolist())]),
+            "cost_date": day_column(cost_day),
+            "created_at": self._created(cost_day),
+        }, import_columns=["ranch_id", "category", "amount_mxn", "cost_date", "description"])
+
+    def _inventory(self, rng, n_ranches: int, head_count: np.ndarray):
+        items = len(INVENTORY_CATALOG)
+        ranch = np.repeat(np.arange(n_ranches), items)
+        item = np.tile(np.arange(items), n_ranches)
+        n = len(ranch)
+        typical = np.array([c[4] for c in INVENTORY_CATALOG], dtype=np.float64)[item] * head_count[ranch] / 500
+        # Some items end up at or below their reorder point
+        quantity = np.round(typical * rng.uniform(0.2, 2.0, n))
+        catalog = lambda field: CategoryColumn([c[field] for c in INVENTORY_CATALOG], item)
+
+        self.tables["inventory"] = Table("inventory", {
+            "id": self._id("inventory", n),
+            "ranch_id": RefColumn(self.ids["ranches"], ranch),
+            "category": catalog(0),
+            "name": catalog(1),
+            "quantity": FloatColumn(quantity, 0),
+            "unit": catalog(2),
+            "unit_cost": catalog(3),
+            "min_stock": FloatColumn(np.ceil(typical * 0.5), 0),
+            "supplier": CategoryColumn(SUPPLIERS, rng.integers(0, len(SUPPLIERS), n)),
+            "created_at": self._created(np.full(n, self.end - 30)),
+        }, import_columns=["ranch_id", "category", "name", "quantity", "unit", "unit_cost", "min_stock", "supplier"])
+
+    def _clients(self, rng, n_ranches: int, clients_count: np.ndarray):
+        ranch = np.repeat(np.arange(n_ranches), clients_count)
+        n = len(ranch)
+        last = rng.integers(0, len(LAST_NAMES), n)
+        phone = rng.integers(10**9, 10**10, n)
+
+        self.tables["clients"] = Table("clients", {
+            "id": self._id("clients", n),
+            "ranch_id": RefColumn(self.ids["ranches"], ranch),
+            "name": FuncColumn(n, lambda a, b, s: [f"Ganadera {LAST_NAMES[last[i]]} {i}" for i in range(a, b)]),
+            "type": CategoryColumn(CLIENT_TYPES, rng.integers(0, len(CLIENT_TYPES), n)),
+            "phone": FuncColumn(n, lambda a, b, s: [f"+52 {p}" for p in phone[a:b].tolist()]),
+            "email": FuncColumn(n, lambda a, b, s: [f"compras{i}@clientes.example" for i in range(a, b)]),
+            "payment_terms": CategoryColumn(PAYMENT_TERMS, rng.integers(0, len(PAYMENT_TERMS), n)),
+            "created_at": self._created(np.full(n, self.start)),
+        })
+
+    def _workers(self, rng, n_ranches: int, head_count: np.ndarray):
+        ranch = np.repeat(np.arange(n_ranches), 1 + head_count // 250)
+        n = len(ranch)
+        first = rng.integers(0, len(FIRST_NAMES), n)
+        last = rng.integers(0, len(LAST_NAMES), n)
+        hired = rng.integers(self.start, self.end, n)
+
+        self.tables["workers"] = Table("workers", {
+            "id": self._id("workers", n),
+            "ranch_id": RefColumn(self.ids["ranches"], ranch),
+            "full_name": FuncColumn(n, lambda a, b, s: [
+                f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first[a:b].tolist(), last[a:b].tolist())]),
+            "position": CategoryColumn(POSITIONS, rng.integers(0, len(POSITIONS), n)),
+            "salary_mxn": FloatColumn(rng.uniform(7000, 18000, n), 0),
+            "hire_date": day_column(hired),
+            "is_active": CategoryColumn([True, False], (rng.random(n) < 0.1).astype(np.int64)),
+            "created_at": self._created(hired),
+        })
+
+    def summary(self) -> Dict[str, int]:
+        return {name: len(table) for name, table in self.tables.items()}
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+# Tables the mock Supabase store serves
+MOCK_TABLES = ["ranches", "cattle", "events", "costs"]
+
+
+def write_sql(dataset: Dataset, url: str, chunk: int = 100_000):
+    """Bulk-load into an empty database with the app's SQLAlchemy schema"""
+    from sqlalchemy import create_engine
+    from app.L1_config.models import Base
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        sqlite = engine.dialect.name == "sqlite"
+        if sqlite:
+            # Bulk load into a fresh file: no rollback journal, big page cache
+            for pragma in ("synchronous=OFF", "journal_mode=OFF", "cache_size=-262144"):
+                cursor.execute(f"PRAGMA {pragma}")
+        placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+
+        for table in dataset.tables.values():
+            columns = table.columns()
+            column_list = ", ".join(columns)
+            for start in range(0, len(table), chunk):
+                rows = table.rows(start, min(start + chunk, len(table)), "sql")
+                if hasattr(cursor, "copy_expert"):
+                    # psycopg2: COPY is an order of magnitude faster than INSERT
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(rows)
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {table.name} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+                else:
+                    values = ", ".join([placeholder] * len(columns))
+                    cursor.executemany(f"INSERT INTO {table.name} ({column_list}) VALUES ({values})", rows)
+        raw.commit()
+    finally:
+        raw.close()
+        engine.dispose()
+
+
+def write_snapshot(dataset: Dataset, path: str):
+    """Mock Supabase store snapshot (load with MOCK_DB_SNAPSHOT=path)"""
+    from app.L1_config.mock_snapshot import save_snapshot
+
+    save_snapshot({name: dataset.tables[name] for name in MOCK_TABLES}, path)
+
+
+def write_csv(dataset: Dataset, directory: str, chunk: int = 100_000):
+    """One CSV per table; import-shaped columns where a /batch endpoint exists"""
+    os.makedirs(directory, exist_ok=True)
+    for table in dataset.tables.values():
+        columns = table.import_columns or table.columns()
+        with open(os.path.join(directory, f"{table.name}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for start in range(0, len(table), chunk):
+                writer.writerows(table.rows(start, min(start + chunk, len(table)), "csv", columns))
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--animals", type=int, default=10_000)
+    parser.add_argument("--ranches", type=int, help="Default: one per ~500 animals")
+    parser.add_argument("--years", type=int, default=8, help="Years of history")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day of history (YYYY-MM-DD)")
+    parser.add_argument("--weigh-interval", type=int, default=60, help="Days between weighings")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--sqlite", help="SQLite database file")
+    parser.add_argument("--postgres", help="PostgreSQL URL")
+    parser.add_argument("--snapshot", help="Mock store snapshot file")
+    parser.add_argument("--csv", help="Directory for CSV files")
+    args = parser.parse_args(argv)
+
+    if not any([args.sqlite, args.postgres, args.snapshot, args.csv]):
+        parser.error("choose at least one of --sqlite, --postgres, --snapshot, --csv")
+
+    started = time.perf_counter()
+    dataset = Dataset(args.seed, args.animals, args.ranches or max(1, args.animals // 500),
+                      args.years, args.end, args.weigh_interval)
+    print(f"🐄 Generated in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{count:,} {name}" for name, count in dataset.summary().items()))
+
+    targets = [
+        (args.sqlite, lambda: write_sql(dataset, f"sqlite:///{args.sqlite}")),
+        (args.postgres, lambda: write_sql(dataset, args.postgres)),
+        (args.snapshot, lambda: write_snapshot(dataset, args.snapshot)),
+        (args.csv, lambda: write_csv(dataset, args.csv)),
+    ]
+    for target, write in targets:
+        if target:
+            started = time.perf_counter()
+            write()
+            print(f"💾 Wrote {target} in {time.perf_counter() - started:.1f}s")
+
+    print(f"   First ranch: {dataset.ids['ranches'].values()[0]} (owner0@rancho.example / {DEFAULT_PASSWORD})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@
 
 from .supabase_client import get_supabase_client, get_supabase_url
 from .llm_client import get_gemini_model, get_perplexity_client, get_openai_client
-from .logging_config import get_logger, log_function_call
+from .logging_config import get_logger, get_log_stats, log_function_call
 from .system_config import (
     Environment,
     LogLevel,
@@ -21,6 +21,7 @@ __all__ = [
     "get_perplexity_client",
     "get_openai_client",
     "get_logger",
+    "get_log_stats",
     "log_function_call",
     "Environment",
     "LogLevel",
@@ -2,13 +2,29 @@
 L1 Configuration: Logging Configuration
 Centralized logging setup with structured logging.
 Following the 4-Layer Hierarchy: L1 = Configuration (Zero dependencies)
+
+Log calls only enqueue the record: JSON rendering and console/file writes
+happen on a background writer thread, in batches, with size-based file
+rotation. High-frequency INFO/DEBUG events can be sampled or rate-limited
+per event name; everything dropped is counted in get_log_stats().
+
+The pipeline classes mirror projects/erp_ganadero/backend/app/L1_config/
+logging_config.py, which is deployed on its own and cannot import tools/;
+change both (the backend tests compare them).
 """
 
 import os
 import sys
+import atexit
 import logging
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from logging.handlers import QueueHandler
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import structlog
 
@@ -16,6 +32,215 @@ import structlog
 load_dotenv()
 
 
+def _parse_event_map(value: str) -> Dict[str, float]:
+    """"a=0.1,b=5" -> {"a": 0.1, "b": 5.0}"""
+    parsed = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            parsed[name.strip()] = float(number)
+    return parsed
+
+
+class LogStats:
+    """Pipeline counters: records written and records dropped, by reason"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped_queue_full = 0
+        self.sampled_out: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+
+    def count(self, field: str, event: Optional[str] = None, amount: int = 1):
+        with self._lock:
+            if event is None:
+                setattr(self, field, getattr(self, field) + amount)
+            else:
+                getattr(self, field)[event] += amount
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped_queue_full": self.dropped_queue_full,
+                "dropped_total": self.dropped_queue_full
+                + sum(self.sampled_out.values()) + sum(self.rate_limited.values()),
+                "sampled_out": dict(self.sampled_out),
+                "rate_limited": dict(self.rate_limited),
+            }
+
+
+class EventSampler:
+    """
+    structlog processor keeping a random fraction of some events and
+    capping others at N per second. Warnings and errors always pass.
+    """
+
+    def __init__(self, stats: LogStats, sample_rates: Dict[str, float], rate_limits: Dict[str, float]):
+        self.stats = stats
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self._windows: Dict[str, List[float]] = {}  # event -> [window start, count]
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name not in ("debug", "info"):
+            return event_dict
+        event = event_dict.get("event")
+
+        rate = self.sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            self.stats.count("sampled_out", event)
+            raise structlog.DropEvent
+
+        limit = self.rate_limits.get(event)
+        if limit is not None:
+            now = time.monotonic()
+            with self._lock:
+                window = self._windows.setdefault(event, [now, 0])
+                if now - window[0] >= 1.0:
+                    window[0], window[1] = now, 0
+                window[1] += 1
+                over = window[1] > limit
+            if over:
+                self.stats.count("rate_limited", event)
+                raise structlog.DropEvent
+
+        return event_dict
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue unformatted records; drop (and count) when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue, stats: LogStats):
+        super().__init__(log_queue)
+        self.stats = stats
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Rendering happens on the writer thread, except for the traceback:
+        # it has to be captured while the exception is still being handled
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats.count("dropped_queue_full")
+
+
+class RotatingLogFile:
+    """Append-only file rotated to .1 ... .N once it passes max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self._size = self._stream.tell()
+
+    def write(self, text: str):
+        if self.max_bytes and self._size and self._size + len(text) > self.max_bytes:
+            self._rotate()
+        self._stream.write(text)
+        self._size += len(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def close(self):
+        self._stream.close()
+
+    def _rotate(self):
+        self._stream.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+
+class BatchingLogWriter(threading.Thread):
+    """Drains the queue, renders records and writes each batch once per output"""
+
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, formatter: logging.Formatter, outputs: List[Any],
+                 stats: LogStats, batch_size: int = 256, flush_interval: float = 0.2):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.formatter = formatter
+        self.outputs = outputs
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write([record for record in batch if record is not self._STOP])
+            if batch[-1] is self._STOP:
+                for output in self.outputs:
+                    if isinstance(output, RotatingLogFile):
+                        output.close()
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record) + "\n")
+            except Exception:
+                lines.append(f"log formatting failed: {record.getMessage()!r}\n")
+        if not lines:
+            return
+        text = "".join(lines)
+        for output in self.outputs:
+            try:
+                output.write(text)
+                output.flush()
+            except Exception as e:
+                sys.stderr.write(f"log write failed: {e}\n")
+        self.stats.count("written", amount=len(lines))
+
+    def stop(self, timeout: float = 5.0):
+        """Write what is queued, then stop"""
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.join(timeout)
+
+
+def _add_foreign_exception(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """foreign_pre_chain processor: traceback of a stdlib record, rendered by prepare()"""
+    record = event_dict.get("_record")
+    if record is not None and record.exc_text:
+        event_dict["exception"] = record.exc_text
+    return event_dict
+
+
+_traceback_formatter = logging.Formatter()
+
 class LoggingConfig:
     """
     Centralized logging configuration.
@@ -24,7 +249,8 @@ class LoggingConfig:
     - Timestamps
     - Log levels
     - Context information
-    - File and console output
+    - File and console output, written off-thread in batches
+    - Per-event sampling / rate limits (LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
     """
     
     def __init__(self):
@@ -32,6 +258,12 @@ class LoggingConfig:
         self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
         self.log_dir = Path("logs")
         self.log_file = self.log_dir / "app.log"
+        self.max_bytes = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+        self.queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        self.sample_rates = _parse_event_map(os.getenv("LOG_SAMPLE_RATES", ""))
+        self.rate_limits = _parse_event_map(os.getenv("LOG_RATE_LIMITS", ""))
+        self.stats = LogStats()
         
         # Create logs directory if it doesn't exist
         self.log_dir.mkdir(exist_ok=True)
@@ -49,11 +281,15 @@ class LoggingConfig:
             structlog.stdlib.add_logger_name,
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
         ]
         
         # Configure structlog
         structlog.configure(
-            processors=shared_processors + [
+            processors=[
+                structlog.stdlib.filter_by_level,
+                EventSampler(self.stats, self.sample_rates, self.rate_limits),
+            ] + shared_processors + [
                 structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
             ],
             logger_factory=structlog.stdlib.LoggerFactory(),
@@ -63,27 +299,30 @@ class LoggingConfig:
         
         # Configure standard library logging
         formatter = structlog.stdlib.ProcessorFormatter(
-            foreign_pre_chain=shared_processors,
+            foreign_pre_chain=shared_processors + [_add_foreign_exception],
             processors=[
                 structlog.stdlib.ProcessorFormatter.remove_processors_meta,
                 structlog.processors.JSONRenderer(),
             ],
         )
         
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        console_handler.setLevel(self.log_level)
+        # Console and rotating file output, written by a background thread
+        log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self.writer = BatchingLogWriter(
+            log_queue,
+            formatter,
+            [sys.stdout, RotatingLogFile(self.log_file, self.max_bytes, self.backup_count)],
+            self.stats,
+        )
+        self.writer.start()
+        atexit.register(self.writer.stop)
         
-        # File handler
-        file_handler = logging.FileHandler(self.log_file)
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(self.log_level)
+        queue_handler = NonBlockingQueueHandler(log_queue, self.stats)
+        queue_handler.setLevel(self.log_level)
         
         # Root logger configuration
         root_logger = logging.getLogger()
-        root_logger.addHandler(console_handler)
-        root_logger.addHandler(file_handler)
+        root_logger.addHandler(queue_handler)
         root_logger.setLevel(self.log_level)
 
 
@@ -110,6 +349,14 @@ def get_logger(name: str = __name__) -> structlog.stdlib.BoundLogger:
     return structlog.get_logger(name)
 
 
+def get_log_stats() -> Dict[str, Any]:
+    """
+    Logging pipeline counters: records written, and records dropped because
+    the queue was full, sampled out, or over an event's rate limit.
+    """
+    return {**_logging_config.stats.as_dict(), "queued": _logging_config.writer.queue.qsize()}
+
+
 def log_function_call(func):
     """
     Decorator to automatically log function calls with parameters and results.